@@ -2,12 +2,24 @@
 from flask import Flask, jsonify, request, session, render_template, redirect, url_for
 import os
 from flask_cors import CORS
-from werkzeug.security import check_password_hash, generate_password_hash
-from functools import wraps
-from secret_santa import SecretSanta
-from dotenv import load_dotenv, set_key
+from functools import lru_cache, wraps
+from secret_santa import NoSolutionError, SecretSanta
+from dotenv import dotenv_values, load_dotenv, set_key
+import fcntl
+import hashlib
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from db import ensure_schema, forget_schema, get_connection
+from compaction import compact_scores
+import generations
+import migrations
+import passwords
+from group_commit import GroupCommitQueue
+import score_feed
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from storage import (
     env_file_path,
     ensure_data_dir,
@@ -16,21 +28,53 @@ from storage import (
     create_snapshot,
     list_snapshots,
     restore_snapshot,
+    score_archive_dir,
 )
 
 
+IMPORT_STARTED = time.perf_counter()
 ENV_FILE = env_file_path()
-load_dotenv(ENV_FILE, override=True)
 ensure_data_dir()
-SS = SecretSanta(data_dir=get_data_dir())
-try:
-    SS.load()
-except Exception:
-    # If current year's file is missing, generate and save it
-    SS.draw()
-    SS.save()
-    SS.load()
-ASSIGNMENTS = SS.config
+# Settings below are read from the environment, so .env comes first; the
+# draw, the logins and the schema are loaded by startup() at the end
+load_dotenv(ENV_FILE, override=True)
+SS = None
+ASSIGNMENTS = {}
+# Years of recorded draws that rule a pairing out (as deep as previous.yaml
+# goes); counting every year ever saved would make the draw infeasible
+HISTORY_YEARS = int(os.environ.get('HISTORY_YEARS', '2'))
+
+
+def new_santa(history_years=None):
+    if history_years is None:
+        history_years = HISTORY_YEARS
+    return SecretSanta(data_dir=get_data_dir(), history_years=history_years)
+
+
+def load_matches():
+    santa = new_santa()
+    try:
+        santa.load()
+    except Exception:
+        # If current year's file is missing, generate and save it.  Workers
+        # starting together (without preload) must not each draw their own.
+        with open(os.path.join(get_data_dir(), '.draw-lock'), 'a') as lock:
+            fcntl.lockf(lock, fcntl.LOCK_EX)
+            try:
+                santa.load()
+            except Exception:
+                try:
+                    santa.draw()
+                except NoSolutionError as exc:
+                    # Keep serving logins and games; an admin can fix the
+                    # rules and draw from /admin
+                    app.logger.error("No draw for %s: %s", santa.year, exc)
+                    santa.config = {}
+                    return santa
+                santa.save()
+                santa.load()
+    return santa
+
 
 def load_logins_from_env():
     prefix = "LOGIN_"
@@ -41,83 +85,332 @@ def load_logins_from_env():
             result[name] = value
     return result
 
-logins = load_logins_from_env()
+logins = {}
 
 ADMIN_USERS = {"jimmy", "ditte"}
 
 
+def reload_matches():
+    global SS, ASSIGNMENTS
+    santa = new_santa()
+    santa.load()
+    SS = santa
+    ASSIGNMENTS = santa.config
+
+
+def reload_logins():
+    global logins
+    load_dotenv(ENV_FILE, override=True)
+    logins = load_logins_from_env()
+
+
+STATE_RELOADERS = {"matches": reload_matches, "logins": reload_logins}
+
+
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret')
 
+
+@app.before_request
+def sync_shared_state():
+    # Pick up draws and passwords saved by other workers (see generations.py)
+    data_dir = get_data_dir()
+    for name, generation in generations.changed(data_dir).items():
+        try:
+            STATE_RELOADERS[name]()
+        except Exception:
+            # Keep serving the old state and try again on the next request
+            app.logger.exception("Reloading %s failed", name)
+            continue
+        generations.mark_loaded(data_dir, name, generation)
+
 SCORES_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS scores (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     game TEXT NOT NULL,
     name TEXT NOT NULL,
     score INTEGER NOT NULL,
-    created_at TEXT NOT NULL
+    created_at TEXT NOT NULL,
+    created_ts INTEGER
 )
 """
 
+# Each player's best run per game, kept up to date on every write so the
+# leaderboard reads a handful of rows from a covering index while `scores`
+# keeps every run for stats. score_id (the run's id in `scores`) breaks
+# ties in favour of whoever got there first.
+BEST_SCORES_SQL = """
+CREATE TABLE IF NOT EXISTS best_scores (
+    game TEXT NOT NULL,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    score_id INTEGER NOT NULL,
+    PRIMARY KEY (game, name)
+) WITHOUT ROWID
+"""
 
-def init_scores_db():
-    con = sqlite3.connect(scores_db_path())
+# One row per game, bumped in the same transaction as every score write.
+# Workers compare it against their cached leaderboards, and it doubles as
+# the ETag, so invalidation works across gunicorn workers.
+SCORE_VERSIONS_SQL = """
+CREATE TABLE IF NOT EXISTS score_versions (
+    game TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+)
+"""
+
+
+# Each player's best run per game and period ("day", or the Sunday-start
+# "week" that lines up with the Advent Sundays), keyed by the period's first
+# day in SCORES_TIMEZONE.  Maintained next to best_scores on every write, so a
+# period's top 10 is an index range however long the history gets.
+PERIOD_SCORES_SQL = """
+CREATE TABLE IF NOT EXISTS period_scores (
+    game TEXT NOT NULL,
+    period TEXT NOT NULL,
+    period_start TEXT NOT NULL,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    score_id INTEGER NOT NULL,
+    PRIMARY KEY (game, period, period_start, name)
+) WITHOUT ROWID
+"""
+PERIODS = ("all", "day", "week")
+
+try:
+    SCORES_TIMEZONE = ZoneInfo(os.environ.get('SCORES_TIMEZONE', 'Europe/Copenhagen'))
+except (ZoneInfoNotFoundError, ValueError):
+    SCORES_TIMEZONE = timezone.utc
+
+
+def parse_created_at(created_at: str) -> datetime:
+    # created_at is naive UTC
+    return datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc)
+
+
+def period_start(period: str, day: date) -> str:
+    if period == "week":
+        day -= timedelta(days=(day.weekday() + 1) % 7)
+    return day.isoformat()
+
+
+def current_period_start(period: str) -> str:
+    return period_start(period, datetime.now(SCORES_TIMEZONE).date())
+
+
+@lru_cache(maxsize=4096)
+def _period_keys(minute: str):
     try:
-        cur = con.cursor()
-        cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='scores'")
-        row = cur.fetchone()
-        if not row or not row[0]:
+        day = parse_created_at(minute).astimezone(SCORES_TIMEZONE).date()
+    except ValueError:
+        return ()
+    return tuple((period, period_start(period, day)) for period in PERIODS[1:])
+
+
+def period_keys(created_at: str):
+    """Return ``((period, period_start), ...)`` for the rollups a run belongs to."""
+    # Runs arrive in time order, so the timezone math is done once per minute
+    return _period_keys(created_at[:16])
+
+
+def upsert_period_scores(con, game, name, score, created_at, score_id):
+    keys = period_keys(created_at)
+    if not keys:
+        return
+    con.execute(
+        "INSERT INTO period_scores (game, period, period_start, name, score, created_at, score_id) "
+        f"VALUES {', '.join(['(?, ?, ?, ?, ?, ?, ?)'] * len(keys))} "
+        "ON CONFLICT(game, period, period_start, name) DO UPDATE SET "
+        "score = excluded.score, created_at = excluded.created_at, score_id = excluded.score_id "
+        "WHERE excluded.score > period_scores.score",
+        [value for period, start in keys for value in (game, period, start, name, score, created_at, score_id)],
+    )
+
+
+def rebuild_period_scores(con, games=None):
+    """Recompute period_scores from the raw runs, for ``games`` or all games."""
+    where = ""
+    params = ()
+    if games is not None:
+        games = list(games)
+        where = f"WHERE game IN ({', '.join('?' * len(games))})"
+        params = tuple(games)
+    con.execute(f"DELETE FROM period_scores {where}", params)
+    runs = con.execute(f"SELECT id, game, name, score, created_at FROM scores {where} ORDER BY id", params)
+    for score_id, game, name, score, created_at in runs.fetchall():
+        upsert_period_scores(con, game, name, score, created_at, score_id)
+
+
+def migrate_scores_table(con):
+    cur = con.cursor()
+    cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='scores'")
+    row = cur.fetchone()
+    if not row or not row[0]:
+        cur.execute(SCORES_TABLE_SQL)
+    else:
+        existing_sql = (row[0] or '').upper()
+        if 'UNIQUE' in existing_sql:
+            # Legacy schema had UNIQUE(game, name); rebuild table without it.
+            cur.execute("ALTER TABLE scores RENAME TO scores__legacy")
             cur.execute(SCORES_TABLE_SQL)
-        else:
-            existing_sql = (row[0] or '').upper()
-            if 'UNIQUE' in existing_sql:
-                # Legacy schema had UNIQUE(game, name); rebuild table without it.
-                cur.execute("ALTER TABLE scores RENAME TO scores__legacy")
-                cur.execute(SCORES_TABLE_SQL)
-                cur.execute(
-                    """
-                    INSERT INTO scores (id, game, name, score, created_at)
-                    SELECT id, game, name, score, created_at FROM scores__legacy
-                    """
-                )
-                cur.execute("DROP TABLE scores__legacy")
-        # Drop any lingering unique index and create simple indexes for lookups
-        cur.execute("DROP INDEX IF EXISTS idx_scores_game_name")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_scores_game_score ON scores(game, score DESC)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_scores_game_name ON scores(game, name)")
-        con.commit()
-    finally:
-        con.close()
-
-init_scores_db()
-
-def init_games_db():
-    con = sqlite3.connect(scores_db_path())
-    try:
-        cur = con.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS games (
-                game TEXT PRIMARY KEY,
-                enabled INTEGER NOT NULL DEFAULT 1
+            cur.execute(
+                """
+                INSERT INTO scores (id, game, name, score, created_at)
+                SELECT id, game, name, score, created_at FROM scores__legacy
+                """
             )
-            """
+            cur.execute("DROP TABLE scores__legacy")
+    # Drop a lingering legacy unique index and create simple indexes for lookups
+    cur.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name='idx_scores_game_name'")
+    index = cur.fetchone()
+    if index and 'UNIQUE' in (index[0] or '').upper():
+        cur.execute("DROP INDEX idx_scores_game_name")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scores_game_score ON scores(game, score DESC)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scores_game_name ON scores(game, name)")
+
+
+def migrate_score_timestamps(con):
+    # Integer UTC timestamps next to the ISO strings, for cheap range queries
+    columns = {info[1] for info in con.execute("PRAGMA table_info(scores)").fetchall()}
+    if 'created_ts' not in columns:
+        con.execute("ALTER TABLE scores ADD COLUMN created_ts INTEGER")
+    con.execute(
+        "UPDATE scores SET created_ts = CAST(strftime('%s', created_at) AS INTEGER) WHERE created_ts IS NULL"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_scores_game_created ON scores(game, created_ts)")
+
+
+def migrate_score_versions(con):
+    con.execute(SCORE_VERSIONS_SQL)
+
+
+def table_exists(con, name):
+    return con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (name,)).fetchone() is not None
+
+
+def migrate_best_scores(con):
+    # One-time fill from the run history of databases that predate it
+    backfill = not table_exists(con, 'best_scores')
+    con.execute(BEST_SCORES_SQL)
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS idx_best_scores_rank "
+        "ON best_scores(game, score DESC, score_id, name, created_at)"
+    )
+    if backfill:
+        rebuild_best_scores(con, periods=False)
+
+
+def migrate_period_scores(con):
+    backfill = not table_exists(con, 'period_scores')
+    con.execute(PERIOD_SCORES_SQL)
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS idx_period_scores_rank "
+        "ON period_scores(game, period, period_start, score DESC, score_id, name, created_at)"
+    )
+    if backfill:
+        rebuild_period_scores(con)
+
+
+def rebuild_best_scores(con, games=None, periods=True):
+    """Recompute best_scores (and period_scores) from the raw runs, for ``games`` or all games."""
+    where = ""
+    params = ()
+    if games is not None:
+        games = list(games)
+        where = f"WHERE game IN ({', '.join('?' * len(games))})"
+        params = tuple(games)
+    con.execute(f"DELETE FROM best_scores {where}", params)
+    con.execute(
+        f"""
+        INSERT INTO best_scores (game, name, score, created_at, score_id)
+        SELECT game, name, score, created_at, id FROM (
+            SELECT game, name, score, created_at, id,
+                   ROW_NUMBER() OVER (PARTITION BY game, name ORDER BY score DESC, id ASC) AS pos
+            FROM scores {where}
+        ) WHERE pos = 1
+        """,
+        params,
+    )
+    if periods:
+        rebuild_period_scores(con, games)
+
+
+def bump_score_version(con, game: str):
+    # Microsecond clock, but never below the previous version + 1, so
+    # versions keep growing even after a snapshot restore rolls them back
+    con.execute(
+        "INSERT INTO score_versions (game, version) VALUES (?, ?) "
+        "ON CONFLICT(game) DO UPDATE SET version = MAX(version + 1, excluded.version)",
+        (game, time.time_ns() // 1000),
+    )
+
+
+def write_scores(con, rows):
+    # rows: (game, name, score, created_at); runs inside the caller's transaction
+    for game, name, score, created_at in rows:
+        run = con.execute(
+            "INSERT INTO scores (game, name, score, created_at, created_ts) VALUES (?, ?, ?, ?, ?)",
+            (game, name, score, created_at, int(parse_created_at(created_at).timestamp())),
+        )
+        con.execute(
+            "INSERT INTO best_scores (game, name, score, created_at, score_id) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(game, name) DO UPDATE SET "
+            "score = excluded.score, created_at = excluded.created_at, score_id = excluded.score_id "
+            "WHERE excluded.score > best_scores.score",
+            (game, name, score, created_at, run.lastrowid),
+        )
+        upsert_period_scores(con, game, name, score, created_at, run.lastrowid)
+    for game in {row[0] for row in rows}:
+        bump_score_version(con, game)
+
+
+# Score submissions are committed in groups; SCORES_DURABILITY picks whether
+# a POST waits for its commit ("group", default), only for the queue
+# ("async"), or commits on its own ("direct")
+SCORE_QUEUE = GroupCommitQueue(
+    write_scores,
+    window=float(os.environ.get('SCORES_COMMIT_WINDOW_MS', '5')) / 1000,
+    mode=os.environ.get('SCORES_DURABILITY', 'group'),
+)
+MAX_SCORE_BATCH = 500
+
+
+def score_version(con, game: str) -> int:
+    row = con.execute("SELECT version FROM score_versions WHERE game = ?", (game,)).fetchone()
+    return row[0] if row else 0
+
+def migrate_games_table(con):
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS games (
+            game TEXT PRIMARY KEY,
+            enabled INTEGER NOT NULL DEFAULT 1
         )
-        # Ensure default games exist and are enabled by default
-        default_games = [
-            "forste-advent",
-            "anden-advent",
-            "tredje-advent",
-            "fjerde-advent",
-        ]
-        for g in default_games:
-            cur.execute("INSERT OR IGNORE INTO games (game, enabled) VALUES (?, ?)", (g, 1))
-        con.commit()
-    finally:
-        con.close()
-
-init_games_db()
+        """
+    )
+    # Ensure default games exist and are enabled by default
+    default_games = [
+        "forste-advent",
+        "anden-advent",
+        "tredje-advent",
+        "fjerde-advent",
+    ]
+    for g in default_games:
+        con.execute("INSERT OR IGNORE INTO games (game, enabled) VALUES (?, ?)", (g, 1))
+    con.execute("CREATE TABLE IF NOT EXISTS games_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+
+def bump_games_version(con):
+    # Same clock-based scheme as score_versions, so a restored snapshot can
+    # never bring back a version a worker already cached with other contents
+    con.execute(
+        "INSERT INTO games_meta (key, value) VALUES ('version', ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = MAX(value + 1, excluded.value)",
+        (time.time_ns() // 1000,),
+    )
 
 
 def canonical_game_key(game: str) -> str:
@@ -126,113 +419,138 @@ def canonical_game_key(game: str) -> str:
     return game
 
 
-def migrate_reindeer_rush_alias():
-    con = sqlite3.connect(scores_db_path())
-    try:
-        cur = con.cursor()
-        cur.execute(
-            "UPDATE scores SET game = 'fjerde-advent' WHERE game = 'reindeer-rush'"
-        )
-        cur.execute("DELETE FROM games WHERE game = 'reindeer-rush'")
-        con.commit()
-    finally:
-        con.close()
+def migrate_reindeer_rush_alias(con):
+    cur = con.execute("UPDATE scores SET game = 'fjerde-advent' WHERE game = 'reindeer-rush'")
+    if cur.rowcount:
+        rebuild_best_scores(con, ['fjerde-advent', 'reindeer-rush'])
+        bump_score_version(con, 'fjerde-advent')
+    con.execute("DELETE FROM games WHERE game = 'reindeer-rush'")
 
 
-migrate_reindeer_rush_alias()
+def migrate_tredje_scores_to_fjerde(con):
+    """Move legacy Reindeer Rush scores to the new Fjerde Advent bucket once."""
+    fjerde_count = con.execute("SELECT COUNT(*) FROM scores WHERE game = 'fjerde-advent'").fetchone()[0] or 0
+    tredje_count = con.execute("SELECT COUNT(*) FROM scores WHERE game = 'tredje-advent'").fetchone()[0] or 0
+    if tredje_count and fjerde_count == 0:
+        con.execute("UPDATE scores SET game = 'fjerde-advent' WHERE game = 'tredje-advent'")
+        rebuild_best_scores(con, ['fjerde-advent', 'tredje-advent'])
+        bump_score_version(con, 'fjerde-advent')
+        bump_score_version(con, 'tredje-advent')
 
 
-def migrate_tredje_scores_to_fjerde():
-    """Move legacy Reindeer Rush scores to the new Fjerde Advent bucket once."""
-    con = sqlite3.connect(scores_db_path())
-    try:
-        cur = con.cursor()
-        cur.execute("SELECT COUNT(*) FROM scores WHERE game = 'fjerde-advent'")
-        fjerde_count = cur.fetchone()[0] or 0
-        cur.execute("SELECT COUNT(*) FROM scores WHERE game = 'tredje-advent'")
-        tredje_count = cur.fetchone()[0] or 0
-        if tredje_count and fjerde_count == 0:
-            cur.execute("UPDATE scores SET game = 'fjerde-advent' WHERE game = 'tredje-advent'")
-        con.commit()
-    finally:
-        con.close()
+def remove_glaedelig_jul_game(con):
+    """Clean up legacy Glædelig Jul rows now that the page is removed."""
+    con.execute("DELETE FROM scores WHERE game = 'glaedelig-jul'")
+    con.execute("DELETE FROM best_scores WHERE game = 'glaedelig-jul'")
+    con.execute("DELETE FROM period_scores WHERE game = 'glaedelig-jul'")
+    con.execute("DELETE FROM games WHERE game = 'glaedelig-jul'")
+
+
+# Applied once per database file and recorded in schema_migrations (see
+# migrations.py).  Append new steps; never renumber or edit applied ones.
+MIGRATIONS = [
+    (1, "scores_table", migrate_scores_table),
+    (2, "score_timestamps", migrate_score_timestamps),
+    (3, "score_versions", migrate_score_versions),
+    (4, "best_scores", migrate_best_scores),
+    (5, "period_scores", migrate_period_scores),
+    (6, "games_table", migrate_games_table),
+    (7, "reindeer_rush_alias", migrate_reindeer_rush_alias),
+    (8, "tredje_scores_to_fjerde", migrate_tredje_scores_to_fjerde),
+    (9, "remove_glaedelig_jul", remove_glaedelig_jul_game),
+]
+
+
+def prepare_new_db(con):
+    if con.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+        # New file: let compaction hand freed pages back in small steps
+        # (auto_vacuum only changes through VACUUM once WAL is on; instant here)
+        con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        con.execute("VACUUM")
 
 
-migrate_tredje_scores_to_fjerde()
+def init_scores_db():
+    migrations.run(scores_db_path(), MIGRATIONS, before=prepare_new_db)
 
 
-def remove_glaedelig_jul_game():
-    """Clean up legacy Glædelig Jul rows now that the page is removed."""
-    con = sqlite3.connect(scores_db_path())
-    try:
-        cur = con.cursor()
-        cur.execute("DELETE FROM scores WHERE game = 'glaedelig-jul'")
-        cur.execute("DELETE FROM games WHERE game = 'glaedelig-jul'")
-        con.commit()
-    finally:
-        con.close()
+def ensure_scores_db():
+    # Cheap per-request guard; the ledger is checked once per DB file
+    ensure_schema('scores', init_scores_db)
 
 
-remove_glaedelig_jul_game()
+def ensure_games_db():
+    # The games table lives in the scores database and shares its ledger
+    ensure_scores_db()
 
-def is_game_enabled(game: str) -> bool:
-    game = canonical_game_key(game)
-    con = sqlite3.connect(scores_db_path())
+
+# Page renders check game availability several times (the navbar asks for
+# every game), so the games table is cached per database file as a dict.
+# It is trusted for GAMES_CACHE_TTL seconds and then revalidated against the
+# version in games_meta, which set_game_enabled bumps, so a toggle reaches
+# every worker within about a second.
+GAMES_CACHE_TTL = 1.0
+# db path -> (checked at, version, {game: enabled})
+GAMES_CACHE: dict[str, tuple[float, int, dict[str, bool]]] = {}
+
+
+def games_version(con) -> int:
+    row = con.execute("SELECT value FROM games_meta WHERE key = 'version'").fetchone()
+    return row[0] if row else 0
+
+
+def load_games(path: str) -> dict[str, bool]:
+    ensure_games_db()
+    con = get_connection(path)
+    cached = GAMES_CACHE.get(path)
+    version = games_version(con)
+    if cached is not None and cached[1] == version:
+        games = cached[2]
+    else:
+        games = {g: bool(e) for (g, e) in con.execute("SELECT game, enabled FROM games ORDER BY game")}
+    GAMES_CACHE[path] = (time.monotonic(), version, games)
+    return games
+
+
+def cached_games() -> dict[str, bool]:
+    """Return ``{game: enabled}`` as stored, at most GAMES_CACHE_TTL seconds old."""
+    path = scores_db_path()
+    cached = GAMES_CACHE.get(path)
+    if cached is not None and time.monotonic() - cached[0] < GAMES_CACHE_TTL:
+        return cached[2]
     try:
-        cur = con.cursor()
-        try:
-            cur.execute("SELECT enabled FROM games WHERE game = ?", (game,))
-        except sqlite3.OperationalError:
-            # games table missing in this DB file; initialize and retry
-            con.close()
-            init_games_db()
-            con2 = sqlite3.connect(scores_db_path())
-            try:
-                cur2 = con2.cursor()
-                cur2.execute("SELECT enabled FROM games WHERE game = ?", (game,))
-                row = cur2.fetchone()
-                if row is None:
-                    return True
-                return bool(row[0])
-            finally:
-                con2.close()
-        row = cur.fetchone()
-        if row is None:
-            return True
-        return bool(row[0])
-    finally:
-        con.close()
+        return load_games(path)
+    except sqlite3.OperationalError:
+        # games tables missing although the guard passed (file rewritten in
+        # place); initialize and retry
+        forget_schema()
+        return load_games(path)
+
+
+def is_game_enabled(game: str) -> bool:
+    return cached_games().get(canonical_game_key(game), True)
 
 def set_game_enabled(game: str, enabled: bool):
     game = canonical_game_key(game)
     # Ensure games table exists (handle cases where app was imported earlier
     # with a different DB path or when the DB file is new)
-    init_games_db()
-    con = sqlite3.connect(scores_db_path())
-    try:
-        cur = con.cursor()
-        cur.execute(
+    ensure_games_db()
+    con = get_connection()
+    with con:
+        con.execute(
             "INSERT INTO games (game, enabled) VALUES (?, ?) "
             "ON CONFLICT(game) DO UPDATE SET enabled = excluded.enabled",
             (game, 1 if enabled else 0),
         )
-        con.commit()
-    finally:
-        con.close()
+        bump_games_version(con)
+    # This worker sees the change at once, the others within GAMES_CACHE_TTL
+    GAMES_CACHE.pop(scores_db_path(), None)
 
 def get_games():
-    con = sqlite3.connect(scores_db_path())
-    try:
-        cur = con.cursor()
-        cur.execute("SELECT game, enabled FROM games ORDER BY game")
-        rows = cur.fetchall()
-        merged: dict[str, bool] = {}
-        for (g, e) in rows:
-            key = canonical_game_key(g)
-            merged[key] = merged.get(key, False) or bool(e)
-        return [{"game": g, "enabled": enabled} for g, enabled in merged.items()]
-    finally:
-        con.close()
+    merged: dict[str, bool] = {}
+    for g, e in cached_games().items():
+        key = canonical_game_key(g)
+        merged[key] = merged.get(key, False) or e
+    return [{"game": g, "enabled": enabled} for g, enabled in merged.items()]
 
 
 def is_admin_user():
@@ -251,15 +569,15 @@ def inject_game_helpers():
 
 
 def reset_scores_for_game(game: str):
-    init_scores_db()
+    ensure_scores_db()
     game = canonical_game_key(game)
-    con = sqlite3.connect(scores_db_path())
-    try:
-        cur = con.cursor()
-        cur.execute("DELETE FROM scores WHERE game = ?", (game,))
-        con.commit()
-    finally:
-        con.close()
+    con = get_connection()
+    with con:
+        con.execute("DELETE FROM scores WHERE game = ?", (game,))
+        con.execute("DELETE FROM best_scores WHERE game = ?", (game,))
+        con.execute("DELETE FROM period_scores WHERE game = ?", (game,))
+        bump_score_version(con, game)
+    score_feed.notify(scores_db_path())
 
 def is_hashed(value: str) -> bool:
     return isinstance(value, str) and (value.startswith('pbkdf2:') or value.startswith('scrypt:'))
@@ -339,7 +657,13 @@ def high_scores():
         ("tredje-advent", "Tredje Advent — Jingle Bell Hero"),
         ("fjerde-advent", "Fjerde Advent — Reindeer Rush"),
     ]
-    return render_template('high_scores.html', games=games)
+    # Inline the boards so the page paints without a request per game
+    ensure_scores_db()
+    try:
+        _, initial_scores, _ = cached_leaderboards(game for game, _ in games)
+    except sqlite3.OperationalError:
+        initial_scores = {}
+    return render_template('high_scores.html', games=games, initial_scores=initial_scores)
 
 @app.route('/lodtraekning')
 @login_required
@@ -355,30 +679,345 @@ def lodtraekning():
     recipient_text = recipient.capitalize() if recipient else ''
     return render_template('lodtraekning.html', name=user, recipient=recipient_text)
 
+# Board caches are keyed on what anonymous requests ask for, so each keeps
+# only its most recently used entries
+LEADERBOARD_CACHE_SIZE = int(os.environ.get('LEADERBOARD_CACHE_SIZE', '256'))
+_board_cache_lock = threading.Lock()
+
+
+def cache_get(cache: OrderedDict, key):
+    with _board_cache_lock:
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+        return entry
+
+
+def cache_put(cache: OrderedDict, key, entry):
+    with _board_cache_lock:
+        cache[key] = entry
+        cache.move_to_end(key)
+        while len(cache) > LEADERBOARD_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def is_known_game(game: str) -> bool:
+    return canonical_game_key(game) in cached_games()
+
+
+# (db path, game, period, period start) -> (version, serialized top-10 response)
+LEADERBOARD_CACHE: OrderedDict[tuple[str, str, str, str | None], tuple[int, str]] = OrderedDict()
+
+
+def cached_leaderboard(game: str, path=None, period: str = "all", start: str | None = None):
+    """Return ``(version, json body)`` for a game's top 10, cached per version.
+
+    ``period`` "day" or "week" reads the board of the period starting on
+    ``start`` from period_scores instead of the all-time best_scores.
+    """
+    path = path or scores_db_path()
+    con = get_connection(path)
+    key = (path, game, period, start)
+    version = score_version(con, game)
+    cached = cache_get(LEADERBOARD_CACHE, key)
+    if cached is not None and cached[0] == version:
+        return cached
+    if period == "all":
+        rows = con.execute(
+            "SELECT name, score, created_at FROM best_scores WHERE game = ? ORDER BY score DESC, score_id ASC LIMIT 10",
+            (game,)
+        ).fetchall()
+    else:
+        rows = con.execute(
+            "SELECT name, score, created_at FROM period_scores WHERE game = ? AND period = ? AND period_start = ? "
+            "ORDER BY score DESC, score_id ASC LIMIT 10",
+            (game, period, start)
+        ).fetchall()
+    scores = [
+        {"name": name, "score": int(score), "created_at": created_at}
+        for (name, score, created_at) in rows
+    ]
+    body = {"game": game, "scores": scores}
+    if period != "all":
+        body.update(period=period, period_start=start)
+    entry = (version, app.json.dumps(body))
+    cache_put(LEADERBOARD_CACHE, key, entry)
+    return entry
+
+
+# (db path, games) -> (versions, {game: top 10}, serialized response)
+LEADERBOARDS_CACHE: OrderedDict[tuple[str, tuple[str, ...]], tuple[tuple[int, ...], dict, str]] = OrderedDict()
+MAX_LEADERBOARD_GAMES = 20
+
+
+def cached_leaderboards(games):
+    """Top 10 of several games at once, fetched in one query and cached per version."""
+    games = tuple(games)
+    con = get_connection()
+    key = (scores_db_path(), games)
+    marks = ", ".join("?" * len(games))
+    stored = dict(con.execute(f"SELECT game, version FROM score_versions WHERE game IN ({marks})", games).fetchall())
+    versions = tuple(stored.get(game, 0) for game in games)
+    cached = cache_get(LEADERBOARDS_CACHE, key)
+    if cached is not None and cached[0] == versions:
+        return cached
+    # ROW_NUMBER ranks every player of each game; best_scores holds one row
+    # per player, and the result is only rebuilt when a version moves
+    rows = con.execute(
+        f"""
+        SELECT game, name, score, created_at FROM (
+            SELECT game, name, score, created_at, score_id,
+                   ROW_NUMBER() OVER (PARTITION BY game ORDER BY score DESC, score_id ASC) AS pos
+            FROM best_scores WHERE game IN ({marks})
+        ) WHERE pos <= 10 ORDER BY game, pos
+        """,
+        games,
+    ).fetchall()
+    scores = {game: [] for game in games}
+    for game, name, score, created_at in rows:
+        scores[game].append({"name": name, "score": int(score), "created_at": created_at})
+    entry = (versions, scores, app.json.dumps({"scores": scores}))
+    cache_put(LEADERBOARDS_CACHE, key, entry)
+    return entry
+
+
+def requested_games():
+    """Games named in ``?games=a,b`` (aliases mapped), else every enabled game."""
+    requested = request.args.get('games') or ''
+    if requested.strip():
+        return list(dict.fromkeys(canonical_game_key(g.strip()) for g in requested.split(',') if g.strip()))
+    return [g['game'] for g in get_games() if g['enabled']]
+
+
+@app.route('/api/scores', methods=['GET'])
+def get_all_scores():
+    ensure_scores_db()
+    games = requested_games()
+    if len(games) > MAX_LEADERBOARD_GAMES:
+        return jsonify({"error": f"At most {MAX_LEADERBOARD_GAMES} games"}), 400
+    unknown = [game for game in games if not is_known_game(game)]
+    if unknown:
+        return jsonify({"error": f"Unknown games: {', '.join(unknown)}"}), 404
+    try:
+        versions, _, body = cached_leaderboards(games)
+    except sqlite3.OperationalError:
+        forget_schema()
+        ensure_scores_db()
+        versions, _, body = cached_leaderboards(games)
+    resp = app.response_class(body, mimetype=app.json.mimetype)
+    tag = ",".join(f"{game}:{version}" for game, version in zip(games, versions))
+    resp.set_etag(hashlib.sha1(tag.encode()).hexdigest()[:20])
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
+
+# Live leaderboards.  Each open stream holds one gunicorn thread while it
+# waits, so streams per worker are capped below the thread count (see
+# gunicorn.conf.py) and end after a while to let clients rebalance.
+MAX_SCORE_STREAMS = int(os.environ.get('SCORES_STREAM_MAX', '32'))
+SCORE_STREAM_SECONDS = float(os.environ.get('SCORES_STREAM_SECONDS', '300'))
+SCORE_STREAM_HEARTBEAT = 15.0
+SCORE_FEED_INTERVAL = float(os.environ.get('SCORES_FEED_INTERVAL_MS', '500')) / 1000
+
+
+@app.route('/api/scores/stream', methods=['GET'])
+def stream_scores():
+    ensure_scores_db()
+    games = requested_games()
+    if not games or len(games) > MAX_LEADERBOARD_GAMES:
+        return jsonify({"error": f"Stream between 1 and {MAX_LEADERBOARD_GAMES} games"}), 400
+    unknown = [game for game in games if not is_known_game(game)]
+    if unknown:
+        return jsonify({"error": f"Unknown games: {', '.join(unknown)}"}), 404
+    feed = score_feed.feed_for(scores_db_path(), cached_leaderboard, SCORE_FEED_INTERVAL)
+    try:
+        subscription = feed.subscribe(games, limit=MAX_SCORE_STREAMS)
+    except score_feed.FeedFull:
+        resp = jsonify({"error": "Too many live streams, try again shortly"})
+        resp.headers['Retry-After'] = '5'
+        return resp, 503
+
+    def events():
+        deadline = time.monotonic() + SCORE_STREAM_SECONDS
+        yield "retry: 3000\n\n"
+        # The first wait returns every board straight away
+        updates = subscription.wait(0)
+        while True:
+            for game, version, body in updates:
+                yield f"id: {game}-{version}\nevent: scores\ndata: {body}\n\n"
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            updates = subscription.wait(min(SCORE_STREAM_HEARTBEAT, remaining))
+            if not updates:
+                # Also how a closed connection is noticed
+                yield ": ping\n\n"
+
+    resp = app.response_class(events(), mimetype='text/event-stream')
+    # Runs when the server is done with the response, also if the client left
+    resp.call_on_close(subscription.close)
+    resp.headers['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+# Keyset predicates on the leaderboard order (score DESC, score_id ASC).  Both
+# are a range on idx_best_scores_rank, so a page or a neighbour lookup costs
+# the rows it returns however deep into the table it starts.
+BEHIND_SQL = "score <= ? AND NOT (score = ? AND score_id <= ?)"
+AHEAD_SQL = "score >= ? AND NOT (score = ? AND score_id >= ?)"
+# A run that is not stored yet sorts after every stored run with its score
+UNSTORED_RUN_ID = 2 ** 63 - 1
+MAX_PAGE_SIZE = 100
+MAX_NEIGHBOURS = 10
+
+
+def leaderboard_rows(rows):
+    return [
+        {"name": name, "score": int(score), "created_at": created_at}
+        for (name, score, created_at, _score_id) in rows
+    ]
+
+
+def leaderboard_page(game: str, after=None, limit: int = 10):
+    """Return ``(rows, next cursor)`` for the page after ``(score, score_id)``."""
+    con = get_connection()
+    if after is None:
+        rows = con.execute(
+            "SELECT name, score, created_at, score_id FROM best_scores WHERE game = ? "
+            "ORDER BY score DESC, score_id ASC LIMIT ?",
+            (game, limit)
+        ).fetchall()
+    else:
+        score, score_id = after
+        rows = con.execute(
+            f"SELECT name, score, created_at, score_id FROM best_scores WHERE game = ? AND {BEHIND_SQL} "
+            "ORDER BY score DESC, score_id ASC LIMIT ?",
+            (game, score, score, score_id, limit)
+        ).fetchall()
+    cursor = f"{rows[-1][1]},{rows[-1][3]}" if len(rows) == limit else None
+    return leaderboard_rows(rows), cursor
+
+
+def score_rank(game: str, score: int, score_id: int = UNSTORED_RUN_ID, neighbours: int = 2):
+    """Rank of a run on a game's leaderboard plus the runs right around it.
+
+    Counting the runs ahead walks the index up to the run, so it is O(rank)
+    rather than a scan of the whole board.
+    """
+    con = get_connection()
+    params = (game, score, score, score_id)
+    (ahead,) = con.execute(f"SELECT COUNT(*) FROM best_scores WHERE game = ? AND {AHEAD_SQL}", params).fetchone()
+    above = con.execute(
+        f"SELECT name, score, created_at, score_id FROM best_scores WHERE game = ? AND {AHEAD_SQL} "
+        "ORDER BY score ASC, score_id DESC LIMIT ?",
+        params + (neighbours,)
+    ).fetchall()
+    below = con.execute(
+        f"SELECT name, score, created_at, score_id FROM best_scores WHERE game = ? AND {BEHIND_SQL} "
+        "ORDER BY score DESC, score_id ASC LIMIT ?",
+        params + (neighbours,)
+    ).fetchall()
+    rank = ahead + 1
+    return {
+        "game": game,
+        "score": score,
+        "rank": rank,
+        "qualifies": rank <= 10,
+        "above": leaderboard_rows(reversed(above)),
+        "below": leaderboard_rows(below),
+    }
+
+
+def parse_cursor(value: str):
+    score, _, score_id = value.partition(',')
+    return int(score), int(score_id)
+
+
 @app.route('/api/scores/<game>', methods=['GET'])
 def get_scores(game: str):
-    init_scores_db()
+    ensure_scores_db()
     game = canonical_game_key(game)
-    con = sqlite3.connect(scores_db_path())
+    if not is_known_game(game):
+        return jsonify({"error": "Unknown game"}), 404
+    period = request.args.get('period', 'all')
+    if period not in PERIODS:
+        return jsonify({"error": f"period must be one of {', '.join(PERIODS)}"}), 400
+    start = None
+    if period != 'all':
+        try:
+            day = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        except ValueError:
+            return jsonify({"error": "start must be a date (YYYY-MM-DD)"}), 400
+        # Any day of a week names that week
+        start = period_start(period, day) if day else current_period_start(period)
+        if start > current_period_start(period):
+            # Always empty; refused so they do not take up cache entries
+            return jsonify({"error": "start cannot be in the future"}), 400
+    elif 'after' in request.args or 'limit' in request.args:
+        # Paging deeper than the top 10 skips the cache; each page is a range read
+        try:
+            limit = int(request.args.get('limit', 10))
+            after = parse_cursor(request.args['after']) if request.args.get('after') else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor or limit"}), 400
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+        scores, cursor = leaderboard_page(game, after, limit)
+        return jsonify({"game": game, "scores": scores, "next": cursor})
     try:
-        cur = con.cursor()
-        cur.execute(
-            "SELECT name, score, created_at FROM scores WHERE game = ? ORDER BY score DESC, id ASC LIMIT 10",
-            (game,)
-        )
-        rows = cur.fetchall()
-        scores = [
-            {"name": name, "score": int(score), "created_at": created_at}
-            for (name, score, created_at) in rows
-        ]
-        return jsonify({"game": game, "scores": scores})
-    finally:
-        con.close()
+        version, body = cached_leaderboard(game, period=period, start=start)
+    except sqlite3.OperationalError:
+        # scores table vanished under the guard; set it up again and retry
+        forget_schema()
+        ensure_scores_db()
+        version, body = cached_leaderboard(game, period=period, start=start)
+    resp = app.response_class(body, mimetype=app.json.mimetype)
+    resp.set_etag(f"{game}-{version}" if period == 'all' else f"{game}-{period}-{start}-{version}")
+    # Let browsers keep the body but always revalidate with If-None-Match
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
+@app.route('/api/scores/<game>/rank', methods=['GET'])
+def get_score_rank(game: str):
+    ensure_scores_db()
+    game = canonical_game_key(game)
+    if not is_known_game(game):
+        return jsonify({"error": "Unknown game"}), 404
+    try:
+        neighbours = int(request.args.get('neighbours', 2))
+    except ValueError:
+        return jsonify({"error": "Invalid neighbours"}), 400
+    neighbours = max(0, min(neighbours, MAX_NEIGHBOURS))
+    if request.args.get('score') is not None:
+        try:
+            score = int(request.args['score'])
+        except ValueError:
+            return jsonify({"error": "Invalid score"}), 400
+        if score < 0:
+            return jsonify({"error": "Invalid score"}), 400
+        return jsonify(score_rank(game, score, neighbours=neighbours))
+    name = (request.args.get('name') or '').strip()
+    if not name:
+        return jsonify({"error": "Pass a score or a name"}), 400
+    row = get_connection().execute(
+        "SELECT score, score_id FROM best_scores WHERE game = ? AND name = ?", (game, name)
+    ).fetchone()
+    if row is None:
+        return jsonify({"error": "No score for that player"}), 404
+    result = score_rank(game, int(row[0]), row[1], neighbours=neighbours)
+    result["name"] = name
+    return jsonify(result)
+
 
 @app.route('/api/scores/<game>', methods=['POST'])
 def post_score(game: str):
-    init_scores_db()
+    ensure_scores_db()
     game = canonical_game_key(game)
+    if not is_known_game(game):
+        # Nothing could ever read these rows back
+        return jsonify({"success": False, "error": "Unknown game"}), 404
     data = request.get_json() or {}
     name = (data.get('name') or '').strip() or session.get('user') or 'Guest'
     try:
@@ -388,18 +1027,49 @@ def post_score(game: str):
     if score < 0:
         return jsonify({"success": False, "error": "Invalid score"}), 400
     created_at = datetime.utcnow().isoformat()
-    con = sqlite3.connect(scores_db_path())
-    try:
-        cur = con.cursor()
-        cur.execute(
-            "INSERT INTO scores (game, name, score, created_at) VALUES (?, ?, ?, ?)",
-            (game, name, score, created_at)
-        )
-        con.commit()
-    finally:
-        con.close()
+    SCORE_QUEUE.submit(scores_db_path(), [(game, name, score, created_at)])
+    score_feed.notify(scores_db_path())
     return jsonify({"success": True})
 
+
+@app.route('/api/scores/batch', methods=['POST'])
+def post_scores_batch():
+    # Submissions a client queued while offline, committed together
+    ensure_scores_db()
+    data = request.get_json(silent=True) or {}
+    entries = data.get('scores')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({"success": False, "error": "Missing scores"}), 400
+    if len(entries) > MAX_SCORE_BATCH:
+        return jsonify({"success": False, "error": f"At most {MAX_SCORE_BATCH} scores per batch"}), 400
+    now = datetime.utcnow()
+    fallback_name = session.get('user') or 'Guest'
+    rows = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not isinstance(entry.get('game'), str) or not entry['game']:
+            return jsonify({"success": False, "error": f"Invalid entry {index}"}), 400
+        if not is_known_game(entry['game']):
+            return jsonify({"success": False, "error": f"Unknown game in entry {index}"}), 400
+        try:
+            score = int(entry.get('score', 0))
+        except Exception:
+            return jsonify({"success": False, "error": f"Invalid score in entry {index}"}), 400
+        if score < 0:
+            return jsonify({"success": False, "error": f"Invalid score in entry {index}"}), 400
+        name = str(entry.get('name') or '').strip() or fallback_name
+        # Keep when the game was played, but never a time in the future;
+        # stored times are naive UTC, so an offset is applied, not dropped
+        try:
+            played = datetime.fromisoformat(str(entry['created_at']))
+        except (KeyError, ValueError):
+            played = now
+        if played.tzinfo is not None:
+            played = played.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append((canonical_game_key(entry['game']), name, score, min(played, now).isoformat()))
+    SCORE_QUEUE.submit(scores_db_path(), rows)
+    score_feed.notify(scores_db_path())
+    return jsonify({"success": True, "saved": len(rows)})
+
 @app.route('/admin')
 @login_required
 def admin_page():
@@ -415,6 +1085,55 @@ def admin_page():
         users = []
     return render_template('admin.html', year=SS.year, draw_locked=draw_locked, users=users)
 
+# Password checks run on a bounded pool (see passwords.py) so a burst of
+# logins cannot hold up score posts and page loads.
+PASSWORD_POOL = passwords.PasswordPool(
+    workers=int(os.environ.get('PASSWORD_WORKERS', '1')),
+    max_queue=int(os.environ.get('PASSWORD_QUEUE', '16')),
+    max_failures=int(os.environ.get('PASSWORD_MAX_FAILURES', '5')),
+    window=float(os.environ.get('PASSWORD_FAILURE_WINDOW', '60')),
+)
+
+
+def password_hash_method():
+    # Chosen by /api/admin/password_benchmark; werkzeug's default until then
+    return os.environ.get('PASSWORD_HASH_METHOD') or passwords.DEFAULT_METHOD
+
+
+def save_env_values(values, expected=None):
+    """Write ``values`` to ENV_FILE and tell the other workers.
+
+    With ``expected`` ({key: value}) nothing is written unless the file still
+    holds those values, so a rehash never overwrites a newer password.
+    """
+    with open(ENV_FILE + '.lock', 'a') as lock:
+        # set_key replaces the file, so lock a neighbour instead
+        fcntl.lockf(lock, fcntl.LOCK_EX)
+        if expected:
+            current = dotenv_values(ENV_FILE)
+            if any(current.get(key) != value for key, value in expected.items()):
+                return False
+        for key, value in values.items():
+            set_key(ENV_FILE, key, value)
+    reload_logins()
+    generations.bump(get_data_dir(), "logins")
+    return True
+
+
+def rehash_login(name, stored, code):
+    """Upgrade ``name``'s hash to the configured method after a good login."""
+    method = password_hash_method()
+    if not passwords.needs_rehash(stored, method):
+        return
+    try:
+        hashed = PASSWORD_POOL.hash(code, method)
+    except passwords.PoolBusy:
+        # Busy logging people in; the next login upgrades it
+        return
+    key = f"LOGIN_{name}"
+    save_env_values({key: hashed}, expected={key: stored})
+
+
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -423,7 +1142,15 @@ def login():
 
     if name in logins:
         stored = logins[name]
-        if is_hashed(stored) and check_password_hash(stored, code):
+        try:
+            ok = is_hashed(stored) and PASSWORD_POOL.verify(name, stored, code)
+        except (passwords.PoolBusy, passwords.Throttled) as exc:
+            busy = isinstance(exc, passwords.PoolBusy)
+            resp = jsonify({"success": False, "error": str(exc)})
+            resp.headers['Retry-After'] = str(exc.retry_after)
+            return resp, 503 if busy else 429
+        if ok:
+            rehash_login(name, stored, code)
             session['user'] = name
             # Some tests or env setups may not have a mapping for every login
             recipient = ASSIGNMENTS.get(name) if isinstance(ASSIGNMENTS, dict) else None
@@ -443,14 +1170,50 @@ def admin_set_password():
     # Ensure the admin can only set a password for an existing participant
     if name not in ASSIGNMENTS:
         return jsonify({"success": False, "error": "Unknown user"}), 400
-    hashed = generate_password_hash(passphrase)
-    key = f"LOGIN_{name}"
-    set_key(ENV_FILE, key, hashed)
-    load_dotenv(ENV_FILE, override=True)
-    global logins
-    logins = load_logins_from_env()
+    try:
+        hashed = PASSWORD_POOL.hash(passphrase, password_hash_method())
+    except passwords.PoolBusy as exc:
+        resp = jsonify({"success": False, "error": str(exc)})
+        resp.headers['Retry-After'] = str(exc.retry_after)
+        return resp, 503
+    save_env_values({f"LOGIN_{name}": hashed})
     return jsonify({"success": True, "name": name})
 
+
+@app.route('/api/admin/passwords', methods=['GET'])
+@admin_required
+def admin_password_stats():
+    method = password_hash_method()
+    stale = sorted(
+        name for name, stored in logins.items()
+        if is_hashed(stored) and passwords.needs_rehash(stored, method)
+    )
+    return jsonify({
+        "method": passwords.canonical_method(method),
+        "stale_hashes": stale,
+        "pool": PASSWORD_POOL.stats(),
+    })
+
+
+@app.route('/api/admin/password_benchmark', methods=['POST'])
+@admin_required
+def admin_password_benchmark():
+    data = request.get_json(silent=True) or {}
+    algorithm = data.get('algorithm') or password_hash_method().split(':')[0]
+    try:
+        target_ms = float(data.get('target_ms', 250))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid target_ms"}), 400
+    if not 10 <= target_ms <= 2000:
+        return jsonify({"success": False, "error": "target_ms must be between 10 and 2000"}), 400
+    if algorithm not in ('scrypt', 'pbkdf2'):
+        return jsonify({"success": False, "error": "Unknown algorithm"}), 400
+    # Runs on this request's thread: it takes a few seconds, so not during the reveal
+    result = passwords.benchmark(target_ms, algorithm)
+    if data.get('apply'):
+        save_env_values({'PASSWORD_HASH_METHOD': result['method']})
+    return jsonify({"success": True, "applied": bool(data.get('apply')), **result})
+
 @app.route('/api/admin/run_matches', methods=['POST'])
 @admin_required
 def admin_run_matches():
@@ -462,13 +1225,85 @@ def admin_run_matches():
     if _is_draw_locked():
         return jsonify({"success": False, "error": "Draw locked by server configuration"}), 403
 
+    data = request.get_json(silent=True) or {}
+    lookback = data.get('lookback')
+    if lookback is not None:
+        try:
+            lookback = int(lookback)
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "Invalid lookback"}), 400
+        if lookback < 0:
+            return jsonify({"success": False, "error": "Invalid lookback"}), 400
+        if data.get('single_cycle'):
+            # The weighted draw has no single-cycle mode; never drop it silently
+            return jsonify({"success": False, "error": "single_cycle cannot be combined with lookback"}), 400
     global SS, ASSIGNMENTS
-    SS = SecretSanta(data_dir=get_data_dir())
-    SS.draw()
+    # lookback counts each giver's own past draws, so a weighted draw reads
+    # the whole history and history_costs keeps the last lookback per giver
+    santa = new_santa() if lookback is None else SecretSanta(data_dir=get_data_dir())
+    repeats = []
+    try:
+        if lookback is not None:
+            repeats = santa.draw_weighted(lookback=lookback)
+        else:
+            santa.draw(single_cycle=bool(data.get('single_cycle')))
+    except NoSolutionError as exc:
+        return jsonify({"success": False, "error": str(exc), "blocked": exc.blocked}), 409
+    SS = santa
     SS.save()
     SS.load()
     ASSIGNMENTS = SS.config
-    return jsonify({"success": True, "year": SS.year})
+    generations.bump(get_data_dir(), "matches")
+    # Only a count: admins take part too, so no pairing may show here
+    return jsonify({"success": True, "year": SS.year, "repeats": len(repeats)})
+
+
+@app.route('/api/admin/repair_matches', methods=['POST'])
+@admin_required
+def admin_repair_matches():
+    # Patch the current draw for people joining or leaving; only the givers
+    # that have to move get a new recipient, so this is not a redraw
+    data = request.get_json(silent=True) or {}
+    added = data.get('add') or []
+    removed = data.get('remove') or []
+    if not all(isinstance(name, str) for name in [*added, *removed]):
+        return jsonify({"success": False, "error": "Names must be strings"}), 400
+    added = {name.strip().lower() for name in added if name.strip()}
+    removed = {name.strip().lower() for name in removed if name.strip()}
+    global SS, ASSIGNMENTS
+    santa = new_santa()
+    try:
+        santa.load()
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "No draw to repair"}), 404
+    unknown = removed - set(santa.config)
+    if unknown:
+        return jsonify({"success": False, "error": f"Unknown participants: {', '.join(sorted(unknown))}"}), 400
+    try:
+        changed = santa.repair(added=added, removed=removed)
+    except NoSolutionError as exc:
+        return jsonify({"success": False, "error": str(exc)}), 409
+    SS = santa
+    SS.save()
+    ASSIGNMENTS = SS.config
+    generations.bump(get_data_dir(), "matches")
+    # Givers only: admins take part too, so no recipient may show here
+    return jsonify({"success": True, "year": SS.year, "changed": [pair["giver"] for pair in changed]})
+
+
+@app.route('/api/admin/check_matches', methods=['GET'])
+@admin_required
+def admin_check_matches():
+    # Validate couples.yaml/previous.yaml without drawing or saving anything
+    report = new_santa().check_feasibility()
+    return jsonify({"success": True, **report})
+
+
+@app.route('/api/admin/startup', methods=['GET'])
+@admin_required
+def admin_startup_timings():
+    # The startup log line scrolls away; with preload these are the master's
+    return jsonify({"pid": os.getpid(), "startup_ms": STARTUP_MS})
 
 
 @app.route('/api/admin/games', methods=['GET'])
@@ -501,6 +1336,24 @@ def admin_reset_scores():
     return jsonify({"success": True, "game": canonical_game_key(game)})
 
 
+@app.route('/api/admin/compact_scores', methods=['POST'])
+@admin_required
+def admin_compact_scores():
+    # Archive runs older than keep_days that are nobody's best, then reclaim the space
+    data = request.get_json(silent=True) or {}
+    try:
+        keep_days = int(data.get('keep_days', os.environ.get('SCORES_RETENTION_DAYS', 30)))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid keep_days"}), 400
+    if keep_days < 0:
+        return jsonify({"success": False, "error": "Invalid keep_days"}), 400
+    ensure_scores_db()
+    SCORE_QUEUE.flush(timeout=5)
+    path = scores_db_path()
+    report = compact_scores(path, score_archive_dir(path), keep_days=keep_days)
+    return jsonify({"success": True, **report})
+
+
 @app.route('/api/admin/snapshots', methods=['GET'])
 @admin_required
 def admin_list_snapshots():
@@ -530,17 +1383,64 @@ def admin_restore_snapshot():
         return jsonify({"success": False, "error": "Snapshot not found"}), 404
     except Exception as exc:
         return jsonify({"success": False, "error": str(exc)}), 500
-    global logins, SS, ASSIGNMENTS
-    load_dotenv(ENV_FILE, override=True)
-    logins = load_logins_from_env()
-    SS = SecretSanta(data_dir=get_data_dir())
-    SS.load()
-    ASSIGNMENTS = SS.config
-    init_scores_db()
-    init_games_db()
+    reload_logins()
+    reload_matches()
+    generations.bump(get_data_dir(), "logins")
+    generations.bump(get_data_dir(), "matches")
+    # The restored DB may predate the current schema
+    forget_schema()
+    GAMES_CACHE.clear()
+    ensure_scores_db()
+    ensure_games_db()
     return jsonify({"success": True, "snapshot": name})
 
 
+# Milliseconds per startup phase, for the log, /api/admin/startup and
+# scripts/startup_benchmark.py
+STARTUP_MS = {}
+
+
+def startup():
+    """Load what every worker shares: the logins, the draw and the schema.
+
+    Runs once at import.  With gunicorn's preload (gunicorn.conf.py) that is
+    in the master, and forked workers inherit the loaded state; connections,
+    writer threads and pools are per process and opened on first use.
+    """
+    global SS, ASSIGNMENTS
+    mark = time.perf_counter()
+    STARTUP_MS['module'] = round((mark - IMPORT_STARTED) * 1000, 1)
+
+    def lap(phase):
+        nonlocal mark
+        now = time.perf_counter()
+        STARTUP_MS[phase] = round((now - mark) * 1000, 1)
+        mark = now
+
+    data_dir = get_data_dir()
+    # Before loading, so a change saved meanwhile by another worker is reloaded
+    generations.baseline(data_dir)
+    reload_logins()
+    lap('logins')
+    SS = load_matches()
+    ASSIGNMENTS = SS.config
+    lap('matches')
+    ensure_scores_db()
+    lap('migrations')
+    STARTUP_MS['total'] = round((mark - IMPORT_STARTED) * 1000, 1)
+    app.logger.info("Startup took %.1f ms %s", STARTUP_MS['total'], STARTUP_MS)
+
+
+def warm_up():
+    # Compile every template once in the preloading master instead of on
+    # the first render in each worker
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+startup()
+
+
 if __name__ == '__main__':
     debug_flag = os.environ.get('FLASK_DEBUG', '1')
     app.run(debug=debug_flag not in ('0', 'false', 'False'))
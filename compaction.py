@@ -0,0 +1,178 @@
+"""Score retention: prune old runs, archive them, give the space back.
+
+Every attempt is appended to ``scores``, so the table and its two indexes
+grow all season although the leaderboard only needs each player's best run
+(``best_scores``).  :func:`compact_scores` keeps
+
+- every run that is some player's best (referenced from ``best_scores``),
+- every run that is a player's best of a day or week (referenced from
+  ``period_scores``), so rebuilding the rollups from ``scores`` (as
+  migrations do) never rewrites a closed period's board,
+- every run newer than ``keep_days``,
+
+and moves the rest to ``<archive_dir>/scores-<season>.jsonl.gz``, one JSON
+line per run, appended as an extra gzip member so earlier archives stay
+intact.  Runs are archived and fsynced before they are deleted, so a crash
+can at worst leave a run both archived and in the table; a later pass then
+archives it again and the ``id`` tells the copies apart.
+
+Nothing holds the write lock for long.  Archiving happens outside any
+transaction, the deletes run ``chunk`` runs per transaction (re-checking
+``best_scores`` and ``period_scores``), and free pages are returned ``vacuum_pages`` at a time
+with ``PRAGMA incremental_vacuum``, pausing between steps.  Databases
+created before incremental auto-vacuum was enabled need one full
+``VACUUM`` to switch; that only happens automatically below
+``convert_max_bytes``.  ``ANALYZE`` runs last, on the shrunken tables.
+"""
+
+import gzip
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from db import get_connection
+
+DEFAULT_KEEP_DAYS = 30
+
+
+def _db_bytes(con):
+    (pages,) = con.execute("PRAGMA page_count").fetchone()
+    (size,) = con.execute("PRAGMA page_size").fetchone()
+    return pages * size
+
+
+def _ms(con, sql, params=(), repeat=5):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        con.execute(sql, params).fetchall()
+        runs.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(runs), 3)
+
+
+def query_timings(con):
+    """Median milliseconds for the queries that read ``scores``."""
+    row = con.execute("SELECT game, name FROM scores ORDER BY id DESC LIMIT 1").fetchone()
+    game, name = row if row else ("", "")
+    return {
+        "leaderboard": _ms(
+            con,
+            "SELECT name, score, created_at FROM best_scores WHERE game = ? "
+            "ORDER BY score DESC, score_id ASC LIMIT 10",
+            (game,),
+        ),
+        "player_runs": _ms(con, "SELECT score, created_at FROM scores WHERE game = ? AND name = ?", (game, name)),
+        "runs_per_game": _ms(con, "SELECT game, COUNT(*), MAX(score) FROM scores GROUP BY game"),
+    }
+
+
+def _archive(archive_dir, rows):
+    by_season = {}
+    for row in rows:
+        by_season.setdefault(str(row[4])[:4] or "unknown", []).append(row)
+    paths = []
+    for season, runs in sorted(by_season.items()):
+        path = os.path.join(archive_dir, f"scores-{season}.jsonl.gz")
+        lines = "".join(
+            json.dumps({"id": id_, "game": game, "name": name, "score": score, "created_at": created_at}) + "\n"
+            for (id_, game, name, score, created_at) in runs
+        )
+        with open(path, "ab") as fh:
+            fh.write(gzip.compress(lines.encode("utf-8"), compresslevel=6))
+            fh.flush()
+            os.fsync(fh.fileno())
+        paths.append(path)
+    return paths
+
+
+def compact_scores(
+    path,
+    archive_dir,
+    keep_days=DEFAULT_KEEP_DAYS,
+    batch=5000,
+    chunk=500,
+    vacuum_pages=256,
+    pause=0.01,
+    convert_max_bytes=64 * 1024 * 1024,
+    now=None,
+):
+    """Archive and delete old runs in ``path``; return a report dict."""
+    started = time.perf_counter()
+    con = get_connection(path)
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=keep_days)).isoformat()
+    os.makedirs(archive_dir, exist_ok=True)
+    bytes_before = _db_bytes(con)
+    timings_before = query_timings(con)
+
+    delete_started = time.perf_counter()
+    archived = 0
+    archives = set()
+    last_id = 0
+    while True:
+        rows = con.execute(
+            "SELECT id, game, name, score, created_at FROM scores "
+            "WHERE id > ? AND created_at < ? AND id NOT IN (SELECT score_id FROM best_scores) "
+            "AND id NOT IN (SELECT score_id FROM period_scores) "
+            "ORDER BY id LIMIT ?",
+            (last_id, cutoff, batch),
+        ).fetchall()
+        if not rows:
+            break
+        archives.update(_archive(archive_dir, rows))
+        for start in range(0, len(rows), chunk):
+            ids = [row[0] for row in rows[start:start + chunk]]
+            with con:
+                deleted = con.execute(
+                    "DELETE FROM scores WHERE id IN (SELECT value FROM json_each(?)) "
+                    "AND id NOT IN (SELECT score_id FROM best_scores) "
+                    "AND id NOT IN (SELECT score_id FROM period_scores)",
+                    (json.dumps(ids),),
+                ).rowcount
+            archived += deleted
+            time.sleep(pause)
+        last_id = rows[-1][0]
+    delete_seconds = time.perf_counter() - delete_started
+
+    (mode,) = con.execute("PRAGMA auto_vacuum").fetchone()
+    vacuum = "incremental"
+    if mode != 2:
+        if bytes_before <= convert_max_bytes:
+            # One full rebuild switches the file to incremental auto-vacuum
+            con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            con.execute("VACUUM")
+            vacuum = "converted"
+        else:
+            vacuum = "skipped"
+    if vacuum == "incremental":
+        free = con.execute("PRAGMA freelist_count").fetchone()[0]
+        while free:
+            # executescript steps the pragma to completion; execute() frees one page
+            con.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+            left = con.execute("PRAGMA freelist_count").fetchone()[0]
+            if left >= free:
+                break
+            free = left
+            time.sleep(pause)
+    # A full ANALYZE: sampled statistics made the planner pick a worse index
+    con.executescript("ANALYZE scores; ANALYZE best_scores;")
+    con.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    bytes_after = _db_bytes(con)
+    (kept,) = con.execute("SELECT COUNT(*) FROM scores").fetchone()
+    return {
+        "archived": archived,
+        "kept": kept,
+        "cutoff": cutoff,
+        "archives": sorted(archives),
+        "vacuum": vacuum,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_reclaimed": bytes_before - bytes_after,
+        "timings_ms": {"before": timings_before, "after": query_timings(con)},
+        "seconds": {
+            "delete": round(delete_seconds, 3),
+            "total": round(time.perf_counter() - started, 3),
+        },
+    }
@@ -0,0 +1,108 @@
+"""Cached loading of ``couples.yaml`` and ``previous.yaml``.
+
+Parsing YAML is by far the slowest part of building a :class:`SecretSanta`,
+and the app builds one on import, on every draw and on every snapshot
+restore.  :func:`load_yaml` keeps the parsed document per path and only
+re-reads the file when its mtime or size changes.  With a sidecar enabled
+(``sidecar=True`` or ``CONSTRAINTS_SIDECAR=1``) the parsed document is also
+written next to the YAML as ``.<name>.marshal`` so a fresh process skips the
+YAML parser too; a stale or unreadable sidecar is simply ignored.
+
+:func:`compile_constraints` memoises the compiled :class:`Eligibility` for
+the same parsed objects.  Cached documents are shared between callers, so
+treat them as read-only and assign new objects instead of editing in place.
+"""
+
+import marshal
+import os
+
+import yaml
+
+from solver import Eligibility
+
+# libyaml's loader is an order of magnitude faster when PyYAML was built with it
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_SIDECAR_FORMAT = 1
+_COMPILED_LIMIT = 8
+_parsed = {}
+_compiled = {}
+
+
+def _sidecar_enabled(sidecar):
+    if sidecar is not None:
+        return sidecar
+    return str(os.environ.get("CONSTRAINTS_SIDECAR", "")).lower() in ("1", "true", "yes", "on")
+
+
+def sidecar_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.marshal")
+
+
+def _read_sidecar(path, signature):
+    try:
+        with open(sidecar_path(path), "rb") as f:
+            header, data = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if header != (_SIDECAR_FORMAT, marshal.version, *signature):
+        return None
+    return data
+
+
+def _write_sidecar(path, signature, data):
+    target = sidecar_path(path)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            marshal.dump(((_SIDECAR_FORMAT, marshal.version, *signature), data), f)
+        os.replace(tmp, target)
+    except (OSError, ValueError):
+        # The sidecar is only an accelerator; a read-only checkout is fine
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load_yaml(path, sidecar=None):
+    """Return the parsed YAML at ``path``, re-parsing only when it changed."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _parsed.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    use_sidecar = _sidecar_enabled(sidecar)
+    data = _read_sidecar(path, signature) if use_sidecar else None
+    if data is None:
+        with open(path, "r") as f:
+            data = yaml.load(f, Loader=_Loader)
+        if use_sidecar:
+            _write_sidecar(path, signature, data)
+    _parsed[path] = (signature, data)
+    return data
+
+
+def compile_constraints(names, couples, previous):
+    """Return the :class:`Eligibility` for these constraints, built once.
+
+    Hits require the very same ``couples`` and ``previous`` objects, which is
+    what :func:`load_yaml` hands out until a file changes.
+    """
+    names = frozenset(names)
+    key = (id(couples), id(previous))
+    entry = _compiled.get(key)
+    if entry is not None and entry[0] is couples and entry[1] is previous and entry[2] == names:
+        return entry[3]
+    eligibility = Eligibility.from_constraints(names, couples, previous)
+    if len(_compiled) >= _COMPILED_LIMIT:
+        _compiled.pop(next(iter(_compiled)))
+    # Holding on to the objects keeps their ids from being reused
+    _compiled[key] = (couples, previous, names, eligibility)
+    return eligibility
+
+
+def clear_cache():
+    _parsed.clear()
+    _compiled.clear()
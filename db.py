@@ -0,0 +1,159 @@
+"""Pooled SQLite connections, one per thread and database file.
+
+Opening a connection costs a file open, a schema parse and a cold page
+cache, which used to be paid on every request.  :func:`get_connection`
+keeps one tuned connection per thread (gunicorn's gthread workers serve
+requests from a handful of long-lived threads) and hands it back on every
+call:
+
+- ``journal_mode=WAL`` so readers never wait for the score writers,
+- ``synchronous=NORMAL``, which is durable across application crashes and
+  only risks the last transactions on power loss,
+- ``busy_timeout`` so concurrent writers from other workers queue up
+  instead of failing with "database is locked",
+- a larger prepared-statement cache (``cached_statements``).
+
+Use ``with con:`` around writes so they commit, or roll back on error.
+Schema setup goes through :func:`ensure_schema`, which runs it once per
+process and database file instead of on every request.
+Connections are dropped after a fork (they must not cross processes) and
+when the file on disk is replaced, and :func:`close_all` closes every
+connection of this process on shutdown.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+
+from storage import scores_db_path
+
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 256
+# Tests point the app at many short-lived files; don't hold them all open
+MAX_PER_THREAD = 8
+
+_local = threading.local()
+_registry = set()
+_registry_lock = threading.Lock()
+_pid = os.getpid()
+# Bumped by close_all so other threads drop the connections it closed
+_generation = 0
+# (path, file id, name) of schemas already set up in this process
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def _file_id(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def _open(path):
+    con = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=False,
+    )
+    con.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    con.execute("PRAGMA journal_mode = WAL")
+    con.execute("PRAGMA synchronous = NORMAL")
+    return con
+
+
+def _close(con):
+    with _registry_lock:
+        _registry.discard(con)
+    try:
+        con.close()
+    except sqlite3.Error:
+        pass
+
+
+def _reset_after_fork():
+    # Inherited connections belong to the parent; forget them without
+    # closing so the parent's handles and locks are left alone
+    global _pid, _local
+    _pid = os.getpid()
+    _local = threading.local()
+    with _registry_lock:
+        _registry.clear()
+
+
+def get_connection(path=None):
+    """Return this thread's pooled connection to ``path`` (default: scores DB)."""
+    if os.getpid() != _pid:
+        _reset_after_fork()
+    path = os.path.abspath(path or scores_db_path())
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = {}
+    entry = pool.pop(path, None)
+    if entry is not None:
+        con, file_id, generation = entry
+        if generation != _generation:
+            entry = None
+        elif file_id is None or file_id != _file_id(path):
+            # Deleted or swapped out underneath us
+            _close(con)
+            entry = None
+    if entry is None:
+        con = _open(path)
+        entry = (con, _file_id(path), _generation)
+        with _registry_lock:
+            _registry.add(con)
+    # Re-inserting keeps the dict in least-recently-used order
+    pool[path] = entry
+    while len(pool) > MAX_PER_THREAD:
+        _close(pool.pop(next(iter(pool)))[0])
+    return entry[0]
+
+
+def close_all():
+    """Close every pooled connection of this process (worker shutdown)."""
+    global _generation
+    if os.getpid() != _pid:
+        _reset_after_fork()
+        return
+    with _registry_lock:
+        connections = list(_registry)
+        _registry.clear()
+        _generation += 1
+    for con in connections:
+        try:
+            con.close()
+        except sqlite3.Error:
+            pass
+    _local.pool = {}
+
+
+
+def ensure_schema(name, init, path=None):
+    """Run ``init()`` once per process for each database file.
+
+    The guard is keyed on the file's identity, so a database that is deleted
+    or replaced gets its schema set up again on the next call.
+    """
+    path = os.path.abspath(path or scores_db_path())
+    if (path, _file_id(path), name) in _schema_ready:
+        return
+    with _schema_lock:
+        if (path, _file_id(path), name) in _schema_ready:
+            return
+        init()
+        _schema_ready.add((path, _file_id(path), name))
+
+
+def forget_schema(path=None):
+    """Make the next :func:`ensure_schema` call for ``path`` run again."""
+    path = os.path.abspath(path or scores_db_path())
+    with _schema_lock:
+        for key in [key for key in _schema_ready if key[0] == path]:
+            _schema_ready.discard(key)
+
+
+atexit.register(close_all)
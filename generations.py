@@ -0,0 +1,107 @@
+"""Generation counters that tell workers when shared state changed.
+
+Admin endpoints replace in-memory state (the current draw, the login
+hashes) in the worker that served them only.  Each piece of state has a
+64-bit counter in a small memory-mapped file in DATA_DIR: whoever saves new
+state bumps its counter, and every worker compares the counters with the
+ones it last loaded at the start of each request.  That check is a read
+from shared memory, so workers reload only what actually moved instead of
+re-reading files on every request.
+
+Bumps are serialised with a thread lock inside each worker (gthread
+workers serve many requests at once) and with ``lockf`` between workers;
+``lockf`` locks belong to the process, so on their own they would let two
+threads of one worker bump to the same value.  The first time a worker looks
+at a directory it takes the current counters as its baseline.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+
+SLOTS = {"matches": 0, "logins": 1}
+FILENAME = ".state-generations"
+_SIZE = 64  # eight slots; only grows by adding names to SLOTS
+_COUNTER = struct.Struct("<Q")
+
+_files = {}
+_seen = {}
+# Guards _files and _seen; request threads check and mark concurrently
+_lock = threading.Lock()
+
+
+class Generations:
+    """Counters in one mapped file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < _SIZE:
+            os.ftruncate(self._fd, _SIZE)
+        self._map = mmap.mmap(self._fd, _SIZE)
+        self._bump_lock = threading.Lock()
+
+    def get(self, name):
+        return _COUNTER.unpack_from(self._map, SLOTS[name] * _COUNTER.size)[0]
+
+    def snapshot(self):
+        return {name: self.get(name) for name in SLOTS}
+
+    def bump(self, name):
+        offset = SLOTS[name] * _COUNTER.size
+        with self._bump_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                value = _COUNTER.unpack_from(self._map, offset)[0] + 1
+                _COUNTER.pack_into(self._map, offset, value)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        return value
+
+
+def generations_for(data_dir):
+    path = os.path.join(data_dir, FILENAME)
+    files = _files.get(path)
+    if files is None:
+        with _lock:
+            files = _files.get(path)
+            if files is None:
+                files = _files[path] = Generations(path)
+    return files
+
+
+def baseline(data_dir):
+    """Treat the current counters as loaded; call before loading the state."""
+    current = generations_for(data_dir).snapshot()
+    with _lock:
+        _seen[data_dir] = current
+
+
+def changed(data_dir):
+    """Return ``{name: generation}`` for state that moved since it was loaded."""
+    current = generations_for(data_dir).snapshot()
+    with _lock:
+        seen = _seen.get(data_dir)
+        if seen is None:
+            _seen[data_dir] = current
+            return {}
+        return {name: value for name, value in current.items() if seen.get(name) != value}
+
+
+def mark_loaded(data_dir, name, generation):
+    with _lock:
+        _seen.setdefault(data_dir, {})[name] = generation
+
+
+def bump(data_dir, name):
+    """Record that ``name`` was saved; this worker already holds the new state."""
+    value = generations_for(data_dir).bump(name)
+    # If another worker saved in between, its copy may be the newer one, so
+    # leave this worker to reload on its next request
+    with _lock:
+        seen = _seen.setdefault(data_dir, {})
+        if seen.get(name) == value - 1:
+            seen[name] = value
+    return value
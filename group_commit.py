@@ -0,0 +1,180 @@
+"""Group commit for small, frequent SQLite writes.
+
+When a whole room finishes a round at once, committing every score on its
+own serialises the requests on the SQLite write lock and pays one fsync per
+submission.  :class:`GroupCommitQueue` hands submissions to one writer
+thread per process, which waits ``window`` seconds for more to arrive and
+then commits everything for a database file in a single transaction.
+
+Callers choose what "accepted" means (see :data:`DURABILITY_MODES`):
+
+- ``group``  – wait until the batch containing the submission committed,
+- ``async``  – return as soon as it is queued (write-behind; a crash loses
+  at most the last window of submissions),
+- ``direct`` – skip the queue and commit in the calling thread.
+
+A batch that fails is retried one submission at a time so a single bad
+submission cannot take the others down with it.  Pending work is flushed
+by :meth:`GroupCommitQueue.close`, which runs at exit and from the gunicorn
+``worker_exit`` hook via :func:`close_all`.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from db import get_connection
+
+DURABILITY_MODES = ("group", "async", "direct")
+
+logger = logging.getLogger(__name__)
+_queues = []
+
+
+class _Ticket:
+    __slots__ = ("path", "items", "done", "error")
+
+    def __init__(self, path, items):
+        self.path = path
+        self.items = items
+        self.done = threading.Event()
+        self.error = None
+
+
+class GroupCommitQueue:
+    """Batch ``write(con, items)`` calls per database file."""
+
+    def __init__(self, write, window=0.005, max_batch=500, mode="group"):
+        if mode not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {mode!r}")
+        self.write = write
+        self.window = window
+        self.max_batch = max_batch
+        self.mode = mode
+        self._reset()
+        _queues.append(self)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._size = 0
+        self._inflight = 0
+        self._closing = False
+        self._thread = None
+
+    def _ensure_thread(self):
+        # Called with the condition held.  Threads do not survive fork, so a
+        # worker forked from a preloaded master starts its own.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+
+    def submit(self, path, items):
+        """Queue ``items`` for the database at ``path``.
+
+        Blocks until they are committed in ``group`` mode (re-raising the
+        write's error), returns at once in ``async`` mode.
+        """
+        items = list(items)
+        if self.mode == "direct":
+            con = get_connection(path)
+            with con:
+                self.write(con, items)
+            return
+        if os.getpid() != self._pid:
+            self._reset()
+        ticket = _Ticket(path, items)
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Score queue is shut down")
+            self._pending.append(ticket)
+            self._size += len(items)
+            self._ensure_thread()
+            self._cond.notify_all()
+        if self.mode == "group":
+            ticket.done.wait()
+            if ticket.error is not None:
+                raise ticket.error
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._closing:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            deadline = time.monotonic() + self.window
+            while self._size < self.max_batch and not self._closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending, self._size = self._pending, [], 0
+            self._inflight += 1
+            return batch
+
+    def _commit(self, path, tickets):
+        con = get_connection(path)
+        try:
+            with con:
+                for ticket in tickets:
+                    self.write(con, ticket.items)
+            return
+        except Exception:
+            if len(tickets) == 1:
+                raise
+        for ticket in tickets:
+            try:
+                self._commit(path, [ticket])
+            except Exception as exc:
+                ticket.error = exc
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            by_path = {}
+            for ticket in batch:
+                by_path.setdefault(ticket.path, []).append(ticket)
+            for path, tickets in by_path.items():
+                try:
+                    self._commit(path, tickets)
+                except Exception as exc:
+                    for ticket in tickets:
+                        ticket.error = ticket.error or exc
+            for ticket in batch:
+                if ticket.error is not None and self.mode == "async":
+                    logger.error("Dropped %d queued writes: %s", len(ticket.items), ticket.error)
+                ticket.done.set()
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is committed."""
+        if os.getpid() != self._pid:
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._inflight, timeout)
+
+    def close(self, timeout=10):
+        """Flush pending writes and stop the writer thread."""
+        if os.getpid() != self._pid:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+def close_all():
+    for queue in list(_queues):
+        queue.close()
+
+
+atexit.register(close_all)
@@ -0,0 +1,67 @@
+# Picked up automatically by `gunicorn app:app` from the working directory.
+# Command-line flags (e.g. the Dockerfile's `-w 4`) still take precedence.
+import logging
+import os
+
+# gunicorn only sets up its own loggers, so records from the app's modules
+# (migration and startup timings among them) would be dropped.  Send them to
+# stderr next to gunicorn's error log; this runs before the app is loaded.
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+logging.basicConfig(
+    level=loglevel.upper(),
+    format="%(asctime)s [%(process)d] [%(levelname)s] %(name)s: %(message)s",
+    datefmt="[%Y-%m-%d %H:%M:%S %z]",
+)
+
+# Threaded workers: an idle /api/scores/stream connection then costs a
+# blocked thread instead of a whole sync worker.  The price is per thread,
+# times the worker count (the Dockerfile runs 4): every thread that serves a
+# request keeps its own pooled SQLite connection (db.py), and a login waits
+# on the worker's password pool, which hashes on PASSWORD_WORKERS threads and
+# turns logins away beyond PASSWORD_QUEUE however many threads are waiting.
+# The games have tens of viewers at a time, so 48 threads leave 16 for
+# ordinary requests next to SCORES_STREAM_MAX (32) streams per worker; keep
+# GUNICORN_THREADS above SCORES_STREAM_MAX when raising either.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "48"))
+
+# Import the app once in the master (migrations, the draw, .env, compiled
+# templates) and fork the workers from it, so they start in milliseconds and
+# share those pages copy-on-write.  GUNICORN_PRELOAD=0 imports per worker.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1").lower() not in ("0", "false", "no")
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        import app
+
+        app.warm_up()
+
+
+def pre_fork(server, worker):
+    import gc
+
+    import db
+
+    # The master is done with the database once the app is loaded
+    db.close_all()
+    # Move everything loaded so far out of the collector's reach: collections
+    # in the workers would otherwise touch, and so copy, every shared page
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Never share SQLite handles opened before the fork
+    import db
+
+    db.close_all()
+
+
+def worker_exit(server, worker):
+    # Commit queued score submissions, then close pooled connections so
+    # WAL is checkpointed on shutdown
+    import db
+    import group_commit
+
+    group_commit.close_all()
+    db.close_all()
@@ -0,0 +1,147 @@
+"""Every year's draw in one SQLite table, ``DATA_DIR/history.sqlite3``.
+
+``previous.yaml`` and the ``secret-santa-<year>.json`` files are folded in
+once (:func:`import_history`); after that :meth:`SecretSanta.save` records
+each new draw and :func:`recent_pairs` answers "who gave to whom in the last
+N years" straight from the ``(year, giver)`` primary key.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+from db import get_connection
+
+DRAWS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS draws (
+    year INTEGER NOT NULL,
+    giver TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    PRIMARY KEY (year, giver)
+) WITHOUT ROWID
+"""
+
+HISTORY_META_SQL = """
+CREATE TABLE IF NOT EXISTS history_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+)
+"""
+
+_MATCH_FILE = re.compile(r"^secret-santa-(\d{4})\.json$")
+# (path, version, before, years) -> pairs; the same dict is handed out until
+# the next write bumps the version, so compiled constraints can be reused
+_pairs_cache = {}
+
+
+def has_history(path):
+    if not os.path.exists(path):
+        return False
+    con = get_connection(path)
+    row = con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='draws'").fetchone()
+    return bool(row) and con.execute("SELECT 1 FROM draws LIMIT 1").fetchone() is not None
+
+
+def _write_years(path, years):
+    # years: {year: {giver: recipient}}, each year replaced as a whole
+    con = get_connection(path)
+    with con:
+        con.execute(DRAWS_TABLE_SQL)
+        con.execute(HISTORY_META_SQL)
+        for year, config in years.items():
+            con.execute("DELETE FROM draws WHERE year = ?", (year,))
+            con.executemany(
+                "INSERT INTO draws (year, giver, recipient) VALUES (?, ?, ?)",
+                [(year, giver, recipient) for giver, recipient in config.items()],
+            )
+        con.execute(
+            "INSERT INTO history_meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+
+def record_draw(path, year, config):
+    """Store (or replace) the assignment for ``year``."""
+    _write_years(path, {int(year): config})
+
+
+def recorded_years(path):
+    if not has_history(path):
+        return []
+    rows = get_connection(path).execute("SELECT DISTINCT year FROM draws ORDER BY year").fetchall()
+    return [row[0] for row in rows]
+
+
+def recent_pairs(path, before, years=None):
+    """Return ``{giver: [recipients, oldest first]}`` for draws before ``before``.
+
+    Only the last ``years`` years count when given.  The result is cached
+    until the history is written again; treat it as read-only.
+    """
+    since = before - years if years is not None else -1
+    con = get_connection(path)
+    version = con.execute("SELECT value FROM history_meta WHERE key = 'version'").fetchone()
+    key = (path, version, before, years)
+    cached = _pairs_cache.get(key)
+    if cached is not None:
+        return cached
+    rows = con.execute(
+        "SELECT giver, recipient FROM draws WHERE year < ? AND year >= ? ORDER BY year",
+        (before, since),
+    ).fetchall()
+    pairs = {}
+    for giver, recipient in rows:
+        pairs.setdefault(giver, []).append(recipient)
+    _pairs_cache.clear()
+    _pairs_cache[key] = pairs
+    return pairs
+
+
+def _match_files(match_dirs):
+    found = {}
+    for directory in match_dirs:
+        if not directory or not os.path.isdir(directory):
+            continue
+        for candidate in Path(directory).iterdir():
+            match = _MATCH_FILE.match(candidate.name)
+            if match and candidate.is_file():
+                # Earlier directories win, like ensure_match_file's fallback
+                found.setdefault(int(match.group(1)), candidate)
+    return found
+
+
+def import_history(path, previous=None, match_dirs=(), names=None, skip_year=None):
+    """Fold ``previous`` and the match files in ``match_dirs`` into the store.
+
+    ``previous`` lists each giver's past recipients, oldest first, for the
+    years before the earliest match file; a tail that repeats what the match
+    files already hold is dropped.  Only givers in ``names`` are imported
+    when given, and ``skip_year`` (the year being drawn) is left out.
+    Returns the years written.
+    """
+    years = {}
+    for year, candidate in sorted(_match_files(match_dirs).items()):
+        if year == skip_year:
+            continue
+        try:
+            with open(candidate, "r") as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(config, dict):
+            years[year] = {g: r for g, r in config.items() if names is None or g in names}
+    first_year = min(years) if years else (skip_year or 0)
+    for giver, past in (previous or {}).items():
+        if names is not None and giver not in names:
+            continue
+        past = list(past or ())
+        later = [years[year][giver] for year in sorted(years) if giver in years[year]]
+        for overlap in range(min(len(past), len(later)), 0, -1):
+            if past[-overlap:] == later[:overlap]:
+                past = past[:-overlap]
+                break
+        for age, recipient in enumerate(reversed(past), start=1):
+            years.setdefault(first_year - age, {})[giver] = recipient
+    _write_years(path, years)
+    return sorted(years)
@@ -0,0 +1,96 @@
+"""Versioned schema migrations with a ledger in the database itself.
+
+Each step is ``(version, name, apply)`` where ``apply(con)`` changes the
+schema or data through ``con`` without committing.  :func:`run` records
+applied steps in ``schema_migrations``, so every step runs once per
+database file:
+
+- when the ledger already lists every step (the usual boot) it costs one
+  small query,
+- otherwise it takes an exclusive ``lockf`` lock on ``<db>-lock`` so workers
+  that start together wait for the first one instead of racing it, re-reads
+  the ledger, and applies all pending steps on one connection in one
+  ``BEGIN IMMEDIATE`` transaction; if a step fails none of them stick.
+
+Every applied step is logged and stored with its duration.  Databases that
+predate the ledger run all steps once, so steps must be idempotent against
+any schema an older release left behind.
+"""
+
+import fcntl
+import logging
+import sqlite3
+import time
+from datetime import datetime
+
+from db import get_connection
+
+logger = logging.getLogger(__name__)
+
+LEDGER_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL,
+    duration_ms REAL NOT NULL
+)
+"""
+
+
+def applied_versions(con):
+    try:
+        return {version for (version,) in con.execute("SELECT version FROM schema_migrations")}
+    except sqlite3.OperationalError:
+        # No ledger yet
+        return set()
+
+
+def _pending(con, steps):
+    applied = applied_versions(con)
+    return [step for step in steps if step[0] not in applied]
+
+
+def run(path, steps, before=None):
+    """Apply the pending ``steps`` to the database at ``path``.
+
+    ``before(con)`` runs under the lock but outside the transaction, and only
+    when something is pending (for statements like ``VACUUM``).  Returns
+    ``[(version, name, milliseconds)]`` of the steps applied here.
+    """
+    versions = [step[0] for step in steps]
+    if versions != sorted(set(versions)):
+        raise ValueError("Migration versions must be unique and increasing")
+    con = get_connection(path)
+    if not _pending(con, steps):
+        return []
+    started = time.perf_counter()
+    with open(f"{path}-lock", "a") as lock:
+        fcntl.lockf(lock, fcntl.LOCK_EX)
+        pending = _pending(con, steps)
+        if not pending:
+            # Another worker got there first
+            return []
+        if before is not None:
+            before(con)
+        applied = []
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.execute(LEDGER_SQL)
+            for version, name, apply in pending:
+                step_started = time.perf_counter()
+                apply(con)
+                ms = (time.perf_counter() - step_started) * 1000
+                con.execute(
+                    "INSERT INTO schema_migrations (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+                    (version, name, datetime.utcnow().isoformat(), round(ms, 3)),
+                )
+                applied.append((version, name, round(ms, 3)))
+                logger.info("Migration %d (%s) on %s took %.1f ms", version, name, path, ms)
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+    logger.info(
+        "Applied %d migration(s) to %s in %.1f ms", len(applied), path, (time.perf_counter() - started) * 1000
+    )
+    return applied
@@ -0,0 +1,238 @@
+"""Password hashing off the request threads, with back-pressure.
+
+A login check runs scrypt or PBKDF2 on purpose slowly, so when everyone logs
+in at the reveal the checks alone can keep every core busy and score posts
+and page loads queue behind them.  :class:`PasswordPool` runs the hashing on
+a small, fixed number of threads (``hashlib`` releases the GIL while it
+hashes, so the request threads keep serving everything else) and bounds the
+backlog:
+
+- at most ``workers`` hashes run at once and ``max_queue`` more may wait;
+  beyond that :class:`PoolBusy` is raised straight away,
+- a name with ``max_failures`` wrong passwords within ``window`` seconds, or
+  with a check already in flight, gets :class:`Throttled`,
+- hash and queue-wait latencies of the last ``samples`` jobs are kept for
+  :meth:`PasswordPool.stats`.
+
+Limits are per worker process; each pool notices a fork and starts over.
+:func:`benchmark` picks hash parameters that meet a target verification time
+on the machine it runs on, and :func:`needs_rehash` tells whether a stored
+hash was made with other parameters than the configured ones.
+"""
+
+import math
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt"
+# Never suggest anything cheaper than this, whatever the target
+MIN_PBKDF2_ITERATIONS = 100_000
+# scrypt needs 128 * n * 8 bytes per running hash: 16 MB up to 64 MB
+SCRYPT_COSTS = tuple(2 ** exp for exp in range(14, 17))
+
+
+class PoolBusy(Exception):
+    """Raised when the queue of waiting hashes is full."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Password checks are queued, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Throttled(Exception):
+    """Raised when a name failed too often recently or is already being checked."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many attempts, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def canonical_method(method):
+    """Spell out werkzeug's defaults, e.g. ``pbkdf2`` -> ``pbkdf2:sha256:1000000``."""
+    parts = (method or DEFAULT_METHOD).split(":")
+    if parts[0] == "pbkdf2":
+        hash_name = parts[1] if len(parts) > 1 else "sha256"
+        iterations = parts[2] if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{int(iterations)}"
+    if parts[0] == "scrypt":
+        n, r, p = (parts[1:] + ["32768", "8", "1"][len(parts) - 1:])[:3]
+        return f"scrypt:{int(n)}:{int(r)}:{int(p)}"
+    return method
+
+
+def needs_rehash(stored, method):
+    return stored.split("$", 1)[0] != canonical_method(method)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PasswordPool:
+    def __init__(self, workers=1, max_queue=16, max_failures=5, window=60.0, samples=256):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_failures = max_failures
+        self.window = window
+        self.samples = samples
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self._checking = set()
+        self._failures = {}
+        self._hash_ms = deque(maxlen=self.samples)
+        self._wait_ms = deque(maxlen=self.samples)
+        self._counts = {"verified": 0, "rejected": 0, "hashed": 0, "busy": 0, "throttled": 0}
+
+    def _submit(self, fn, *args):
+        # Called with self._lock held
+        if self._pending >= self.workers + self.max_queue:
+            self._counts["busy"] += 1
+            per_job = statistics.median(self._hash_ms) / 1000 if self._hash_ms else 0.1
+            raise PoolBusy(max(1, math.ceil(self._pending * per_job / self.workers)))
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password")
+        self._pending += 1
+        return self._executor.submit(self._timed, time.perf_counter(), fn, *args)
+
+    def _timed(self, queued, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._pending -= 1
+                self._wait_ms.append((started - queued) * 1000)
+                self._hash_ms.append((finished - started) * 1000)
+
+    def _retry_after(self, name, now):
+        failures = self._failures.get(name)
+        if not failures:
+            return 0
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[name]
+            return 0
+        if len(failures) < self.max_failures:
+            return 0
+        return max(1, math.ceil(failures[0] + self.window - now))
+
+    def verify(self, name, stored, password):
+        """Check ``password`` against ``stored`` for ``name`` on the pool.
+
+        Raises :class:`Throttled` or :class:`PoolBusy` instead of queueing.
+        """
+        if os.getpid() != self._pid:
+            self._reset()
+        with self._lock:
+            now = time.monotonic()
+            retry_after = self._retry_after(name, now)
+            if retry_after or name in self._checking:
+                self._counts["throttled"] += 1
+                raise Throttled(retry_after or 1)
+            future = self._submit(check_password_hash, stored, password)
+            self._checking.add(name)
+        try:
+            ok = future.result()
+        finally:
+            with self._lock:
+                self._checking.discard(name)
+        with self._lock:
+            if ok:
+                self._counts["verified"] += 1
+                self._failures.pop(name, None)
+            else:
+                self._counts["rejected"] += 1
+                failures = self._failures.setdefault(name, deque(maxlen=self.max_failures))
+                failures.append(time.monotonic())
+        return ok
+
+    def hash(self, password, method):
+        """``generate_password_hash`` on the pool; raises :class:`PoolBusy`."""
+        if os.getpid() != self._pid:
+            self._reset()
+        with self._lock:
+            future = self._submit(generate_password_hash, password, method)
+        hashed = future.result()
+        with self._lock:
+            self._counts["hashed"] += 1
+        return hashed
+
+    def stats(self):
+        with self._lock:
+            hash_ms = list(self._hash_ms)
+            wait_ms = list(self._wait_ms)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "throttled_names": sum(
+                    1 for name in list(self._failures) if self._retry_after(name, time.monotonic())
+                ),
+                **self._counts,
+                "hash_ms": _summary(hash_ms),
+                "wait_ms": _summary(wait_ms),
+            }
+
+
+def _summary(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(statistics.median(values), 1),
+        "p95": round(_percentile(values, 0.95), 1),
+        "max": round(max(values), 1),
+    }
+
+
+def _verify_ms(method, rounds):
+    stored = generate_password_hash("benchmark-passphrase", method)
+    runs = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        check_password_hash(stored, "benchmark-passphrase")
+        runs.append((time.perf_counter() - started) * 1000)
+    return statistics.median(runs)
+
+
+def benchmark(target_ms, algorithm=DEFAULT_METHOD, rounds=3):
+    """Time candidate parameters and pick the strongest within ``target_ms``.
+
+    scrypt doubles its cost ``n`` until the target is passed; PBKDF2 is
+    timed once and its iteration count scaled to the target, then checked.
+    If even the cheapest candidate is too slow, that one is picked.
+    """
+    candidates = []
+    if algorithm == "scrypt":
+        for n in SCRYPT_COSTS:
+            method = f"scrypt:{n}:8:1"
+            candidates.append({"method": method, "verify_ms": round(_verify_ms(method, rounds), 1)})
+            if candidates[-1]["verify_ms"] > target_ms:
+                break
+    elif algorithm == "pbkdf2":
+        probe = MIN_PBKDF2_ITERATIONS
+        probe_ms = _verify_ms(f"pbkdf2:sha256:{probe}", rounds)
+        candidates.append({"method": f"pbkdf2:sha256:{probe}", "verify_ms": round(probe_ms, 1)})
+        scaled = int(probe * target_ms / probe_ms) // 10_000 * 10_000
+        if scaled > probe:
+            method = f"pbkdf2:sha256:{scaled}"
+            candidates.append({"method": method, "verify_ms": round(_verify_ms(method, rounds), 1)})
+    else:
+        raise ValueError(f"Unknown algorithm: {algorithm!r}")
+    within = [c for c in candidates if c["verify_ms"] <= target_ms]
+    chosen = within[-1] if within else candidates[0]
+    return {"target_ms": target_ms, "method": chosen["method"], "verify_ms": chosen["verify_ms"], "candidates": candidates}
@@ -0,0 +1,158 @@
+"""Per-worker change feed behind the live leaderboard stream.
+
+Every score write bumps the game's row in ``score_versions`` in the same
+transaction, so that table is a cheap change sequence shared by all gunicorn
+workers.  One :class:`ScoreFeed` per worker and database file polls it from a
+single thread, reloads the boards that changed and wakes every stream
+waiting on them.  Writes made by this worker call :meth:`ScoreFeed.notify`
+so they are pushed without waiting for the next poll; writes from other
+workers show up within ``interval`` seconds.
+
+The poller only runs while someone is subscribed, boards are dropped when
+the last stream closes, and each feed notices a fork and starts over in the
+child.
+"""
+
+import logging
+import os
+import threading
+
+from db import get_connection
+
+logger = logging.getLogger(__name__)
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+
+class FeedFull(Exception):
+    """Raised when a worker already serves its maximum number of streams."""
+
+
+class Subscription:
+    def __init__(self, feed, games):
+        self.feed = feed
+        self.games = tuple(games)
+        self.sent = {}
+        self.closed = False
+
+    def wait(self, timeout):
+        """Return ``[(game, version, body)]`` not sent yet, waiting up to ``timeout``.
+
+        An empty list means nothing changed in time.
+        """
+        feed = self.feed
+        with feed._cond:
+            feed._cond.wait_for(self._pending, timeout)
+            updates = self._pending()
+        for game, version, _ in updates:
+            self.sent[game] = version
+        return updates
+
+    def _pending(self):
+        boards = self.feed._boards
+        return [
+            (game,) + boards[game]
+            for game in self.games
+            if game in boards and boards[game][0] != self.sent.get(game)
+        ]
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.feed._unsubscribe()
+
+
+class ScoreFeed:
+    """Watch ``score_versions`` in one database file and fan changes out."""
+
+    def __init__(self, path, load, interval=0.5):
+        # load(game, path) -> (version, serialized board)
+        self.path = path
+        self.load = load
+        self.interval = interval
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._boards = {}
+        self._subscribers = 0
+        self._thread = None
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def subscribe(self, games, limit=None):
+        """Start following ``games``; raises :class:`FeedFull` past ``limit`` streams."""
+        if os.getpid() != self._pid:
+            self._reset()
+        missing = [game for game in games if game not in self._boards]
+        loaded = {game: self.load(game, self.path) for game in missing}
+        with self._cond:
+            if limit is not None and self._subscribers >= limit:
+                raise FeedFull(f"{self._subscribers} streams already open")
+            for game, board in loaded.items():
+                self._boards.setdefault(game, board)
+            self._subscribers += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="score-feed", daemon=True)
+                self._thread.start()
+        return Subscription(self, games)
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+            if self._subscribers <= 0:
+                # Nobody follows them any more; the next stream reloads
+                self._boards.clear()
+            self._cond.notify_all()
+        self._wake.set()
+
+    def notify(self):
+        """Poll now instead of at the next interval (after a local write)."""
+        self._wake.set()
+
+    def poll(self):
+        rows = get_connection(self.path).execute("SELECT game, version FROM score_versions").fetchall()
+        versions = dict(rows)
+        with self._cond:
+            stale = [
+                game for game, (version, _) in self._boards.items()
+                if versions.get(game, 0) != version
+            ]
+        if not stale:
+            return
+        fresh = {game: self.load(game, self.path) for game in stale}
+        with self._cond:
+            self._boards.update(fresh)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._subscribers <= 0:
+                    self._thread = None
+                    return
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling score versions in %s failed", self.path)
+            self._wake.wait(self.interval)
+
+
+def feed_for(path, load, interval=0.5):
+    """Return this worker's feed for the database at ``path``."""
+    with _feeds_lock:
+        feed = _feeds.get(path)
+        if feed is None or feed._pid != os.getpid():
+            feed = _feeds[path] = ScoreFeed(path, load, interval)
+        return feed
+
+
+def notify(path):
+    feed = _feeds.get(path)
+    if feed is not None:
+        feed.notify()
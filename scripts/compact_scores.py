@@ -0,0 +1,25 @@
+from pathlib import Path
+import json
+import os
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from compaction import compact_scores  # noqa: E402
+from storage import score_archive_dir, scores_db_path  # noqa: E402
+
+
+def main():
+    # Usage: uv run python scripts/compact_scores.py [keep_days]
+    # Archives runs older than keep_days (default SCORES_RETENTION_DAYS or 30)
+    # that are nobody's best to score-archive/ and prints the report as JSON.
+    keep_days = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get("SCORES_RETENTION_DAYS", 30))
+    path = scores_db_path()
+    report = compact_scores(path, score_archive_dir(path), keep_days=keep_days)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
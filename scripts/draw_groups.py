@@ -0,0 +1,31 @@
+from pathlib import Path
+import sys
+
+import yaml
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from batch_draw import draw_groups  # noqa: E402
+
+
+def main():
+    # Usage: uv run python scripts/draw_groups.py groups.yaml [workers]
+    # groups.yaml maps each group name to {couples: [...], previous: {...}}
+    if len(sys.argv) < 2:
+        print("Usage: draw_groups.py groups.yaml [workers]")
+        sys.exit(2)
+    with open(sys.argv[1], "r") as f:
+        groups = yaml.safe_load(f)
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    result = draw_groups(groups, workers=workers)
+    for report in result["groups"]:
+        status = report["path"] if report["success"] else f"FAILED: {report['error']}"
+        print(f"{report['group']:<20} {report['participants']:>5} {report['seconds'] * 1000:8.1f} ms  {status}")
+    print(f"{result['succeeded']} drawn, {result['failed']} failed in {result['seconds']:.2f} s")
+    sys.exit(1 if result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
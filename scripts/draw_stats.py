@@ -0,0 +1,26 @@
+from pathlib import Path
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from secret_santa import SecretSanta  # noqa: E402
+
+
+def main():
+    # Usage: uv run python scripts/draw_stats.py [samples]
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    santa = SecretSanta()
+    frequencies = santa.pair_frequencies(samples=samples)
+    names = sorted(frequencies)
+    width = max(len(name) for name in names)
+    print(" " * width + " " + " ".join(f"{name[:7]:>7}" for name in names))
+    for giver in names:
+        shares = frequencies[giver]
+        cells = " ".join(f"{shares.get(r, 0.0):7.3f}" for r in names)
+        print(f"{giver:>{width}} {cells}")
+
+
+if __name__ == "__main__":
+    main()
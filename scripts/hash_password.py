@@ -1,4 +1,5 @@
 from werkzeug.security import generate_password_hash
+import os
 import sys
 
 
@@ -7,7 +8,8 @@ def main():
         print("Usage: uv run python scripts/hash_password.py <clear-text-passphrase>")
         sys.exit(1)
     phrase = sys.argv[1]
-    print(generate_password_hash(phrase))
+    # Same parameters the app uses for new and upgraded hashes
+    print(generate_password_hash(phrase, os.environ.get("PASSWORD_HASH_METHOD") or "scrypt"))
 
 
 if __name__ == "__main__":
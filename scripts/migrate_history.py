@@ -0,0 +1,28 @@
+from pathlib import Path
+import os
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from constraints import load_yaml  # noqa: E402
+from history import has_history, import_history  # noqa: E402
+from storage import get_data_dir, history_db_path  # noqa: E402
+
+
+def main():
+    # Usage: uv run python scripts/migrate_history.py [previous.yaml]
+    # Folds previous.yaml and every secret-santa-<year>.json in DATA_DIR (and
+    # the working directory) into DATA_DIR/history.sqlite3.
+    previous_path = sys.argv[1] if len(sys.argv) > 1 else "previous.yaml"
+    path = history_db_path()
+    if has_history(path):
+        print(f"{path} already holds a history; nothing to do")
+        return
+    years = import_history(path, load_yaml(previous_path), [get_data_dir(), os.getcwd()])
+    print(f"Imported {len(years)} years into {path}: {', '.join(map(str, years))}")
+
+
+if __name__ == "__main__":
+    main()
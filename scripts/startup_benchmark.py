@@ -0,0 +1,72 @@
+from pathlib import Path
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in a fresh interpreter, like a gunicorn master or worker booting
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+print(json.dumps({"import": round((time.perf_counter() - started) * 1000, 1), **app.STARTUP_MS}))
+"""
+
+
+def boot(data_dir):
+    env = {**os.environ, "DATA_DIR": data_dir}
+    env.pop("SCORES_DB", None)
+    env.pop("ENV_FILE", None)
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    timings = json.loads(out.strip().splitlines()[-1])
+    timings["process"] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
+
+
+def medians(samples):
+    return {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+
+
+def main():
+    # Usage: uv run python scripts/startup_benchmark.py [--runs 5] [--budget-ms 1500] [--record FILE]
+    # Boots the app in fresh interpreters against an empty DATA_DIR (cold:
+    # migrations and a new database) and again against the same one (warm),
+    # and prints the median milliseconds per startup phase as JSON.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="fail if the median cold process time is above this")
+    parser.add_argument("--record", help="append the result as a JSON line to this file")
+    args = parser.parse_args()
+
+    cold, warm = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as data_dir:
+            cold.append(boot(data_dir))
+            warm.append(boot(data_dir))
+    result = {
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "cold_ms": medians(cold),
+        "warm_ms": medians(warm),
+    }
+    print(json.dumps(result, indent=2))
+    if args.record:
+        with open(args.record, "a") as fh:
+            fh.write(json.dumps(result) + "\n")
+    if args.budget_ms is not None and result["cold_ms"]["process"] > args.budget_ms:
+        print(f"Cold start {result['cold_ms']['process']} ms is over the {args.budget_ms} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,64 +2,173 @@ import random
 from itertools import chain
 import json
 import datetime
-import yaml
+import os
 
-from storage import match_file_path, ensure_match_file
+from constraints import compile_constraints, load_yaml
+from solver import (
+    Eligibility,
+    NoSolutionError,
+    check_feasibility,
+    history_costs,
+    min_cost_assignment,
+    near_optimal,
+    pair_frequencies,
+    repair,
+    solve,
+    solve_cycle,
+    swap_sample,
+)
+from history import has_history, import_history, recent_pairs, record_draw
+from storage import ensure_match_file, get_data_dir, history_db_path, match_file_path
+
+__all__ = ["NoSolutionError", "SecretSanta"]
 
 
 class SecretSanta:
 
-    def __init__(self, year=None, data_dir=None):
+    def __init__(self, year=None, data_dir=None, couples=None, previous=None, history_years=None):
+        # couples default to couples.yaml; previous to the recorded history
+        # (only the last ``history_years`` years if set) or previous.yaml
         self.year = year or datetime.datetime.now().year
         self.data_dir = data_dir
+        self.history_years = history_years
         self.config = None
-        self.couples = self.load_couples()
-        self.previous = self.load_previous()
+        self._eligibility = None
+        self.couples = self.load_couples() if couples is None else couples
+        self.previous = self.load_previous() if previous is None else previous
+
+    @property
+    def couples(self):
+        return self._couples
+
+    @couples.setter
+    def couples(self, value):
+        self._couples = value
+        self.names = set(chain.from_iterable(value))
+        self._eligibility = None
+
+    @property
+    def previous(self):
+        return self._previous
+
+    @previous.setter
+    def previous(self, value):
+        self._previous = value
+        self._eligibility = None
+
+    @property
+    def eligibility(self):
+        """Couples and history compiled into bitsets, shared while the YAML is unchanged."""
+        if self._eligibility is None:
+            self._eligibility = compile_constraints(self.names, self.couples, self.previous)
+        return self._eligibility
 
-        self.names = set(chain.from_iterable(self.couples))
-        
     def load_couples(self):
-        with open("couples.yaml", "r") as f:
-            return yaml.safe_load(f)
+        return load_yaml("couples.yaml")
     def load_previous(self):
-        with open("previous.yaml", "r") as f:
-            return yaml.safe_load(f)
+        if has_history(self.history_path):
+            return recent_pairs(self.history_path, self.year, self.history_years)
+        return load_yaml("previous.yaml")
     
     def get_eligible_names(self, gift_giver, already_taken=None):
-        forbidden = (already_taken or []) + self.previous[gift_giver]
-        for couple in self.couples:
-            if gift_giver in couple:
-                # or to your spouse or yourself
-                forbidden += list(couple)
-        return self.names - set(forbidden)
-    
-        
-    def draw(self):
-        for i in range(32):
-            print(f"Try #{i+1}...")
-            try:
-                # a mapping of who gives to whom. Empty for now        
-                secret_santa_config = {}
-                # now each name will be assigned someone to buy for
-                for name in self.names:
-                    eligible_names = self.get_eligible_names(name, already_taken=list(secret_santa_config.values()))
-                    # pick a random name that is left
-                    secret_santa_config[name] = random.choice(list(eligible_names))
-            except Exception:
-                # it might fail - then just try again
-                pass
-            else:
-                # if it worked, then stop retrying
-                # let's make sure we got it right...
-                everyone_is_giving = set(secret_santa_config.keys()) == self.names
-                everyone_is_receiving = set(secret_santa_config.values()) == self.names
-                assert everyone_is_giving and everyone_is_receiving
-                # if we get to this line, we are good
-                print("Success!")
-                self.config = secret_santa_config
-                return
-
-        raise Exception("No solution found!")
+        # not yourself, not your spouse and nobody you gave to before
+        eligibility = self.eligibility
+        taken = eligibility.mask(already_taken or [])
+        return set(eligibility.names_in(eligibility.rows[eligibility.index[gift_giver]] & ~taken))
+
+    def check_feasibility(self):
+        """Report whether a complete draw exists before spending time on one.
+
+        ``blocked`` lists groups of givers who, between them, can only give to
+        fewer recipients than there are givers in the group.
+        """
+        return check_feasibility(self.eligibility)
+
+    def draw(self, randomize=True, seed=None, mixing_steps=None, single_cycle=False):
+        """Assign every participant a recipient.
+
+        The solver is complete, so ``NoSolutionError`` means the couples and
+        history leave no valid assignment at all.  Random draws then take
+        ``mixing_steps`` constraint-preserving swaps (default scales with the
+        group) so every valid assignment is about equally likely.  Pass
+        ``randomize=False`` for a reproducible draw, or ``seed`` for a
+        reproducible random one.  ``single_cycle=True`` makes the gifts form
+        one circle through everybody.
+        """
+        eligibility = self.eligibility
+        report = self.check_feasibility()
+        if not report["feasible"]:
+            raise NoSolutionError(blocked=report["blocked"])
+        rng = random.Random(seed) if randomize else None
+        if single_cycle:
+            assignment = solve_cycle(eligibility, rng=rng)
+        else:
+            assignment = solve(eligibility, rng=rng)
+        if randomize and not single_cycle:
+            assignment = swap_sample(eligibility, assignment, rng, steps=mixing_steps)
+        names = eligibility.names
+        self.config = {names[giver]: names[recipient] for giver, recipient in enumerate(assignment)}
+
+    def draw_weighted(self, lookback=None, randomize=True, seed=None, slack=0.0):
+        """Draw treating history as a preference instead of a hard rule.
+
+        Repeating a past pairing costs more the more recent it is, and only
+        the last ``lookback`` draws count (all of them by default).  The
+        cheapest possible draw is found with a min-cost assignment; random
+        draws then pick among the optimal ones, or among those within
+        ``slack`` per participant of optimal.  Returns the repeated pairings.
+        """
+        hard = Eligibility.from_constraints(self.names, self.couples)
+        cost = history_costs(hard, self.previous, lookback=lookback)
+        assignment, row, col = min_cost_assignment(cost)
+        if randomize:
+            rng = random.Random(seed)
+            assignment = swap_sample(near_optimal(hard, cost, row, col, slack=slack), assignment, rng)
+        names = hard.names
+        self.config = {names[giver]: names[recipient] for giver, recipient in enumerate(assignment)}
+        return [
+            {"giver": names[giver], "recipient": names[recipient], "cost": float(cost[giver, recipient])}
+            for giver, recipient in enumerate(assignment)
+            if cost[giver, recipient]
+        ]
+
+    def repair(self, added=(), removed=()):
+        """Update an existing draw for people joining or leaving.
+
+        Pairings between people who stay are kept unless they have become
+        forbidden; only the givers that have to move get a new recipient.
+        Returns those givers as ``{"giver", "from", "to"}`` with ``from`` set
+        to ``None`` for newcomers.
+        """
+        if self.config is None:
+            self.load()
+        removed = set(removed)
+        self.names = (set(self.config) | set(added)) - removed
+        self._eligibility = None
+        eligibility = self.eligibility
+        index = eligibility.index
+        kept = [None] * len(eligibility)
+        for giver, recipient in self.config.items():
+            if giver in index and recipient in index and eligibility.allows(index[giver], index[recipient]):
+                kept[index[giver]] = index[recipient]
+        assignment, changed = repair(eligibility, kept)
+        names = eligibility.names
+        before, self.config = self.config, {names[giver]: names[recipient] for giver, recipient in enumerate(assignment)}
+        return [
+            {"giver": names[giver], "from": before.get(names[giver]), "to": names[assignment[giver]]}
+            for giver in sorted(changed)
+        ]
+
+    def pair_frequencies(self, samples=100_000, seed=None, **kwargs):
+        """Estimate ``{giver: {recipient: share}}`` over many random draws."""
+        eligibility = self.eligibility
+        start = solve(eligibility)
+        matrix = pair_frequencies(eligibility, start, samples=samples, seed=seed, **kwargs)
+        names = eligibility.names
+        return {
+            giver: {names[r]: float(matrix[g, r]) for r in range(len(names)) if matrix[g, r]}
+            for g, giver in enumerate(names)
+        }
 
     @property
     def fname(self):
@@ -69,9 +178,27 @@ class SecretSanta:
     def file_path(self):
         return match_file_path(self.year, data_dir=self.data_dir)
 
+    @property
+    def history_path(self):
+        return history_db_path(self.data_dir)
+
     def save(self):
         with open(self.file_path, "w") as f:
             json.dump(self.config, f)
+        self.record_history()
+
+    def record_history(self):
+        """Add this draw to the history store, importing the old files first."""
+        path = self.history_path
+        if not has_history(path):
+            data_dir = self.data_dir or get_data_dir()
+            match_dirs = [data_dir]
+            if os.path.abspath(data_dir) == os.path.abspath(get_data_dir()):
+                # Only the app's own draws ever lived in the repo directory;
+                # other groups' data dirs must not pick them up
+                match_dirs.append(os.getcwd())
+            import_history(path, self.previous, match_dirs, names=self.names, skip_year=self.year)
+        record_draw(path, self.year, self.config)
             
     def load(self):
         resolved = ensure_match_file(self.year, data_dir=self.data_dir)
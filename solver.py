@@ -0,0 +1,876 @@
+"""Constraint solver used by :class:`secret_santa.SecretSanta` to build draws.
+
+Participants are addressed by integer id (``0..n-1``).  :class:`Eligibility`
+compiles couples and history once into integer bitsets: ``rows[giver]`` has
+a bit set for every recipient the giver may draw and ``cols[recipient]`` the
+transpose.  Histories and couples are sparse compared to the group size, so
+the solver keeps per-participant *blocked* counters instead of materialising
+every domain: a giver's domain size is simply the number of free recipients
+minus the free recipients it is blocked from.
+"""
+
+_SAMPLE_TRIES = 8
+_SHRINK_LIMIT = 512
+MIXING_SWEEPS = 20
+MIN_MIXING_STEPS = 1000
+CYCLE_SEARCH_STEPS = 200_000
+_MISSING = object()
+
+
+class NoSolutionError(Exception):
+    """Raised when the constraints admit no valid assignment.
+
+    ``blocked`` carries the diagnostics from :func:`blocked_groups` when the
+    failure was detected by the feasibility check.
+    """
+
+    def __init__(self, message="No solution found!", blocked=None):
+        super().__init__(message)
+        self.blocked = blocked or []
+
+
+def ids_to_mask(ids):
+    mask = 0
+    for i in ids:
+        mask |= 1 << i
+    return mask
+
+
+def mask_to_ids(mask):
+    """Return the ids of the bits set in ``mask`` in ascending order."""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+class Eligibility:
+    """Who may give to whom, compiled once into bitsets indexed by id."""
+
+    def __init__(self, names, forbidden):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.full = (1 << n) - 1
+        self.forbidden = [tuple(sorted(set(blocked) | {giver})) for giver, blocked in enumerate(forbidden)]
+        self.forbidders = [[] for _ in range(n)]
+        for giver, blocked in enumerate(self.forbidden):
+            for recipient in blocked:
+                self.forbidders[recipient].append(giver)
+        self.rows = [self.full ^ ids_to_mask(blocked) for blocked in self.forbidden]
+        self._cols = None
+
+    @classmethod
+    def from_constraints(cls, names, couples=(), history=None):
+        """Build from participant names, couples and a giver → past recipients map."""
+        names = sorted(names)
+        index = {name: i for i, name in enumerate(names)}
+        forbidden = [set() for _ in names]
+        for couple in couples or ():
+            ids = [index[name] for name in couple if name in index]
+            for i in ids:
+                forbidden[i].update(ids)
+        for giver, past in (history or {}).items():
+            if giver in index:
+                forbidden[index[giver]].update(index[name] for name in past or () if name in index)
+        return cls(names, forbidden)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def cols(self):
+        if self._cols is None:
+            self._cols = [self.full ^ ids_to_mask(blocked) for blocked in self.forbidders]
+        return self._cols
+
+    def mask(self, names):
+        return ids_to_mask(self.index[name] for name in names if name in self.index)
+
+    def names_in(self, mask):
+        return [self.names[i] for i in mask_to_ids(mask)]
+
+    def allows(self, giver, recipient):
+        return bool(self.rows[giver] >> recipient & 1)
+
+    def to_matrix(self):
+        """Return the eligibility as an ``n x n`` NumPy boolean matrix."""
+        import numpy as np
+
+        n = len(self)
+        width = (n + 7) // 8
+        packed = b"".join(row.to_bytes(width, "little") for row in self.rows)
+        bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8).reshape(n, width), axis=1, bitorder="little")
+        return bits[:, :n].astype(bool)
+
+
+def max_matching(eligibility):
+    """Maximum giver → recipient matching via Hopcroft–Karp.
+
+    Returns ``(recipient_of, giver_of)``; unmatched entries are ``None``.
+    Neighbourhoods are scanned as bitsets masked by the recipients not yet
+    visited in the current phase, so every phase touches each recipient once.
+    """
+    rows = eligibility.rows
+    n = len(eligibility)
+    recipient_of = [None] * n
+    giver_of = [None] * n
+
+    # Greedy start, most constrained givers first
+    free = eligibility.full
+    for giver in sorted(range(n), key=lambda g: rows[g].bit_count()):
+        options = rows[giver] & free
+        if options:
+            low = options & -options
+            recipient = low.bit_length() - 1
+            recipient_of[giver] = recipient
+            giver_of[recipient] = giver
+            free ^= low
+
+    while True:
+        # BFS: layer givers by alternating distance from the free givers,
+        # remembering which recipients lead into each layer
+        layer = [g for g in range(n) if recipient_of[g] is None]
+        dist = {g: 0 for g in layer}
+        leads_to = [0]
+        seen = 0
+        found = False
+        while layer and not found:
+            following = []
+            step = 0
+            for giver in layer:
+                reach = rows[giver] & ~seen
+                seen |= reach
+                for recipient in mask_to_ids(reach):
+                    owner = giver_of[recipient]
+                    if owner is None:
+                        found = True
+                    else:
+                        dist[owner] = dist[giver] + 1
+                        step |= 1 << recipient
+                        following.append(owner)
+            leads_to.append(step)
+            layer = following
+        if not found:
+            return recipient_of, giver_of
+
+        # DFS: vertex-disjoint shortest augmenting paths along the layers
+        free = eligibility.full
+        for recipient in range(n):
+            if giver_of[recipient] is not None:
+                free ^= 1 << recipient
+        leads_to.append(0)
+        used = 0
+        for start in [g for g in range(n) if recipient_of[g] is None]:
+            path = [start]
+            while path:
+                giver = path[-1]
+                options = rows[giver] & (leads_to[dist[giver] + 1] | free) & ~used
+                if not options:
+                    path.pop()
+                    continue
+                low = options & -options
+                used |= low
+                recipient = low.bit_length() - 1
+                owner = giver_of[recipient]
+                if owner is None:
+                    # Flip the path: each giver takes the recipient it tried
+                    for g in reversed(path):
+                        recipient, recipient_of[g] = recipient_of[g], recipient
+                        giver_of[recipient_of[g]] = g
+                    break
+                path.append(owner)
+
+
+def repair(eligibility, recipient_of):
+    """Complete a partial assignment while changing as few givers as possible.
+
+    ``recipient_of`` lists each giver's kept recipient or ``None``.  Keeping
+    a pairing costs 0 and any other allowed pairing 1.  The kept pairings
+    stay fixed and each giver left without a recipient is placed along the
+    cheapest augmenting path into the freed recipients (the Hungarian
+    method's row-by-row step, so the total stays minimal).  The search
+    starts at that giver, reads only the bitset rows it reaches and stops as
+    soon as no cheaper path is possible, so a join or leave touches a few
+    rows whatever the group size.  Only when no path exists does it fall
+    back to a full :func:`min_cost_assignment`, which explains the failure.
+    Returns the completed assignment and the ids of the givers whose
+    recipient changed.
+    """
+    rows = eligibility.rows
+    n = len(eligibility)
+    current = [None] * n
+    holder = [None] * n
+    stuck = []
+    for giver, recipient in enumerate(recipient_of):
+        # The sparse forbidden list is cheaper to check than a whole row
+        if recipient is not None and holder[recipient] is None and recipient not in eligibility.forbidden[giver]:
+            current[giver] = recipient
+            holder[recipient] = giver
+        else:
+            stuck.append(giver)
+    free = eligibility.full ^ ids_to_mask(r for r in current if r is not None)
+
+    for start in stuck:
+        path = _cheapest_path(rows, recipient_of, current, holder, free, start)
+        if path is None:
+            return _repair_globally(eligibility, recipient_of)
+        giver, recipient, via = path
+        free ^= 1 << recipient
+        while True:
+            current[giver], holder[recipient] = recipient, giver
+            if giver == start:
+                break
+            giver, recipient = via[giver]
+    return current, {giver for giver in range(n) if current[giver] != recipient_of[giver]}
+
+
+def _cheapest_path(rows, kept, current, holder, free, start):
+    """Cheapest augmenting path from ``start`` to a free recipient, or ``None``.
+
+    Giving ``r`` to ``g`` costs 0 if ``r`` was kept for ``g`` and 1
+    otherwise; taking ``r`` from its holder refunds the holder's cost, so a
+    step costs -1 only when it hands a moved giver's original recipient
+    back.  Labels are corrected as they improve (there are no negative
+    cycles while the partial assignment is optimal).  A giver still on its
+    kept recipient pays 1 for any other, and the moved givers bound how much
+    the rest of a path can save, so givers whose label cannot beat the best
+    path found are neither queued nor expanded.  Returns
+    ``(last giver, free recipient, via)`` where ``via[g] = (previous giver,
+    recipient g gives up)``.
+    """
+    import heapq
+
+    def cost(giver, recipient):
+        return 0 if kept[giver] == recipient else 1
+
+    def floor(label, giver):
+        # Least a path through ``giver`` at ``label`` can still cost
+        unmoved = kept[giver] is None or kept[giver] == current[giver]
+        return label + unmoved - savings
+
+    moved = {g for g, r in enumerate(current) if r is not None and r != kept[g]}
+    # Recipients held by moved givers: taking one can be cheaper than 1
+    refundable = ids_to_mask(current[g] for g in moved)
+    savings = len(moved)
+    dist = {start: 0}
+    via = {}
+    best = None
+    queue = [(0, start)]
+    while queue:
+        label, giver = heapq.heappop(queue)
+        if label > dist[giver]:
+            continue
+        if best is not None and floor(label, giver) >= best[0]:
+            continue
+        row = rows[giver]
+        options = row & free
+        if options:
+            own = kept[giver]
+            recipient = own if own is not None and options >> own & 1 else (options & -options).bit_length() - 1
+            total = label + cost(giver, recipient)
+            if best is None or total < best[0]:
+                best = (total, giver, recipient)
+        held = row & ~free
+        if current[giver] is not None:
+            held &= ~(1 << current[giver])
+        # Every other step costs exactly label + 1, so only the few special
+        # ones are worth listing once that cannot beat the best path
+        special = refundable
+        if kept[giver] is not None:
+            special |= 1 << kept[giver]
+        if best is None or label + 1 - savings < best[0]:
+            candidates = held
+        else:
+            candidates = held & special
+        for recipient in mask_to_ids(candidates):
+            owner = holder[recipient]
+            step = label + cost(giver, recipient) - cost(owner, recipient)
+            if best is not None and floor(step, owner) >= best[0]:
+                continue
+            if step < dist.get(owner, step + 1):
+                dist[owner] = step
+                via[owner] = (giver, recipient)
+                heapq.heappush(queue, (step, owner))
+    if best is None:
+        return None
+    return best[1], best[2], via
+
+
+def _repair_globally(eligibility, recipient_of):
+    import numpy as np
+
+    allowed = eligibility.to_matrix()
+    cost = np.where(allowed, 1.0, np.inf)
+    for giver, recipient in enumerate(recipient_of):
+        if recipient is not None and allowed[giver, recipient]:
+            cost[giver, recipient] = 0.0
+    try:
+        assignment, _, _ = min_cost_assignment(cost)
+    except NoSolutionError:
+        stuck = [eligibility.names[g] for g, r in enumerate(recipient_of) if r is None]
+        raise NoSolutionError(f"No way to give {', '.join(map(str, stuck))} a recipient") from None
+    assignment = [int(recipient) for recipient in assignment]
+    return assignment, {giver for giver, recipient in enumerate(assignment) if recipient != recipient_of[giver]}
+
+
+def blocked_groups(eligibility, recipient_of):
+    """Explain why ``recipient_of`` (a maximum matching) is not perfect.
+
+    For every unmatched giver, collect the givers reachable along
+    alternating paths: together they can only reach recipients that are all
+    spoken for, one fewer than the givers (a Hall's-condition violation).
+    Givers that are not needed to keep the group short are then dropped, so
+    each reported group is as small as the greedy shrink can make it.
+    """
+    rows = eligibility.rows
+    giver_of = [None] * len(eligibility)
+    for giver, recipient in enumerate(recipient_of):
+        if recipient is not None:
+            giver_of[recipient] = giver
+    groups = []
+    covered = set()
+    for start, recipient in enumerate(recipient_of):
+        if recipient is not None or start in covered:
+            continue
+        group = [start]
+        reach = 0
+        for giver in group:
+            new = rows[giver] & ~reach
+            reach |= new
+            group.extend(giver_of[r] for r in mask_to_ids(new))
+        for giver in list(group) if len(group) <= _SHRINK_LIMIT else ():
+            rest = [g for g in group if g != giver]
+            union = 0
+            for g in rest:
+                union |= rows[g]
+            if rest and union.bit_count() < len(rest):
+                group = rest
+        union = 0
+        for g in group:
+            union |= rows[g]
+        covered.update(group)
+        groups.append({
+            "givers": sorted(eligibility.names[g] for g in group),
+            "recipients": eligibility.names_in(union),
+        })
+    return groups
+
+
+def check_feasibility(eligibility):
+    """Report whether a complete draw exists, and which givers block it."""
+    recipient_of, _ = max_matching(eligibility)
+    matched = sum(r is not None for r in recipient_of)
+    report = {
+        "feasible": matched == len(eligibility),
+        "participants": len(eligibility),
+        "matched": matched,
+        "blocked": [],
+    }
+    if not report["feasible"]:
+        report["blocked"] = blocked_groups(eligibility, recipient_of)
+    return report
+
+
+class _Side:
+    """Bookkeeping for one side (givers or recipients) of the assignment."""
+
+    def __init__(self, blocked):
+        self.block = blocked
+        self.pool = list(range(len(blocked)))
+        self.pos = list(range(len(blocked)))
+        self.buckets = [dict() for _ in range(max(self.block, default=0) + 1)]
+        for x, level in enumerate(self.block):
+            self.buckets[level][x] = None
+        self.top = len(self.buckets) - 1
+
+    def highest(self):
+        """Return the highest blocked level that still has a waiting member."""
+        while self.top > 0 and not self.buckets[self.top]:
+            self.top -= 1
+        return self.top if self.buckets[self.top] else -1
+
+    def take(self, level):
+        x, _ = self.buckets[level].popitem()
+        return x
+
+    def put_back(self, x):
+        level = self.block[x]
+        self.buckets[level][x] = None
+        if level > self.top:
+            self.top = level
+
+    def remove(self, x):
+        """Drop ``x`` from the pool; ``restore`` must undo removals LIFO."""
+        self.buckets[self.block[x]].pop(x, None)
+        p = self.pos[x]
+        last = self.pool.pop()
+        if last != x:
+            self.pool[p] = last
+            self.pos[last] = p
+        return p
+
+    def restore(self, x, p):
+        if p == len(self.pool):
+            self.pool.append(x)
+        else:
+            moved = self.pool[p]
+            self.pool.append(moved)
+            self.pos[moved] = len(self.pool) - 1
+            self.pool[p] = x
+        self.pos[x] = p
+        self.put_back(x)
+
+    def bump(self, x, delta):
+        old = self.block[x]
+        self.block[x] = old + delta
+        if self.buckets[old].pop(x, _MISSING) is not _MISSING:
+            self.put_back(x)
+
+
+def _candidates(pool, domain, rng):
+    """Yield the ids in the bitset ``domain``; ``pool`` lists the same ids.
+
+    ``pool`` may be mutated while the generator is suspended, but only in a
+    way that is fully undone before it is resumed.
+    """
+    if rng is None:
+        while domain:
+            low = domain & -domain
+            yield low.bit_length() - 1
+            domain ^= low
+        return
+    tried = 0
+    for _ in range(_SAMPLE_TRIES):
+        x = pool[rng.randrange(len(pool))]
+        bit = 1 << x
+        if domain & bit and not tried & bit:
+            tried |= bit
+            yield x
+    rest = mask_to_ids(domain & ~tried)
+    rng.shuffle(rest)
+    yield from rest
+
+
+def solve(eligibility, rng=None):
+    """Return ``assignment`` with ``assignment[giver] == recipient``.
+
+    Uses depth-first search that always branches on the most constrained
+    giver *or* recipient and checks both sides for wiped-out domains after
+    every step, so the search is complete: it raises :class:`NoSolutionError`
+    only when no assignment exists.  With ``rng`` (a ``random.Random``) the
+    candidates are tried in random order; without it the result is
+    deterministic.
+    """
+    n = len(eligibility)
+    forbidden = eligibility.forbidden
+    forbidders = eligibility.forbidders
+    givers = _Side([len(f) for f in forbidden])
+    recipients = _Side([len(f) for f in forbidders])
+    free = unassigned = eligibility.full
+    remaining = n
+
+    def assign(giver, recipient):
+        nonlocal remaining, free, unassigned
+        undo = (givers.remove(giver), recipients.remove(recipient))
+        remaining -= 1
+        free ^= 1 << recipient
+        unassigned ^= 1 << giver
+        for other in forbidders[recipient]:
+            givers.bump(other, -1)
+        for other in forbidden[giver]:
+            recipients.bump(other, -1)
+        return undo
+
+    def unassign(giver, recipient, undo):
+        nonlocal remaining, free, unassigned
+        for other in forbidden[giver]:
+            recipients.bump(other, 1)
+        for other in forbidders[recipient]:
+            givers.bump(other, 1)
+        remaining += 1
+        free |= 1 << recipient
+        unassigned |= 1 << giver
+        recipients.restore(recipient, undo[1])
+        givers.restore(giver, undo[0])
+
+    def choose():
+        g_level = givers.highest()
+        r_level = recipients.highest()
+        if max(g_level, r_level) >= remaining:
+            return None
+        if g_level >= r_level:
+            giver = givers.take(g_level)
+            domain = eligibility.rows[giver] & free
+            return [True, giver, _candidates(recipients.pool, domain, rng), None]
+        recipient = recipients.take(r_level)
+        domain = eligibility.cols[recipient] & unassigned
+        return [False, recipient, _candidates(givers.pool, domain, rng), None]
+
+    stack = []
+
+    def advance():
+        while stack:
+            frame = stack[-1]
+            is_giver, var, candidates, current = frame
+            if current is not None:
+                pair = (var, current[0]) if is_giver else (current[0], var)
+                unassign(*pair, current[1])
+            partner = next(candidates, None)
+            if partner is not None:
+                pair = (var, partner) if is_giver else (partner, var)
+                frame[3] = (partner, assign(*pair))
+                return True
+            (givers if is_giver else recipients).put_back(var)
+            stack.pop()
+        return False
+
+    while remaining:
+        frame = choose()
+        if frame is not None:
+            stack.append(frame)
+        if not advance():
+            raise NoSolutionError()
+
+    assignment = [None] * n
+    for is_giver, var, _, (partner, _) in stack:
+        if is_giver:
+            assignment[var] = partner
+        else:
+            assignment[partner] = var
+    return assignment
+
+
+def mixing_steps(n):
+    """Default number of swap steps for a group of ``n``."""
+    return max(MIN_MIXING_STEPS, MIXING_SWEEPS * n)
+
+
+def swap_sample(eligibility, assignment, rng, steps=None):
+    """Random-walk from a valid ``assignment`` to a near-uniform random one.
+
+    Each step proposes either swapping the recipients of two givers or
+    rotating the recipients of three, and keeps the proposal only if every
+    giver involved may give to their new recipient.  Proposals are symmetric,
+    so the walk's stationary distribution is uniform over the valid
+    assignments it can reach, and the cost is fixed by ``steps``.
+    """
+    n = len(eligibility)
+    rows = eligibility.rows
+    current = list(assignment)
+    if n < 2:
+        return current
+    steps = mixing_steps(n) if steps is None else steps
+    for _ in range(steps):
+        a = rng.randrange(n)
+        b = rng.randrange(n)
+        if a == b:
+            continue
+        if n > 2 and rng.random() < 0.5:
+            c = rng.randrange(n)
+            if c == a or c == b:
+                continue
+            ra, rb, rc = current[a], current[b], current[c]
+            if rows[a] >> rb & 1 and rows[b] >> rc & 1 and rows[c] >> ra & 1:
+                current[a], current[b], current[c] = rb, rc, ra
+        else:
+            ra, rb = current[a], current[b]
+            if rows[a] >> rb & 1 and rows[b] >> ra & 1:
+                current[a], current[b] = rb, ra
+    return current
+
+
+def pair_frequencies(eligibility, assignment, samples=100_000, chains=1000, thin=None, burn_in=None, seed=None):
+    """Estimate how often each giver draws each recipient.
+
+    Runs ``chains`` copies of the :func:`swap_sample` walk side by side as
+    NumPy arrays, starting from ``assignment``.  After ``burn_in`` steps
+    every chain contributes one sample each ``thin`` steps until ``samples``
+    draws have been recorded.  Returns an ``n x n`` float matrix whose row
+    ``g`` holds the fraction of samples in which ``g`` gave to each recipient.
+    """
+    import numpy as np
+
+    n = len(eligibility)
+    allowed = eligibility.to_matrix()
+    rng = np.random.default_rng(seed)
+    chains = max(1, min(chains, samples))
+    thin = thin or max(1, 2 * n)
+    burn_in = mixing_steps(n) if burn_in is None else burn_in
+    state = np.tile(np.asarray(assignment, dtype=np.intp), (chains, 1))
+    lanes = np.arange(chains)
+    offsets = np.arange(n) * n
+    counts = np.zeros(n * n, dtype=np.int64)
+
+    def step():
+        a, b, c = rng.integers(n, size=(3, chains))
+        rotate = (rng.random(chains) < 0.5) & (c != a) & (c != b)
+        ra, rb, rc = state[lanes, a], state[lanes, b], state[lanes, c]
+        swap = ~rotate & (a != b) & allowed[a, rb] & allowed[b, ra]
+        turn = rotate & (a != b) & allowed[a, rb] & allowed[b, rc] & allowed[c, ra]
+        lane = lanes[swap]
+        state[lane, a[swap]], state[lane, b[swap]] = rb[swap], ra[swap]
+        lane = lanes[turn]
+        state[lane, a[turn]], state[lane, b[turn]], state[lane, c[turn]] = rb[turn], rc[turn], ra[turn]
+
+    if n > 1:
+        for _ in range(burn_in):
+            step()
+    recorded = 0
+    while recorded < samples:
+        take = min(chains, samples - recorded)
+        counts += np.bincount((offsets + state[:take]).ravel(), minlength=n * n)
+        recorded += take
+        if n > 1:
+            for _ in range(thin):
+                step()
+    return counts.reshape(n, n) / recorded
+
+
+def cycles(assignment):
+    """Split a complete ``assignment`` into its cycles of givers."""
+    seen = [False] * len(assignment)
+    result = []
+    for start in range(len(assignment)):
+        if seen[start]:
+            continue
+        cycle = []
+        giver = start
+        while not seen[giver]:
+            seen[giver] = True
+            cycle.append(giver)
+            giver = assignment[giver]
+        result.append(cycle)
+    return result
+
+
+def _reaches_everyone(edges, full):
+    reached = 1
+    frontier = 1
+    while frontier:
+        step = 0
+        for node in mask_to_ids(frontier):
+            step |= edges[node]
+        frontier = step & ~reached
+        reached |= frontier
+    return reached == full
+
+
+def _merge_cycles(eligibility, assignment, rng):
+    """Swap recipients across cycles until one circle remains, or give up.
+
+    If ``a`` (in cycle A) may give to ``b``'s recipient and ``b`` (in another
+    cycle) may give to ``a``'s, swapping their recipients joins both cycles.
+    """
+    rows = eligibility.rows
+    current = list(assignment)
+    while True:
+        groups = sorted(cycles(current), key=len)
+        if len(groups) == 1:
+            return current
+        giver_of = [0] * len(current)
+        for giver, recipient in enumerate(current):
+            giver_of[recipient] = giver
+        merged = False
+        for group in groups:
+            inside = ids_to_mask(group)
+            order = list(group)
+            if rng is not None:
+                rng.shuffle(order)
+            for a in order:
+                options = mask_to_ids(rows[a] & ~inside)
+                if rng is not None:
+                    rng.shuffle(options)
+                for recipient in options:
+                    b = giver_of[recipient]
+                    if rows[b] >> current[a] & 1:
+                        current[a], current[b] = recipient, current[a]
+                        merged = True
+                        break
+                if merged:
+                    break
+            if merged:
+                break
+        if not merged:
+            return None
+
+
+def _search_cycle(eligibility, rng, max_steps):
+    """Depth-first Hamiltonian-cycle search with Warnsdorff ordering.
+
+    After each step every unvisited participant must still have someone
+    left to give to and someone left to receive from, otherwise the branch
+    is cut.  Raises :class:`NoSolutionError` when the search is exhausted or
+    runs out of ``max_steps``.
+    """
+    n = len(eligibility)
+    rows, cols = eligibility.rows, eligibility.cols
+    start = min(range(n), key=lambda v: (rows[v].bit_count(), cols[v].bit_count()))
+    home = 1 << start
+
+    def options(v, unvisited):
+        ids = mask_to_ids(rows[v] & unvisited)
+        jitter = rng.random if rng is not None else (lambda: 0)
+        ids.sort(key=lambda u: ((rows[u] & unvisited).bit_count(), jitter()))
+        return iter(ids)
+
+    def viable(v, unvisited):
+        if not unvisited:
+            return bool(rows[v] & home)
+        targets = unvisited | home
+        sources = unvisited | 1 << v
+        return all(rows[u] & targets and cols[u] & sources for u in mask_to_ids(unvisited))
+
+    path = [start]
+    unvisited = eligibility.full ^ home
+    stack = [options(start, unvisited)]
+    steps = 0
+    while stack:
+        following = next(stack[-1], None)
+        if following is None:
+            stack.pop()
+            unvisited |= 1 << path.pop()
+            continue
+        steps += 1
+        if steps > max_steps:
+            raise NoSolutionError(f"Gave up looking for a single gift circle after {max_steps} steps")
+        unvisited ^= 1 << following
+        if not viable(following, unvisited):
+            unvisited |= 1 << following
+            continue
+        path.append(following)
+        if not unvisited:
+            assignment = [None] * n
+            for giver, recipient in zip(path, path[1:] + path[:1]):
+                assignment[giver] = recipient
+            return assignment
+        stack.append(options(following, unvisited))
+    raise NoSolutionError("No single gift circle exists for these constraints")
+
+
+def solve_cycle(eligibility, rng=None, max_steps=CYCLE_SEARCH_STEPS):
+    """Return an assignment forming one circle through every participant.
+
+    A regular draw is found first and its cycles are merged pairwise by
+    recipient swaps, which succeeds almost immediately unless the
+    constraints are very tight; only then does the exhaustive search run.
+    """
+    n = len(eligibility)
+    if n < 2 or not (_reaches_everyone(eligibility.rows, eligibility.full)
+                     and _reaches_everyone(eligibility.cols, eligibility.full)):
+        raise NoSolutionError("No single gift circle exists: some participants cannot reach each other")
+    assignment = solve(eligibility, rng=rng)
+    if rng is not None:
+        assignment = swap_sample(eligibility, assignment, rng)
+    merged = _merge_cycles(eligibility, assignment, rng)
+    if merged is not None:
+        return merged
+    return _search_cycle(eligibility, rng, max_steps)
+
+
+def history_costs(eligibility, history, lookback=None):
+    """Cost matrix penalising repeats of past pairings, newest hardest.
+
+    ``eligibility`` carries only the hard constraints (self, couples), which
+    cost ``inf``.  ``history`` maps a giver to past recipients, oldest first.
+    A pairing from ``age`` draws ago (1 = last time) within ``lookback``
+    costs ``2 ** (lookback - age)``.  For one giver, repeating last year's
+    recipient therefore costs more than repeating all their older ones
+    together.  Costs add up across givers, though: two givers repeating a
+    pairing from two draws ago cost as much as one repeat of last year's.
+    """
+    import numpy as np
+
+    cost = np.where(eligibility.to_matrix(), 0.0, np.inf)
+    for giver, past in (history or {}).items():
+        if giver not in eligibility.index:
+            continue
+        past = list(past or ())
+        horizon = len(past) if lookback is None else lookback
+        g = eligibility.index[giver]
+        for age, recipient in enumerate(reversed(past), start=1):
+            if age > horizon:
+                break
+            r = eligibility.index.get(recipient)
+            if r is not None and np.isfinite(cost[g, r]):
+                cost[g, r] += 2.0 ** (horizon - age)
+    return cost
+
+
+def min_cost_assignment(cost):
+    """Solve the assignment problem for a square ``cost`` matrix.
+
+    Shortest-augmenting-path Hungarian algorithm with each row scan
+    vectorised in NumPy; ties prefer unmatched columns, which keeps paths
+    short on the mostly-zero matrices a draw produces.  Returns
+    ``(assignment, row_potential, col_potential)``: the potentials are an
+    optimal dual solution, so ``cost - row[:, None] - col[None, :]`` is zero
+    on every pair used by *any* optimal assignment.  Raises
+    :class:`NoSolutionError` if every assignment needs an infinite cost.
+    """
+    import numpy as np
+
+    cost = np.asarray(cost, dtype=float)
+    n = cost.shape[0]
+    if n == 0:
+        return [], np.zeros(0), np.zeros(0)
+    finite = np.isfinite(cost)
+    big = (np.abs(cost[finite]).sum() if finite.any() else 0.0) + 1.0
+    work = np.where(finite, cost, big * (n + 1))
+
+    # 1-based potentials and matches; column 0 is the virtual start column
+    u = np.zeros(n + 1)
+    v = np.zeros(n + 1)
+    owner = np.zeros(n + 1, dtype=np.intp)
+    way = np.zeros(n + 1, dtype=np.intp)
+    for row in range(1, n + 1):
+        owner[0] = row
+        col = 0
+        minv = np.full(n + 1, np.inf)
+        used = np.zeros(n + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = owner[col]
+            reduced = work[current - 1] - u[current] - v[1:]
+            open_cols = ~used[1:]
+            better = open_cols & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = col
+            masked = np.where(open_cols, minv[1:], np.inf)
+            delta = masked.min()
+            ties = np.flatnonzero((masked <= delta) & (owner[1:] == 0))
+            following = (ties[0] if ties.size else masked.argmin()) + 1
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            col = following
+            if owner[col] == 0:
+                break
+        while col:
+            previous = way[col]
+            owner[col] = owner[previous]
+            col = previous
+
+    assignment = [None] * n
+    for col in range(1, n + 1):
+        assignment[int(owner[col]) - 1] = col - 1
+    if any(not finite[g, r] for g, r in enumerate(assignment)):
+        raise NoSolutionError()
+    return assignment, u[1:], v[1:]
+
+
+def near_optimal(eligibility, cost, row_potential, col_potential, slack=0.0):
+    """Restrict ``eligibility`` to pairs whose reduced cost is within ``slack``.
+
+    With ``slack=0`` the perfect matchings of the result are exactly the
+    optimal assignments; a positive ``slack`` admits assignments costing at
+    most ``slack`` per participant above the optimum.
+    """
+    import numpy as np
+
+    reduced = cost - row_potential[:, None] - col_potential[None, :]
+    limit = slack + 1e-9 * (1.0 + np.abs(cost[np.isfinite(cost)]).max(initial=0.0))
+    loose = ~(reduced <= limit)
+    return Eligibility(eligibility.names, [np.flatnonzero(row).tolist() for row in loose])
@@ -433,8 +433,26 @@
     }
   }
 
+  async function fetchRank(gameId, score) {
+    const resp = await fetch(
+      `/api/scores/${gameId}/rank?score=${encodeURIComponent(score)}&neighbours=0`
+    );
+    if (!resp.ok) throw new Error('Failed to fetch rank');
+    return resp.json();
+  }
+
   async function playerQualifies(gameId, score, limit = LEADERBOARD_LIMIT) {
     if (!score || score <= 0) return false;
+    const limitValue = typeof limit === 'number' && limit > 0 ? limit : LEADERBOARD_LIMIT;
+    try {
+      // Ask the server for the rank instead of downloading the board
+      const data = await fetchRank(gameId, score);
+      if (data && typeof data.rank === 'number') {
+        return data.rank <= limitValue;
+      }
+    } catch (err) {
+      console.error('Failed to rank score for', gameId, err);
+    }
     const scores = await loadScores(gameId);
     return qualifiesWithinScores(scores, score, limit);
   }
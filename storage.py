@@ -1,5 +1,6 @@
 import os
 import shutil
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 
@@ -90,6 +91,16 @@ def scores_db_path() -> str:
     return os.path.join(ensure_data_dir(), 'scores.sqlite3')
 
 
+def history_db_path(data_dir: str | None = None) -> str:
+    """Return the draw-history database for a data directory."""
+    return os.path.join(data_dir or get_data_dir(), 'history.sqlite3')
+
+
+def score_archive_dir(db_path: str | None = None) -> str:
+    """Return where compacted score runs are archived, next to the database."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or scores_db_path())), 'score-archive')
+
+
 def match_file_path(year: int, data_dir: str | None = None) -> str:
     base = data_dir or get_data_dir()
     ensure_dir(base)
@@ -127,6 +138,9 @@ def snapshot_sources() -> list[str]:
     db_path = scores_db_path()
     if os.path.exists(db_path):
         files.append(db_path)
+    history_path = history_db_path()
+    if os.path.exists(history_path):
+        files.append(history_path)
     data_root = Path(get_data_dir())
     for candidate in sorted(data_root.glob('secret-santa-*.json')):
         if candidate.is_file():
@@ -139,6 +153,26 @@ def list_snapshots() -> list[str]:
     return sorted(str(p.name) for p in root.iterdir() if p.is_dir())
 
 
+def _is_sqlite(path) -> bool:
+    return str(path).endswith('.sqlite3')
+
+
+def _backup_sqlite(src, dest, standalone=False) -> None:
+    # The online backup API takes a consistent copy even while WAL-mode
+    # connections are writing, and restoring through it updates the live
+    # database in place so pooled connections see the restored data
+    source = sqlite3.connect(str(src))
+    target = sqlite3.connect(str(dest))
+    try:
+        source.backup(target)
+        if standalone:
+            # Snapshots are single files without -wal/-shm companions
+            target.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target.close()
+        source.close()
+
+
 def create_snapshot() -> str:
     root = Path(snapshots_root())
     stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
@@ -146,7 +180,10 @@ def create_snapshot() -> str:
     target.mkdir(parents=True, exist_ok=True)
     for src in snapshot_sources():
         dest = target / Path(src).name
-        shutil.copy2(src, dest)
+        if _is_sqlite(src):
+            _backup_sqlite(src, dest, standalone=True)
+        else:
+            shutil.copy2(src, dest)
     return str(target)
 
 
@@ -157,6 +194,11 @@ def restore_snapshot(name: str) -> str:
         raise FileNotFoundError(f"Snapshot '{name}' does not exist")
     dest_root = Path(get_data_dir())
     for entry in source.iterdir():
+        if entry.name.endswith(('-wal', '-shm', '-journal')):
+            continue
         target = dest_root / entry.name
-        shutil.copy2(entry, target)
+        if _is_sqlite(entry):
+            _backup_sqlite(entry, target)
+        else:
+            shutil.copy2(entry, target)
     return str(source)
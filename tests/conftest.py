@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The app is imported here, not at the top: tests/test_admin_games.py
+    # has to set up its environment before the first import
+    from app import app
+
+    monkeypatch.delenv('DATA_DIR', raising=False)
+    monkeypatch.setenv('SCORES_DB', str(tmp_path / 'scores.sqlite3'))
+    return app.test_client()
@@ -0,0 +1,62 @@
+import pytest
+
+from secret_santa import NoSolutionError, SecretSanta
+
+
+def admin_client():
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = 'jimmy'
+    return client
+
+
+def test_check_matches_requires_admin():
+    from app import app
+
+    client = app.test_client()
+    assert client.get('/api/admin/check_matches').status_code == 401
+    with client.session_transaction() as sess:
+        sess['user'] = 'emma'
+    assert client.get('/api/admin/check_matches').status_code == 403
+
+
+def test_check_matches_reports_feasible_draw():
+    resp = admin_client().get('/api/admin/check_matches')
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['feasible'] is True
+    assert data['participants'] == data['matched'] == 10
+    assert data['blocked'] == []
+
+
+def test_check_matches_names_blocked_givers(monkeypatch):
+    def crowded_history(self):
+        # jimmy, klaus and ditte have already given to everyone but sara and emma
+        everyone = sorted(set().union(*self.couples))
+        keep = {'sara', 'emma'}
+        return {name: [other for other in everyone if other not in keep] if name in {'jimmy', 'klaus', 'ditte'} else []
+                for name in everyone}
+
+    monkeypatch.setattr(SecretSanta, 'load_previous', crowded_history)
+    monkeypatch.delenv('DRAW_LOCKED', raising=False)
+    client = admin_client()
+    resp = client.get('/api/admin/check_matches')
+    data = resp.get_json()
+    assert data['feasible'] is False
+    assert data['blocked'] == [{'givers': ['ditte', 'jimmy', 'klaus'], 'recipients': ['emma', 'sara']}]
+
+    resp = client.post('/api/admin/run_matches')
+    assert resp.status_code == 409
+    assert resp.get_json()['blocked'] == data['blocked']
+
+
+def test_draw_fails_fast_with_diagnostics():
+    santa = SecretSanta(year=2040)
+    santa.previous = {name: [other for other in santa.names if other != 'sara'] for name in santa.names}
+    with pytest.raises(NoSolutionError) as excinfo:
+        santa.draw()
+    for group in excinfo.value.blocked:
+        assert set(group['recipients']) <= {'sara'}
+        assert len(group['recipients']) < len(group['givers'])
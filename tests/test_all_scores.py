@@ -0,0 +1,60 @@
+import json
+import re
+
+import pytest
+
+
+@pytest.fixture
+def client(client):
+    batch = [{'game': 'forste-advent', 'name': f'p{i}', 'score': i} for i in range(12)]
+    batch += [{'game': 'anden-advent', 'name': 'a', 'score': 4}, {'game': 'reindeer-rush', 'name': 'r', 'score': 2}]
+    assert client.post('/api/scores/batch', json={'scores': batch}).status_code == 200
+    return client
+
+
+def test_one_request_returns_the_top_ten_of_each_game(client):
+    data = client.get('/api/scores?games=forste-advent,reindeer-rush,tredje-advent').get_json()
+    assert set(data['scores']) == {'forste-advent', 'fjerde-advent', 'tredje-advent'}
+    assert [row['score'] for row in data['scores']['forste-advent']] == list(range(11, 1, -1))
+    assert data['scores']['fjerde-advent'][0]['name'] == 'r'
+    assert data['scores']['tredje-advent'] == []
+
+
+def test_unknown_games_are_refused_before_caching(client):
+    import app as app_module
+
+    resp = client.get('/api/scores?games=forste-advent,no-such-game')
+    assert resp.status_code == 404
+    assert not any('no-such-game' in key[1] for key in app_module.LEADERBOARDS_CACHE)
+
+
+def test_default_is_every_enabled_game(client):
+    from app import set_game_enabled
+
+    set_game_enabled('tredje-advent', False)
+    try:
+        games = set(client.get('/api/scores').get_json()['scores'])
+    finally:
+        set_game_enabled('tredje-advent', True)
+    assert games == {'forste-advent', 'anden-advent', 'fjerde-advent'}
+
+
+def test_etag_follows_every_included_game(client):
+    first = client.get('/api/scores?games=forste-advent,anden-advent')
+    etag = first.headers['ETag']
+    assert client.get('/api/scores?games=forste-advent,anden-advent', headers={'If-None-Match': etag}).status_code == 304
+    client.post('/api/scores/anden-advent', json={'name': 'b', 'score': 9})
+    changed = client.get('/api/scores?games=forste-advent,anden-advent', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert [row['score'] for row in changed.get_json()['scores']['anden-advent']] == [9, 4]
+
+
+def test_high_scores_page_inlines_the_boards(client):
+    with client.session_transaction() as sess:
+        sess['user'] = 'guest'
+    html = client.get('/high-scores').get_data(as_text=True)
+    match = re.search(r'const initialScores = (\{.*?\});\n', html, re.DOTALL)
+    assert match
+    initial = json.loads(match.group(1))
+    assert [row['name'] for row in initial['anden-advent']] == ['a']
+    assert len(initial['forste-advent']) == 10
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from batch_draw import draw_groups, group_data_dir
+from secret_santa import SecretSanta
+
+
+def ring(prefix, size):
+    return [[f"{prefix}{i}a", f"{prefix}{i}b"] for i in range(size)]
+
+
+def test_secret_santa_accepts_constraints_directly():
+    santa = SecretSanta(year=2040, couples=[["a", "b"], ["c"], ["d"]], previous={"a": ["c"]})
+    assert santa.names == {"a", "b", "c", "d"}
+    assert santa.get_eligible_names("a") == {"d"}
+
+
+def test_draw_groups_writes_each_partition(tmp_path):
+    groups = {
+        "family": {"couples": ring("f", 4), "previous": {}},
+        "office": {"couples": ring("o", 6)},
+        # Two singles who already gave to each other: no draw possible
+        "stuck": {"couples": [["x"], ["y"]], "previous": {"x": ["y"], "y": ["x"]}},
+    }
+    result = draw_groups(groups, year=2040, root=str(tmp_path), workers=2)
+    assert [report["group"] for report in result["groups"]] == ["family", "office", "stuck"]
+    assert result["succeeded"] == 2 and result["failed"] == 1
+    for name in ("family", "office"):
+        path = tmp_path / "groups" / name / "secret-santa-2040.json"
+        config = json.loads(path.read_text())
+        assert set(config) == set(config.values()) == {p for c in groups[name]["couples"] for p in c}
+    stuck = result["groups"][2]
+    assert stuck["success"] is False and stuck["blocked"]
+    assert not (tmp_path / "groups" / "stuck").exists()
+    assert all(report["seconds"] >= 0 for report in result["groups"])
+
+
+def test_group_names_cannot_escape_the_data_dir(tmp_path):
+    with pytest.raises(ValueError):
+        group_data_dir("../etc", root=str(tmp_path))
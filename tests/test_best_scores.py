@@ -0,0 +1,39 @@
+import sqlite3
+
+
+def test_existing_runs_are_backfilled_once(client, tmp_path):
+    # The legacy file sits where the client fixture points SCORES_DB
+    path = tmp_path / 'scores.sqlite3'
+    con = sqlite3.connect(str(path))
+    con.execute(
+        "CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, game TEXT NOT NULL, "
+        "name TEXT NOT NULL, score INTEGER NOT NULL, created_at TEXT NOT NULL)"
+    )
+    con.executemany(
+        "INSERT INTO scores (game, name, score, created_at) VALUES ('forste-advent', ?, ?, ?)",
+        [('a', 3, 't1'), ('b', 8, 't2'), ('a', 8, 't3'), ('a', 8, 't4'), ('b', 2, 't5')],
+    )
+    con.commit()
+    con.close()
+
+    rows = client.get('/api/scores/forste-advent').get_json()['scores']
+    # Equal scores rank by who got there first
+    assert [(r['name'], r['score'], r['created_at']) for r in rows] == [('b', 8, 't2'), ('a', 8, 't3')]
+
+    client.post('/api/scores/forste-advent', json={'name': 'a', 'score': 10})
+    rows = client.get('/api/scores/forste-advent').get_json()['scores']
+    assert [(r['name'], r['score']) for r in rows] == [('a', 10), ('b', 8)]
+
+
+def test_leaderboard_query_reads_only_the_covering_index(client):
+    from app import get_connection
+
+    client.get('/api/scores/forste-advent')
+    plan = get_connection().execute(
+        "EXPLAIN QUERY PLAN SELECT name, score, created_at FROM best_scores "
+        "WHERE game = ? ORDER BY score DESC, score_id ASC LIMIT 10",
+        ('forste-advent',),
+    ).fetchall()
+    detail = ' '.join(row[-1] for row in plan)
+    assert 'COVERING INDEX idx_best_scores_rank' in detail
+    assert 'TEMP B-TREE' not in detail
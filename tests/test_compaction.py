@@ -0,0 +1,73 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+
+
+def seed(client, days_ago, runs):
+    played = (datetime.utcnow() - timedelta(days=days_ago)).isoformat()
+    batch = [{'game': 'forste-advent', 'name': name, 'score': score, 'created_at': played} for name, score in runs]
+    assert client.post('/api/scores/batch', json={'scores': batch}).status_code == 200
+
+
+def test_compaction_keeps_bests_and_recent_runs(client, tmp_path):
+    from app import get_connection
+    from compaction import compact_scores
+
+    seed(client, 90, [('a', 5), ('a', 9), ('b', 1)] + [('c', n) for n in range(300)])
+    seed(client, 2, [('a', 3)])
+    report = compact_scores(str(tmp_path / 'scores.sqlite3'), str(tmp_path / 'archive'), keep_days=30, batch=50, chunk=20)
+
+    # bests of a, b and c plus a's recent run survive
+    assert (report['archived'], report['kept']) == (300, 4)
+    con = get_connection(str(tmp_path / 'scores.sqlite3'))
+    assert sorted(con.execute("SELECT name, score FROM scores").fetchall()) == [('a', 3), ('a', 9), ('b', 1), ('c', 299)]
+    rows = client.get('/api/scores/forste-advent').get_json()['scores']
+    assert [(r['name'], r['score']) for r in rows] == [('c', 299), ('a', 9), ('b', 1)]
+
+    (archive,) = report['archives']
+    with gzip.open(archive, 'rt') as fh:
+        archived = [json.loads(line) for line in fh]
+    assert len(archived) == 300
+    assert {(r['name'], r['score']) for r in archived} == {('a', 5)} | {('c', n) for n in range(299)}
+    assert report['vacuum'] == 'incremental'
+    assert report['bytes_reclaimed'] > 0
+    assert set(report['timings_ms']['after']) == {'leaderboard', 'player_runs', 'runs_per_game'}
+
+    again = compact_scores(str(tmp_path / 'scores.sqlite3'), str(tmp_path / 'archive'), keep_days=30)
+    assert again['archived'] == 0
+    with gzip.open(archive, 'rt') as fh:
+        assert len(fh.readlines()) == 300
+
+
+def test_rebuilding_after_compaction_keeps_past_period_boards(client, tmp_path):
+    from app import get_connection, rebuild_best_scores
+    from compaction import compact_scores
+
+    seed(client, 90, [('a', 5), ('a', 2), ('b', 4)])
+    seed(client, 80, [('a', 9)])
+    day = (datetime.utcnow() - timedelta(days=90)).date().isoformat()
+    url = f'/api/scores/forste-advent?period=day&start={day}'
+    before = client.get(url).get_json()['scores']
+    assert [(r['name'], r['score']) for r in before] == [('a', 5), ('b', 4)]
+
+    report = compact_scores(str(tmp_path / 'scores.sqlite3'), str(tmp_path / 'archive'), keep_days=30)
+    assert report['archived'] == 1
+    con = get_connection(str(tmp_path / 'scores.sqlite3'))
+    with con:
+        rebuild_best_scores(con)
+        con.execute("UPDATE score_versions SET version = version + 1")
+    assert client.get(url).get_json()['scores'] == before
+
+
+def test_admin_endpoint_runs_the_compaction(client, tmp_path):
+    seed(client, 60, [('a', 1), ('a', 2)])
+    assert client.post('/api/admin/compact_scores', json={}).status_code in (302, 401, 403)
+    with client.session_transaction() as sess:
+        sess['user'] = 'jimmy'
+    assert client.post('/api/admin/compact_scores', json={'keep_days': -1}).status_code == 400
+    resp = client.post('/api/admin/compact_scores', json={'keep_days': 7})
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['success'] is True
+    assert (data['archived'], data['kept']) == (1, 1)
+    assert (tmp_path / 'score-archive').is_dir()
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+import yaml
+
+import constraints
+from constraints import clear_cache, load_yaml, sidecar_path
+from secret_santa import SecretSanta
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+def write(path, data, mtime_ns=None):
+    path.write_text(yaml.safe_dump(data))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_yaml_is_parsed_once_until_it_changes(tmp_path, monkeypatch):
+    path = tmp_path / "previous.yaml"
+    write(path, {"a": ["b"]}, mtime_ns=10**18)
+    first = load_yaml(path)
+    assert load_yaml(path) is first
+
+    # Same mtime, different size still counts as a change
+    write(path, {"a": ["b", "c"]}, mtime_ns=10**18)
+    assert load_yaml(path) == {"a": ["b", "c"]}
+
+
+def test_sidecar_skips_the_yaml_parser(tmp_path, monkeypatch):
+    path = tmp_path / "couples.yaml"
+    write(path, [["a", "b"], ["c"]])
+    load_yaml(path, sidecar=True)
+    assert os.path.exists(sidecar_path(str(path)))
+
+    clear_cache()
+    monkeypatch.setattr(constraints.yaml, "load", pytest.fail)
+    assert load_yaml(path, sidecar=True) == [["a", "b"], ["c"]]
+
+
+def test_stale_sidecar_is_ignored(tmp_path):
+    path = tmp_path / "couples.yaml"
+    write(path, [["a", "b"]])
+    load_yaml(path, sidecar=True)
+    write(path, [["a", "b"], ["c", "d"]])
+    clear_cache()
+    assert load_yaml(path, sidecar=True) == [["a", "b"], ["c", "d"]]
+
+
+def test_secret_santa_instances_share_compiled_constraints():
+    first = SecretSanta(year=2040)
+    second = SecretSanta(year=2040)
+    assert second.couples is first.couples
+    assert second.eligibility is first.eligibility
+    second.previous = {}
+    assert second.eligibility is not first.eligibility
@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+
+import pytest
+
+import db
+from db import close_all, get_connection
+
+
+def test_connection_is_reused_per_thread(tmp_path):
+    path = str(tmp_path / 'pool.sqlite3')
+    con = get_connection(path)
+    assert get_connection(path) is con
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_connection(path)))
+    thread.start()
+    thread.join()
+    assert other[0] is not con
+
+
+def test_connections_are_tuned_for_concurrency(tmp_path):
+    con = get_connection(str(tmp_path / 'pool.sqlite3'))
+    assert con.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert con.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    assert con.execute('PRAGMA busy_timeout').fetchone()[0] == db.BUSY_TIMEOUT_MS
+
+
+def test_replaced_file_gets_a_fresh_connection(tmp_path):
+    path = tmp_path / 'pool.sqlite3'
+    con = get_connection(str(path))
+    with con:
+        con.execute('CREATE TABLE t (x)')
+    for suffix in ('', '-wal', '-shm'):
+        (tmp_path / f'pool.sqlite3{suffix}').unlink(missing_ok=True)
+    fresh = get_connection(str(path))
+    assert fresh is not con
+    assert fresh.execute("SELECT name FROM sqlite_master WHERE name = 't'").fetchone() is None
+
+
+def test_close_all_closes_pooled_connections(tmp_path):
+    path = str(tmp_path / 'pool.sqlite3')
+    con = get_connection(path)
+    close_all()
+    with pytest.raises(sqlite3.ProgrammingError):
+        con.execute('SELECT 1')
+    assert get_connection(path).execute('SELECT 1').fetchone() == (1,)
+
+
+def test_snapshot_restore_reaches_open_connections(tmp_path, monkeypatch):
+    from storage import create_snapshot, restore_snapshot, scores_db_path
+
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.delenv('SCORES_DB', raising=False)
+    path = scores_db_path()
+    con = get_connection(path)
+    with con:
+        con.execute('CREATE TABLE scores (score INTEGER)')
+        con.execute('INSERT INTO scores VALUES (1)')
+    snapshot = create_snapshot()
+    with con:
+        con.execute('INSERT INTO scores VALUES (2)')
+    restore_snapshot(snapshot.rsplit('/', 1)[-1])
+    assert con.execute('SELECT score FROM scores').fetchall() == [(1,)]
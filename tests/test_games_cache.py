@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def client(client):
+    with client.session_transaction() as sess:
+        sess['user'] = 'guest'
+    return client
+
+
+def test_page_renders_do_not_query_games_once_cached(client):
+    from app import get_connection
+
+    client.get('/high-scores')
+    statements = []
+    con = get_connection()
+    con.set_trace_callback(statements.append)
+    try:
+        assert client.get('/high-scores').status_code == 200
+    finally:
+        con.set_trace_callback(None)
+    assert not [sql for sql in statements if 'games' in sql]
+
+
+def test_toggles_apply_here_at_once_and_elsewhere_after_the_ttl(client, tmp_path, monkeypatch):
+    import app as app_module
+
+    assert app_module.is_game_enabled('forste-advent')
+    app_module.set_game_enabled('forste-advent', False)
+    assert not app_module.is_game_enabled('forste-advent')
+
+    # Another worker turns it back on
+    other = sqlite3.connect(str(tmp_path / 'scores.sqlite3'))
+    with other:
+        other.execute("UPDATE games SET enabled = 1 WHERE game = 'forste-advent'")
+        app_module.bump_games_version(other)
+    other.close()
+    assert not app_module.is_game_enabled('forste-advent')
+
+    clock = [app_module.time.monotonic() + app_module.GAMES_CACHE_TTL + 0.1]
+    monkeypatch.setattr(app_module.time, 'monotonic', lambda: clock[0])
+    assert app_module.is_game_enabled('forste-advent')
+    assert {g['game']: g['enabled'] for g in app_module.get_games()}['forste-advent'] is True
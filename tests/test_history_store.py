@@ -0,0 +1,100 @@
+import datetime
+import json
+import shutil
+import time
+
+import yaml
+
+from history import import_history, recent_pairs, record_draw, recorded_years
+from secret_santa import SecretSanta
+
+
+def test_import_folds_yaml_and_match_files(tmp_path):
+    (tmp_path / 'secret-santa-2024.json').write_text(json.dumps({'a': 'b', 'b': 'a'}))
+    (tmp_path / 'secret-santa-2025.json').write_text(json.dumps({'a': 'c', 'b': 'c'}))
+    path = str(tmp_path / 'history.sqlite3')
+    # b's list already includes 2024, which must not be counted twice
+    previous = {'a': ['c', 'd'], 'b': ['d', 'a']}
+    assert import_history(path, previous, [str(tmp_path)]) == [2022, 2023, 2024, 2025]
+    assert recent_pairs(path, 2026) == {'a': ['c', 'd', 'b', 'c'], 'b': ['d', 'a', 'c']}
+    assert recent_pairs(path, 2026, years=1) == {'a': ['c'], 'b': ['c']}
+    assert recent_pairs(path, 2025) == {'a': ['c', 'd', 'b'], 'b': ['d', 'a']}
+
+
+def test_save_records_and_feeds_the_next_draw(tmp_path):
+    santa = SecretSanta(year=2041, data_dir=str(tmp_path))
+    santa.draw(seed=1)
+    santa.save()
+    path = santa.history_path
+    assert 2041 in recorded_years(path)
+    # previous.yaml was migrated the first time round, before the match files
+    older = yaml.safe_load(open('previous.yaml'))
+    assert recent_pairs(path, 2041)['jimmy'][:len(older['jimmy'])] == older['jimmy']
+
+    following = SecretSanta(year=2042, data_dir=str(tmp_path))
+    assert following.previous['jimmy'][-1] == santa.config['jimmy']
+    assert santa.config['jimmy'] not in following.get_eligible_names('jimmy')
+    recent = SecretSanta(year=2042, data_dir=str(tmp_path), history_years=1)
+    assert recent.previous == {giver: [recipient] for giver, recipient in santa.config.items()}
+
+
+def test_redraw_replaces_the_year(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    record_draw(path, 2030, {'a': 'b', 'b': 'a'})
+    record_draw(path, 2030, {'a': 'c'})
+    assert recent_pairs(path, 2031) == {'a': ['c']}
+
+
+def test_twenty_years_for_hundreds_load_in_milliseconds(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    people = [f'p{i}' for i in range(500)]
+    for year in range(2000, 2025):
+        shift = year % 499 + 1
+        record_draw(path, year, {p: people[(i + shift) % 500] for i, p in enumerate(people)})
+    start = time.perf_counter()
+    pairs = recent_pairs(path, 2025)
+    elapsed = time.perf_counter() - start
+    assert len(pairs) == 500 and all(len(past) == 25 for past in pairs.values())
+    assert elapsed < 0.1
+
+
+def test_app_draws_every_year_within_the_history_window(tmp_path, monkeypatch):
+    import app as app_module
+
+    for name in ('couples.yaml', 'previous.yaml'):
+        shutil.copy(name, tmp_path / name)
+    # Keep the repo's own match files out of this history
+    monkeypatch.chdir(tmp_path)
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    monkeypatch.setenv('DATA_DIR', str(data_dir))
+    this_year = datetime.date.today().year
+    for year in range(this_year - 10, this_year):
+        santa = SecretSanta(year=year, data_dir=str(data_dir), history_years=app_module.HISTORY_YEARS)
+        santa.draw()
+        santa.save()
+    assert len(recorded_years(santa.history_path)) >= 10
+    assert app_module.load_matches().config
+
+    # Ten years of hard exclusions leave nobody to draw; the app still boots
+    (data_dir / f'secret-santa-{this_year}.json').unlink()
+    monkeypatch.setattr(app_module, 'HISTORY_YEARS', 100)
+    assert app_module.load_matches().config == {}
+
+
+def test_other_groups_do_not_import_the_repo_match_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'secret-santa-2024.json').write_text(json.dumps({'a': 'b', 'b': 'a'}))
+    monkeypatch.setenv('DATA_DIR', str(tmp_path / 'app'))
+    group_dir = tmp_path / 'groups' / 'office'
+    group_dir.mkdir(parents=True)
+
+    office = SecretSanta(year=2041, data_dir=str(group_dir), couples=[['a'], ['b'], ['c']], previous={})
+    office.draw(seed=1)
+    office.save()
+    assert recorded_years(office.history_path) == [2041]
+
+    family = SecretSanta(year=2041, data_dir=str(tmp_path / 'app'), couples=[['a'], ['b'], ['c']], previous={})
+    family.draw(seed=1)
+    family.save()
+    assert recorded_years(family.history_path) == [2024, 2041]
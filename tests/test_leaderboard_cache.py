@@ -0,0 +1,62 @@
+import sqlite3
+
+
+def scores(resp):
+    return [row['score'] for row in resp.get_json()['scores']]
+
+
+def test_unchanged_leaderboard_revalidates_with_304(client):
+    client.post('/api/scores/forste-advent', json={'name': 'a', 'score': 7})
+    first = client.get('/api/scores/forste-advent')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+
+    again = client.get('/api/scores/forste-advent', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+
+    client.post('/api/scores/forste-advent', json={'name': 'b', 'score': 9})
+    changed = client.get('/api/scores/forste-advent', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert scores(changed) == [9, 7]
+
+
+def test_reset_invalidates_the_cache(client):
+    from app import reset_scores_for_game
+
+    client.post('/api/scores/anden-advent', json={'name': 'a', 'score': 4})
+    assert scores(client.get('/api/scores/anden-advent')) == [4]
+    reset_scores_for_game('anden-advent')
+    assert scores(client.get('/api/scores/anden-advent')) == []
+
+
+def test_writes_from_other_workers_are_seen_through_the_version(client, tmp_path):
+    client.post('/api/scores/tredje-advent', json={'name': 'a', 'score': 1})
+    assert scores(client.get('/api/scores/tredje-advent')) == [1]
+
+    # Another worker process writing to the same file
+    other = sqlite3.connect(str(tmp_path / 'scores.sqlite3'))
+    with other:
+        other.execute(
+            "INSERT INTO best_scores (game, name, score, created_at, score_id) VALUES ('tredje-advent', 'b', 5, 'x', 99)"
+        )
+    # Without a version bump this worker keeps serving its cached copy
+    assert scores(client.get('/api/scores/tredje-advent')) == [1]
+    with other:
+        other.execute("UPDATE score_versions SET version = version + 1 WHERE game = 'tredje-advent'")
+    other.close()
+    assert scores(client.get('/api/scores/tredje-advent')) == [5, 1]
+
+
+def test_unknown_games_are_not_cached(client, monkeypatch):
+    import app as app_module
+
+    assert client.get('/api/scores/no-such-game').status_code == 404
+    assert not any(key[1] == 'no-such-game' for key in app_module.LEADERBOARD_CACHE)
+
+    monkeypatch.setattr(app_module, 'LEADERBOARD_CACHE_SIZE', 2)
+    for game in ('forste-advent', 'anden-advent', 'tredje-advent'):
+        client.get(f'/api/scores/{game}')
+    assert [key[1] for key in app_module.LEADERBOARD_CACHE] == ['anden-advent', 'tredje-advent']
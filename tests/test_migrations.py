@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import migrations
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def slow_counter(con):
+    con.execute("CREATE TABLE IF NOT EXISTS runs (n INTEGER)")
+    con.execute("INSERT INTO runs VALUES (1)")
+    time.sleep(0.2)
+
+
+STEPS = [(1, "counter", slow_counter)]
+
+
+def migrate_in_child(path):
+    migrations.run(path, STEPS)
+
+
+def test_workers_starting_together_apply_each_step_once(tmp_path):
+    path = str(tmp_path / 'race.sqlite3')
+    ctx = multiprocessing.get_context('fork')
+    children = [ctx.Process(target=migrate_in_child, args=(path,)) for _ in range(4)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+    assert all(child.exitcode == 0 for child in children)
+
+    con = sqlite3.connect(path)
+    assert con.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 1
+    assert con.execute("SELECT version, name FROM schema_migrations").fetchall() == [(1, 'counter')]
+    assert migrations.run(path, STEPS) == []
+
+
+def test_failed_step_leaves_nothing_behind(tmp_path):
+    path = str(tmp_path / 'broken.sqlite3')
+
+    def broken(con):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        migrations.run(path, STEPS + [(2, "broken", broken)])
+    con = sqlite3.connect(path)
+    assert con.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall() == []
+
+    applied = migrations.run(path, STEPS)
+    assert [(version, name) for version, name, _ in applied] == [(1, 'counter')]
+
+
+def test_legacy_moves_run_once_per_database(tmp_path, monkeypatch):
+    path = tmp_path / 'legacy.sqlite3'
+    con = sqlite3.connect(str(path))
+    con.execute(
+        "CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, game TEXT NOT NULL, "
+        "name TEXT NOT NULL, score INTEGER NOT NULL, created_at TEXT NOT NULL)"
+    )
+    con.execute(
+        "INSERT INTO scores (game, name, score, created_at) VALUES ('tredje-advent', 'a', 5, '2024-12-15T10:00:00')"
+    )
+    con.commit()
+    con.close()
+
+    from app import MIGRATIONS, app, reset_scores_for_game
+    from db import forget_schema
+
+    monkeypatch.delenv('DATA_DIR', raising=False)
+    monkeypatch.setenv('SCORES_DB', str(path))
+    client = app.test_client()
+    assert [r['score'] for r in client.get('/api/scores/fjerde-advent').get_json()['scores']] == [5]
+
+    # A new season's Tredje Advent scores stay put after a restart, even
+    # with Fjerde Advent empty again
+    client.post('/api/scores/tredje-advent', json={'name': 'b', 'score': 7})
+    reset_scores_for_game('fjerde-advent')
+    forget_schema(str(path))
+    assert [r['score'] for r in client.get('/api/scores/tredje-advent').get_json()['scores']] == [7]
+
+    ledger = sqlite3.connect(str(path)).execute("SELECT version, name FROM schema_migrations ORDER BY version")
+    assert ledger.fetchall() == [(version, name) for version, name, _ in MIGRATIONS]
+
+
+def test_gunicorn_config_shows_the_migration_log(tmp_path):
+    path = tmp_path / 'logged.sqlite3'
+    probe = (
+        f"import runpy, migrations; runpy.run_path({str(ROOT_DIR / 'gunicorn.conf.py')!r}); "
+        f"migrations.run({str(path)!r}, [(1, 'noop', lambda con: None)])"
+    )
+    env = {**os.environ, 'PYTHONPATH': str(ROOT_DIR)}
+    result = subprocess.run([sys.executable, '-c', probe], env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert 'migrations: Migration 1 (noop)' in result.stderr
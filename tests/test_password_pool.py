@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+
+import pytest
+from dotenv import dotenv_values
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import passwords
+
+
+def test_full_queue_is_refused_instead_of_waiting(monkeypatch):
+    release = threading.Event()
+
+    def slow_check(stored, password):
+        release.wait(5)
+        return True
+
+    monkeypatch.setattr(passwords, 'check_password_hash', slow_check)
+    pool = passwords.PasswordPool(workers=1, max_queue=1)
+    results = []
+    threads = [
+        threading.Thread(target=lambda n=n: results.append(pool.verify(n, 'x', 'y'))) for n in ('a', 'b')
+    ]
+    for queued, thread in enumerate(threads, 1):
+        thread.start()
+        while pool.stats()['pending'] < queued:
+            time.sleep(0.001)
+    # One running, one queued: a third name is turned away
+    with pytest.raises(passwords.PoolBusy) as exc:
+        pool.verify('c', 'x', 'y')
+    assert exc.value.retry_after >= 1
+    # ...and so is a second check for a name already being checked
+    with pytest.raises(passwords.Throttled):
+        pool.verify('a', 'x', 'y')
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [True, True]
+    stats = pool.stats()
+    assert stats['verified'] == 2 and stats['busy'] == 1 and stats['throttled'] == 1
+    assert stats['pending'] == 0 and stats['hash_ms']['count'] == 2
+
+
+def test_repeated_failures_throttle_only_that_name():
+    stored = generate_password_hash('right', 'pbkdf2:sha256:1000')
+    pool = passwords.PasswordPool(max_failures=3, window=60)
+    for _ in range(3):
+        assert pool.verify('a', stored, 'wrong') is False
+    with pytest.raises(passwords.Throttled) as exc:
+        pool.verify('a', stored, 'right')
+    assert 1 <= exc.value.retry_after <= 60
+    assert pool.verify('b', stored, 'right') is True
+    assert pool.stats()['throttled_names'] == 1
+
+
+def test_method_defaults_are_spelled_out():
+    assert passwords.canonical_method('scrypt') == 'scrypt:32768:8:1'
+    assert passwords.canonical_method('pbkdf2:sha256') == 'pbkdf2:sha256:1000000'
+    assert not passwords.needs_rehash(generate_password_hash('x'), 'scrypt')
+    assert passwords.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:260000'), 'scrypt')
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    env_file = tmp_path / '.env'
+    env_file.write_text(f"LOGIN_rehashtest='{generate_password_hash('old-phrase', 'pbkdf2:sha256:1000')}'\n")
+    monkeypatch.setattr(app_module, 'ENV_FILE', str(env_file))
+    monkeypatch.setattr(app_module, 'logins', app_module.logins)
+    monkeypatch.setattr(app_module, 'PASSWORD_POOL', passwords.PasswordPool(max_failures=2))
+    app_module.reload_logins()
+    yield app_module
+    # load_dotenv wrote it into the process environment
+    os.environ.pop('LOGIN_rehashtest', None)
+
+
+def login(client, code):
+    return client.post('/api/login', json={'name': 'rehashtest', 'code': code})
+
+
+def test_login_upgrades_hashes_made_with_old_parameters(app_module):
+    client = app_module.app.test_client()
+    assert login(client, 'old-phrase').status_code == 200
+
+    stored = dotenv_values(app_module.ENV_FILE)['LOGIN_rehashtest']
+    assert stored.startswith('pbkdf2:sha256:2000$')
+    assert check_password_hash(stored, 'old-phrase')
+    assert app_module.logins['rehashtest'] == stored
+    assert login(client, 'old-phrase').status_code == 200
+
+
+def test_login_is_throttled_after_failures(app_module):
+    client = app_module.app.test_client()
+    assert login(client, 'nope').status_code == 401
+    assert login(client, 'nope').status_code == 401
+    resp = login(client, 'old-phrase')
+    assert resp.status_code == 429
+    assert int(resp.headers['Retry-After']) >= 1
+
+
+def test_admin_benchmark_applies_the_chosen_method(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = 'jimmy'
+    assert client.post('/api/admin/password_benchmark', json={'target_ms': 5}).status_code == 400
+
+    resp = client.post('/api/admin/password_benchmark', json={'target_ms': 50, 'algorithm': 'pbkdf2', 'apply': True})
+    body = resp.get_json()
+    assert body['applied'] is True
+    assert body['method'].startswith('pbkdf2:sha256:')
+    assert dotenv_values(app_module.ENV_FILE)['PASSWORD_HASH_METHOD'] == body['method']
+
+    stats = client.get('/api/admin/passwords').get_json()
+    assert stats['method'] == body['method']
+    assert 'rehashtest' in stats['stale_hashes']
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+
+def board(resp):
+    return [(row['name'], row['score']) for row in resp.get_json()['scores']]
+
+
+def test_period_boards_keep_each_players_best_in_the_period(client):
+    # Saturday 2025-11-29 belongs to the week before the first Advent Sunday
+    batch = [
+        {'game': 'forste-advent', 'name': 'a', 'score': 50, 'created_at': '2025-11-29T12:00:00'},
+        {'game': 'forste-advent', 'name': 'a', 'score': 7, 'created_at': '2025-11-30T12:00:00'},
+        {'game': 'forste-advent', 'name': 'b', 'score': 5, 'created_at': '2025-11-30T13:00:00'},
+        {'game': 'forste-advent', 'name': 'b', 'score': 9, 'created_at': '2025-12-02T09:00:00'},
+        # 23:30 UTC is already the next day in Copenhagen
+        {'game': 'forste-advent', 'name': 'c', 'score': 3, 'created_at': '2025-11-30T23:30:00'},
+    ]
+    assert client.post('/api/scores/batch', json={'scores': batch}).status_code == 200
+
+    day = client.get('/api/scores/forste-advent?period=day&start=2025-11-30')
+    assert day.get_json()['period_start'] == '2025-11-30'
+    assert board(day) == [('a', 7), ('b', 5)]
+    assert board(client.get('/api/scores/forste-advent?period=day&start=2025-12-01')) == [('c', 3)]
+
+    week = client.get('/api/scores/forste-advent?period=week&start=2025-12-03').get_json()
+    assert week['period_start'] == '2025-11-30'
+    assert [(r['name'], r['score']) for r in week['scores']] == [('b', 9), ('a', 7), ('c', 3)]
+    assert board(client.get('/api/scores/forste-advent?period=week&start=2025-11-29')) == [('a', 50)]
+    assert board(client.get('/api/scores/forste-advent')) == [('a', 50), ('b', 9), ('c', 3)]
+
+
+def test_today_board_and_its_etag(client):
+    client.post('/api/scores/anden-advent', json={'name': 'a', 'score': 4})
+    old = (datetime.utcnow() - timedelta(days=10)).isoformat()
+    client.post('/api/scores/batch', json={'scores': [{'game': 'anden-advent', 'name': 'b', 'score': 8, 'created_at': old}]})
+    today = client.get('/api/scores/anden-advent?period=day')
+    assert board(today) == [('a', 4)]
+    etag = today.headers['ETag']
+    assert client.get('/api/scores/anden-advent?period=day', headers={'If-None-Match': etag}).status_code == 304
+    assert etag != client.get('/api/scores/anden-advent').headers['ETag']
+    assert client.get('/api/scores/anden-advent?period=month').status_code == 400
+    assert client.get('/api/scores/anden-advent?period=day&start=soon').status_code == 400
+    later = (datetime.utcnow() + timedelta(days=2)).date().isoformat()
+    assert client.get(f'/api/scores/anden-advent?period=day&start={later}').status_code == 400
+
+
+def test_existing_runs_are_rolled_up_once(tmp_path, monkeypatch):
+    import sqlite3
+
+    path = tmp_path / 'legacy.sqlite3'
+    con = sqlite3.connect(str(path))
+    con.execute(
+        "CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, game TEXT NOT NULL, "
+        "name TEXT NOT NULL, score INTEGER NOT NULL, created_at TEXT NOT NULL)"
+    )
+    con.executemany(
+        "INSERT INTO scores (game, name, score, created_at) VALUES ('forste-advent', ?, ?, ?)",
+        [('a', 3, '2025-12-01T10:00:00'), ('a', 6, '2025-12-01T11:00:00'), ('b', 2, '2025-12-08T10:00:00')],
+    )
+    con.commit()
+    con.close()
+
+    from app import app, get_connection
+
+    monkeypatch.delenv('DATA_DIR', raising=False)
+    monkeypatch.setenv('SCORES_DB', str(path))
+    client = app.test_client()
+    assert board(client.get('/api/scores/forste-advent?period=day&start=2025-12-01')) == [('a', 6)]
+    assert board(client.get('/api/scores/forste-advent?period=week&start=2025-12-08')) == [('b', 2)]
+    stamps = get_connection(str(path)).execute("SELECT created_ts FROM scores ORDER BY id").fetchall()
+    assert stamps == [(1764583200,), (1764586800,), (1765188000,)]
+
+
+def test_period_board_reads_only_the_covering_index(client):
+    from app import get_connection
+
+    client.get('/api/scores/forste-advent?period=day')
+    plan = get_connection().execute(
+        "EXPLAIN QUERY PLAN SELECT name, score, created_at FROM period_scores "
+        "WHERE game = ? AND period = ? AND period_start = ? ORDER BY score DESC, score_id ASC LIMIT 10",
+        ('forste-advent', 'day', '2025-12-01'),
+    ).fetchall()
+    detail = ' '.join(row[-1] for row in plan)
+    assert 'COVERING INDEX idx_period_scores_rank' in detail
+    assert 'TEMP B-TREE' not in detail
@@ -0,0 +1,150 @@
+import itertools
+import json
+import random
+
+import pytest
+
+from secret_santa import NoSolutionError, SecretSanta
+from solver import Eligibility, max_matching, repair
+
+
+def drawn_santa():
+    santa = SecretSanta(year=2040)
+    santa.draw(seed=4)
+    return santa
+
+
+def assert_valid(santa):
+    assert set(santa.config) == set(santa.config.values()) == santa.names
+    for giver, recipient in santa.config.items():
+        assert recipient in santa.get_eligible_names(giver)
+
+
+def test_newcomer_moves_a_single_pairing():
+    santa = drawn_santa()
+    before = dict(santa.config)
+    changed = santa.repair(added=["zoe"])
+    assert_valid(santa)
+    assert [pair["giver"] for pair in changed if pair["from"] is None] == ["zoe"]
+    assert len(changed) == 2
+    moved = {pair["giver"] for pair in changed}
+    assert all(santa.config[giver] == before[giver] for giver in before if giver not in moved)
+
+
+def test_leaving_only_touches_affected_givers():
+    santa = drawn_santa()
+    before = dict(santa.config)
+    leaver = "klaus"
+    changed = santa.repair(removed=[leaver])
+    assert_valid(santa)
+    assert leaver not in santa.config
+    moved = {pair["giver"] for pair in changed}
+    giver_of_leaver = next(g for g, r in before.items() if r == leaver)
+    assert giver_of_leaver in moved
+    assert all(santa.config[giver] == before[giver] for giver in santa.config if giver not in moved)
+
+
+def test_repair_changes_as_few_givers_as_possible():
+    rnd = random.Random(3)
+    for _ in range(300):
+        n = rnd.randint(2, 7)
+        forbidden = [{r for r in range(n) if rnd.random() < 0.3} for _ in range(n)]
+        eligibility = Eligibility(range(n), forbidden)
+        valid = [p for p in itertools.permutations(range(n)) if all(eligibility.allows(g, p[g]) for g in range(n))]
+        if not valid:
+            continue
+        kept = list(rnd.choice(valid))
+        # One giver loses their recipient, another recipient is up for grabs
+        kept[rnd.randrange(n)] = None
+        assignment, changed = repair(eligibility, kept)
+        assert all(eligibility.allows(g, r) for g, r in enumerate(assignment))
+        assert changed == {g for g in range(n) if assignment[g] != kept[g]}
+        assert len(changed) == min(sum(p[g] != kept[g] for g in range(n)) for p in valid)
+
+
+def test_repair_stays_minimal_with_several_givers_to_place():
+    assignment, changed = repair(Eligibility(['a', 'b', 'c'], [set()] * 3), [None, 0, None])
+    assert assignment == [2, 0, 1] and changed == {0, 2}
+
+    rnd = random.Random(5)
+    for _ in range(300):
+        n = rnd.randint(3, 7)
+        forbidden = [{r for r in range(n) if rnd.random() < 0.3} for _ in range(n)]
+        eligibility = Eligibility(range(n), forbidden)
+        valid = [p for p in itertools.permutations(range(n)) if all(eligibility.allows(g, p[g]) for g in range(n))]
+        if not valid:
+            continue
+        kept = list(rnd.choice(valid))
+        for giver in rnd.sample(range(n), rnd.randint(2, n - 1)):
+            kept[giver] = None
+        assignment, changed = repair(eligibility, kept)
+        assert sorted(assignment) == list(range(n))
+        assert all(eligibility.allows(g, r) for g, r in enumerate(assignment))
+        assert len(changed) == min(sum(p[g] != kept[g] for g in range(n)) for p in valid)
+
+
+class CountingRows(list):
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+
+def test_repair_work_stays_local_in_a_large_group(monkeypatch):
+    rnd = random.Random(0)
+    n = 2000
+    forbidden = [{rnd.randrange(n) for _ in range(5)} for _ in range(n)]
+    recipient_of, _ = max_matching(Eligibility(range(n), forbidden))
+    monkeypatch.setattr(Eligibility, 'to_matrix', lambda self: pytest.fail("fell back to the global solve"))
+
+    # A newcomer (id n) joins
+    joined = Eligibility(range(n + 1), forbidden + [set()])
+    joined.rows = CountingRows(joined.rows)
+    assignment, changed = repair(joined, recipient_of + [None])
+    assert len(changed) == 2 and n in changed
+    assert joined.rows.reads <= 5
+
+    # Participant 7 leaves: ids above 7 shift down by one
+    def shift(i):
+        return i - (i > 7)
+
+    stay = [g for g in range(n) if g != 7]
+    left = Eligibility(range(n - 1), [{shift(r) for r in forbidden[g] if r != 7} for g in stay])
+    left.rows = CountingRows(left.rows)
+    kept = [None if recipient_of[g] == 7 else shift(recipient_of[g]) for g in stay]
+    assignment, changed = repair(left, kept)
+    assert sorted(assignment) == list(range(n - 1))
+    assert len(changed) <= 2
+    assert left.rows.reads <= 5
+
+
+def test_repair_raises_when_a_giver_has_nobody_left():
+    eligibility = Eligibility(range(3), [{1}, {2}, {0, 1}])
+    with pytest.raises(NoSolutionError):
+        repair(eligibility, [2, 0, None])
+
+
+def test_repair_matches_endpoint(tmp_path, monkeypatch):
+    from app import app
+
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.delenv('DRAW_LOCKED', raising=False)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = 'jimmy'
+    year = client.post('/api/admin/run_matches', json={}).get_json()['year']
+    saved = tmp_path / f'secret-santa-{year}.json'
+    before = json.loads(saved.read_text())
+
+    resp = client.post('/api/admin/repair_matches', json={'add': ['Zoe']})
+    assert resp.status_code == 200
+    changed = resp.get_json()['changed']
+    after = json.loads(saved.read_text())
+    assert set(after) == set(before) | {'zoe'}
+    assert set(changed) == {g for g in after if after[g] != before.get(g)}
+
+    resp = client.post('/api/admin/repair_matches', json={'remove': ['nobody']})
+    assert resp.status_code == 400
@@ -0,0 +1,48 @@
+import sqlite3
+import time
+
+from db import ensure_schema
+
+
+def test_schema_init_runs_once_per_file(tmp_path):
+    path = str(tmp_path / 'guard.sqlite3')
+    calls = []
+
+    def init():
+        calls.append(1)
+        sqlite3.connect(path).close()
+
+    ensure_schema('demo', init, path)
+    ensure_schema('demo', init, path)
+    assert len(calls) == 1
+    (tmp_path / 'guard.sqlite3').unlink()
+    ensure_schema('demo', init, path)
+    assert len(calls) == 2
+
+
+def test_leaderboard_reads_do_not_wait_for_writers(client, tmp_path):
+    path = tmp_path / 'scores.sqlite3'
+    assert client.post('/api/scores/forste-advent', json={'name': 'a', 'score': 3}).status_code == 200
+
+    writer = sqlite3.connect(str(path), isolation_level=None)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        start = time.perf_counter()
+        resp = client.get('/api/scores/forste-advent')
+        assert resp.status_code == 200
+        assert [row['score'] for row in resp.get_json()['scores']] == [3]
+        assert time.perf_counter() - start < 1.0
+    finally:
+        writer.execute('ROLLBACK')
+        writer.close()
+
+
+def test_swapped_database_is_set_up_again(client, tmp_path):
+    path = tmp_path / 'scores.sqlite3'
+    client.post('/api/scores/forste-advent', json={'name': 'a', 'score': 3})
+    for suffix in ('', '-wal', '-shm'):
+        (tmp_path / f'scores.sqlite3{suffix}').unlink(missing_ok=True)
+    resp = client.get('/api/scores/forste-advent')
+    assert resp.status_code == 200
+    assert resp.get_json()['scores'] == []
+    assert path.exists()
@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+
+import pytest
+
+from group_commit import GroupCommitQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    path = str(tmp_path / 'queue.sqlite3')
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE t (x INTEGER CHECK (x >= 0))')
+    con.commit()
+    con.close()
+    batches = []
+
+    def write(con, items):
+        batches.append(len(items))
+        con.executemany('INSERT INTO t (x) VALUES (?)', [(x,) for x in items])
+
+    return path, batches, GroupCommitQueue(write, **kwargs)
+
+
+def stored(path):
+    con = sqlite3.connect(path)
+    try:
+        return sorted(x for (x,) in con.execute('SELECT x FROM t'))
+    finally:
+        con.close()
+
+
+def test_concurrent_submissions_share_commits(tmp_path):
+    path, _, queue = make_queue(tmp_path, window=0.05)
+    commits = []
+    original = queue._commit
+    queue._commit = lambda p, tickets: (commits.append(len(tickets)), original(p, tickets))
+    threads = [threading.Thread(target=queue.submit, args=(path, [i])) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stored(path) == list(range(20))
+    assert sum(commits) == 20 and len(commits) < 20
+    queue.close()
+
+
+def test_bad_submission_does_not_sink_the_batch(tmp_path):
+    path, _, queue = make_queue(tmp_path, window=0.05)
+    errors = []
+
+    def submit(value):
+        try:
+            queue.submit(path, [value])
+        except sqlite3.IntegrityError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=submit, args=(x,)) for x in (1, -1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stored(path) == [1, 2]
+    assert len(errors) == 1
+    queue.close()
+
+
+def test_async_mode_is_flushed_on_close(tmp_path):
+    path, _, queue = make_queue(tmp_path, window=0.5, mode='async')
+    queue.submit(path, [1, 2, 3])
+    queue.close()
+    assert stored(path) == [1, 2, 3]
+    with pytest.raises(RuntimeError):
+        queue.submit(path, [4])
+
+
+def test_batch_endpoint_saves_offline_scores(client):
+    batch = [
+        {'game': 'forste-advent', 'name': 'a', 'score': 5, 'created_at': '2025-12-01T10:00:00'},
+        {'game': 'forste-advent', 'name': 'b', 'score': 8},
+        {'game': 'reindeer-rush', 'name': 'c', 'score': 3},
+    ]
+    resp = client.post('/api/scores/batch', json={'scores': batch})
+    assert resp.status_code == 200
+    assert resp.get_json() == {'success': True, 'saved': 3}
+    rows = client.get('/api/scores/forste-advent').get_json()['scores']
+    assert [(row['name'], row['score']) for row in rows] == [('b', 8), ('a', 5)]
+    assert rows[1]['created_at'] == '2025-12-01T10:00:00'
+    assert [row['score'] for row in client.get('/api/scores/fjerde-advent').get_json()['scores']] == [3]
+
+    bad = client.post('/api/scores/batch', json={'scores': [{'game': 'forste-advent', 'score': 1}, {'game': 'forste-advent', 'score': -2}]})
+    assert bad.status_code == 400
+    assert len(client.get('/api/scores/forste-advent').get_json()['scores']) == 2
+
+
+def test_batch_times_with_an_offset_are_stored_as_utc(client):
+    batch = [{'game': 'anden-advent', 'name': 'a', 'score': 5, 'created_at': '2020-01-01T23:30:00-05:00'}]
+    assert client.post('/api/scores/batch', json={'scores': batch}).status_code == 200
+    rows = client.get('/api/scores/anden-advent').get_json()['scores']
+    assert rows[0]['created_at'] == '2020-01-02T04:30:00'
+
+
+def test_scores_for_unknown_games_are_refused(client, tmp_path):
+    import sqlite3
+
+    assert client.post('/api/scores/no-such-game', json={'name': 'a', 'score': 1}).status_code == 404
+    batch = [{'game': 'forste-advent', 'name': 'a', 'score': 1}, {'game': 'no-such-game', 'name': 'a', 'score': 2}]
+    resp = client.post('/api/scores/batch', json={'scores': batch})
+    assert resp.status_code == 400
+    assert 'entry 1' in resp.get_json()['error']
+    con = sqlite3.connect(str(tmp_path / 'scores.sqlite3'))
+    assert con.execute("SELECT COUNT(*) FROM scores").fetchone()[0] == 0
+    assert con.execute("SELECT COUNT(*) FROM score_versions").fetchone()[0] == 0
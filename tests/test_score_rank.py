@@ -0,0 +1,56 @@
+import pytest
+
+
+@pytest.fixture
+def client(client):
+    batch = [{'game': 'forste-advent', 'name': f'p{i}', 'score': s} for i, s in enumerate([50, 40, 40, 30, 20, 10])]
+    assert client.post('/api/scores/batch', json={'scores': batch}).status_code == 200
+    return client
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+def test_rank_for_a_new_score_places_it_after_equal_scores(client):
+    data = client.get('/api/scores/forste-advent/rank?score=40').get_json()
+    assert data['rank'] == 4
+    assert data['qualifies'] is True
+    assert names(data['above']) == ['p1', 'p2']
+    assert names(data['below']) == ['p3', 'p4']
+
+    top = client.get('/api/scores/forste-advent/rank?score=99&neighbours=1').get_json()
+    assert (top['rank'], top['above'], names(top['below'])) == (1, [], ['p0'])
+
+
+def test_rank_for_a_player_uses_their_best_run(client):
+    data = client.get('/api/scores/forste-advent/rank?name=p2&neighbours=1').get_json()
+    assert (data['name'], data['score'], data['rank']) == ('p2', 40, 3)
+    assert names(data['above']) == ['p1']
+    assert names(data['below']) == ['p3']
+    assert client.get('/api/scores/forste-advent/rank?name=nobody').status_code == 404
+    assert client.get('/api/scores/forste-advent/rank').status_code == 400
+    assert client.get('/api/scores/forste-advent/rank?score=-1').status_code == 400
+
+
+def test_score_matching_the_tenth_place_does_not_qualify(client):
+    batch = [{'game': 'forste-advent', 'name': f'q{i}', 'score': 5} for i in range(4)]
+    client.post('/api/scores/batch', json={'scores': batch})
+    assert client.get('/api/scores/forste-advent/rank?score=5').get_json()['qualifies'] is False
+    assert client.get('/api/scores/forste-advent/rank?score=6').get_json()['qualifies'] is True
+
+
+def test_unknown_games_have_no_ranks(client):
+    assert client.get('/api/scores/no-such-game/rank?score=5').status_code == 404
+
+
+def test_cursor_pages_walk_the_whole_board(client):
+    seen = []
+    page = client.get('/api/scores/forste-advent?limit=4').get_json()
+    seen += names(page['scores'])
+    while page['next']:
+        page = client.get(f"/api/scores/forste-advent?limit=4&after={page['next']}").get_json()
+        seen += names(page['scores'])
+    assert seen == ['p0', 'p1', 'p2', 'p3', 'p4', 'p5']
+    assert client.get('/api/scores/forste-advent?limit=0').status_code == 400
+    assert client.get('/api/scores/forste-advent?after=oops').status_code == 400
@@ -0,0 +1,94 @@
+import json
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, 'SCORE_FEED_INTERVAL', 0.05)
+    return client
+
+
+def read_events(resp, count):
+    events = []
+    buffer = ''
+    chunks = iter(resp.response)
+    while len(events) < count:
+        buffer += next(chunks).decode()
+        while '\n\n' in buffer and len(events) < count:
+            block, buffer = buffer.split('\n\n', 1)
+            data = [line[6:] for line in block.splitlines() if line.startswith('data: ')]
+            if data:
+                events.append(json.loads(data[0]))
+    return events
+
+
+def test_stream_sends_boards_then_pushes_new_scores(client):
+    client.post('/api/scores/forste-advent', json={'name': 'a', 'score': 3})
+    resp = client.get('/api/scores/stream?games=forste-advent,anden-advent')
+    assert resp.mimetype == 'text/event-stream'
+    try:
+        first = read_events(resp, 2)
+        assert {e['game']: [r['score'] for r in e['scores']] for e in first} == {'forste-advent': [3], 'anden-advent': []}
+
+        client.post('/api/scores/anden-advent', json={'name': 'b', 'score': 7})
+        (pushed,) = read_events(resp, 1)
+        assert pushed['game'] == 'anden-advent'
+        assert [r['score'] for r in pushed['scores']] == [7]
+    finally:
+        resp.close()
+
+
+def test_writes_from_other_workers_reach_the_stream(client, tmp_path):
+    resp = client.get('/api/scores/stream?games=tredje-advent')
+    try:
+        assert read_events(resp, 1)[0]['scores'] == []
+        other = sqlite3.connect(str(tmp_path / 'scores.sqlite3'))
+        with other:
+            other.execute("INSERT INTO best_scores (game, name, score, created_at, score_id) VALUES ('tredje-advent', 'x', 4, 't', 1)")
+            other.execute("INSERT INTO score_versions (game, version) VALUES ('tredje-advent', 42)")
+        other.close()
+        (pushed,) = read_events(resp, 1)
+        assert [r['name'] for r in pushed['scores']] == ['x']
+    finally:
+        resp.close()
+
+
+def test_streams_are_capped_per_worker(client, monkeypatch):
+    import app as app_module
+    import score_feed
+
+    monkeypatch.setattr(app_module, 'MAX_SCORE_STREAMS', 1)
+    first = client.get('/api/scores/stream?games=forste-advent')
+    try:
+        second = client.get('/api/scores/stream?games=forste-advent')
+        assert second.status_code == 503
+        assert second.headers['Retry-After']
+    finally:
+        first.close()
+    feed = score_feed.feed_for(app_module.scores_db_path(), app_module.cached_leaderboard)
+    assert feed.subscribers == 0
+    assert feed._boards == {}
+
+
+def test_unknown_games_cannot_be_followed(client):
+    assert client.get('/api/scores/stream?games=forste-advent,no-such-game').status_code == 404
+
+
+def test_default_threads_leave_room_next_to_the_streams(monkeypatch):
+    import logging
+    import runpy
+    from pathlib import Path
+
+    import app as app_module
+
+    # Loading the config must not reconfigure this process's logging
+    monkeypatch.setattr(logging, 'basicConfig', lambda **kwargs: None)
+    monkeypatch.delenv('GUNICORN_THREADS', raising=False)
+    config = runpy.run_path(str(Path(__file__).resolve().parent.parent / 'gunicorn.conf.py'))
+    # Tens of viewers per worker, with threads to spare for everything else
+    assert app_module.MAX_SCORE_STREAMS <= 64
+    assert config['threads'] - app_module.MAX_SCORE_STREAMS >= 8
@@ -27,7 +27,7 @@ def teardown_module(module):
         os.environ['DATA_DIR'] = _ORIG_DATA_DIR
 
 
-def test_scores_allow_multiple_entries_and_sort_desc():
+def test_scores_keep_each_players_best_run():
     from app import app
 
     client = app.test_client()
@@ -59,14 +59,21 @@ def test_scores_allow_multiple_entries_and_sort_desc():
     assert r.status_code == 200
     assert r.get_json()['success'] is True
 
-    # Leaderboard should contain all three entries sorted by score desc
+    # Leaderboard shows the player once, with their best run
     r = client.get('/api/scores/forste-advent')
     assert r.status_code == 200
     data = r.get_json()
     assert isinstance(data['scores'], list)
-    assert [row['score'] for row in data['scores']] == [9, 5, 3]
+    assert [row['score'] for row in data['scores']] == [9]
     assert all(row['name'] == 'testuser' for row in data['scores'])
 
+    # Every run is still kept for stats
+    from app import get_connection
+    runs = get_connection().execute(
+        "SELECT score FROM scores WHERE game = 'forste-advent' AND name = 'testuser' ORDER BY id"
+    ).fetchall()
+    assert [score for (score,) in runs] == [5, 3, 9]
+
 
 def test_low_scores_still_saved_even_when_leaderboard_full():
     from app import app, reset_scores_for_game
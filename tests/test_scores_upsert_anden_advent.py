@@ -10,7 +10,7 @@ def setup_module(module):
     os.environ.setdefault('SECRET_KEY', 'test-secret-key')
 
 
-def test_scores_allow_duplicates_for_anden_advent():
+def test_scores_keep_best_run_for_anden_advent():
     from app import app, reset_scores_for_game
 
     client = app.test_client()
@@ -26,7 +26,7 @@ def test_scores_allow_duplicates_for_anden_advent():
         assert r.status_code == 200
         assert r.get_json()['success'] is True
 
-    # Leaderboard should list three entries sorted desc, even with same name repeated
+    # A lower run afterwards must not replace the best one
     r = client.post(
         '/api/scores/anden-advent',
         data=json.dumps({'name': 'santa-fan', 'score': 6}),
@@ -39,6 +39,6 @@ def test_scores_allow_duplicates_for_anden_advent():
     assert r.status_code == 200
     data = r.get_json()
     assert isinstance(data['scores'], list)
-    assert len(data['scores']) == 4
-    assert [row['score'] for row in data['scores']] == [11, 6, 4, 2]
+    assert len(data['scores']) == 1
+    assert [row['score'] for row in data['scores']] == [11]
     assert all(row['name'] == 'santa-fan' for row in data['scores'])
@@ -0,0 +1,162 @@
+import itertools
+import random
+import time
+from collections import Counter
+
+import pytest
+
+from secret_santa import NoSolutionError, SecretSanta
+from solver import Eligibility, check_feasibility, pair_frequencies, solve, swap_sample
+
+
+def assert_valid(n, forbidden, assignment):
+    assert sorted(assignment) == list(range(n))
+    for giver, recipient in enumerate(assignment):
+        assert recipient != giver
+        assert recipient not in forbidden[giver]
+
+
+def test_draw_respects_couples_and_history():
+    santa = SecretSanta(year=2040)
+    santa.draw()
+    assert set(santa.config) == santa.names
+    assert set(santa.config.values()) == santa.names
+    for giver, recipient in santa.config.items():
+        assert recipient in santa.get_eligible_names(giver)
+
+
+def test_draw_without_randomize_is_reproducible():
+    first = SecretSanta(year=2040)
+    first.draw(randomize=False)
+    second = SecretSanta(year=2040)
+    second.draw(randomize=False)
+    assert first.config == second.config
+
+
+def test_seeded_draws_repeat_and_vary():
+    configs = []
+    for seed in range(6):
+        santa = SecretSanta(year=2040)
+        santa.draw(seed=seed)
+        configs.append(tuple(sorted(santa.config.items())))
+    again = SecretSanta(year=2040)
+    again.draw(seed=0)
+    assert tuple(sorted(again.config.items())) == configs[0]
+    assert len(set(configs)) > 1
+
+
+def test_draw_raises_when_infeasible():
+    santa = SecretSanta(year=2040)
+    # Everybody has already given to everybody else
+    santa.previous = {name: sorted(santa.names) for name in santa.names}
+    with pytest.raises(NoSolutionError):
+        santa.draw()
+
+
+def test_solver_finds_the_only_solution():
+    # Each giver may only give to the next one, except the last who must
+    # close the loop; a greedy pick from the wrong end dead-ends quickly.
+    n = 60
+    forbidden = [set(range(n)) - {(g + 1) % n} for g in range(n)]
+    assignment = solve(Eligibility(range(n), forbidden), rng=random.Random(3))
+    assert assignment == [(g + 1) % n for g in range(n)]
+
+
+def test_solver_proves_infeasibility():
+    # Three givers compete for the same two recipients
+    n = 5
+    forbidden = [{0, 1, 2}, {0, 1, 2}, {0, 1, 2}, {3}, {4}]
+    with pytest.raises(NoSolutionError):
+        solve(Eligibility(range(n), forbidden))
+
+
+def test_solver_scales_to_thousands():
+    rnd = random.Random(7)
+    n = 3000
+    forbidden = [{rnd.randrange(n) for _ in range(12)} for g in range(n)]
+    start = time.perf_counter()
+    assignment = solve(Eligibility(range(n), forbidden), rng=rnd)
+    elapsed = time.perf_counter() - start
+    assert_valid(n, forbidden, assignment)
+    assert elapsed < 2.0
+
+
+def test_eligibility_matches_couples_and_history():
+    santa = SecretSanta(year=2040)
+    eligibility = santa.eligibility
+    jimmy = eligibility.index["jimmy"]
+    assert not eligibility.allows(jimmy, jimmy)
+    assert not eligibility.allows(jimmy, eligibility.index["camilla"])
+    for past in santa.previous["jimmy"]:
+        assert not eligibility.allows(jimmy, eligibility.index[past])
+    expected = santa.names - {"jimmy", "camilla", *santa.previous["jimmy"]}
+    assert santa.get_eligible_names("jimmy") == expected
+    assert santa.get_eligible_names("jimmy", already_taken=["klaus"]) == expected - {"klaus"}
+
+
+def test_eligibility_is_rebuilt_when_history_changes():
+    santa = SecretSanta(year=2040)
+    before = santa.eligibility
+    assert santa.eligibility is before
+    santa.previous = {**santa.previous, "jimmy": ["klaus"]}
+    assert santa.eligibility is not before
+    assert "klaus" not in santa.get_eligible_names("jimmy")
+
+
+def test_feasibility_check_is_fast_for_large_groups():
+    rnd = random.Random(11)
+    n = 20000
+    forbidden = [{rnd.randrange(n) for _ in range(10)} for _ in range(n)]
+    # Four givers squeezed onto three recipients
+    for giver in range(4):
+        forbidden[giver] = set(range(n)) - {10, 11, 12}
+    eligibility = Eligibility(range(n), forbidden)
+    start = time.perf_counter()
+    report = check_feasibility(eligibility)
+    elapsed = time.perf_counter() - start
+    assert report['feasible'] is False
+    assert report['matched'] == n - 1
+    assert report['blocked'] == [{'givers': [0, 1, 2, 3], 'recipients': [10, 11, 12]}]
+    assert elapsed < 1.0
+
+
+def small_group():
+    # Six people, each barred from giving to the next one in line
+    n = 6
+    eligibility = Eligibility(range(n), [{(g + 1) % n} for g in range(n)])
+    valid = [p for p in itertools.permutations(range(n)) if all(eligibility.allows(g, p[g]) for g in range(n))]
+    return eligibility, valid
+
+
+def test_swap_sampler_is_close_to_uniform():
+    eligibility, valid = small_group()
+    rng = random.Random(5)
+    start = solve(eligibility)
+    seen = Counter(tuple(swap_sample(eligibility, start, rng, steps=60)) for _ in range(8000))
+    assert set(seen) == set(valid)
+    expected = 8000 / len(valid)
+    assert all(abs(count - expected) < 0.35 * expected for count in seen.values())
+
+
+def test_pair_frequencies_match_exact_enumeration():
+    eligibility, valid = small_group()
+    n = len(eligibility)
+    exact = [[0.0] * n for _ in range(n)]
+    for p in valid:
+        for giver in range(n):
+            exact[giver][p[giver]] += 1 / len(valid)
+    start = time.perf_counter()
+    freq = pair_frequencies(eligibility, solve(eligibility), samples=200_000, seed=1)
+    assert time.perf_counter() - start < 5.0
+    for giver in range(n):
+        for recipient in range(n):
+            assert abs(freq[giver, recipient] - exact[giver][recipient]) < 0.01
+    assert freq.sum(axis=1) == pytest.approx([1.0] * n)
+
+
+def test_secret_santa_pair_frequencies_respect_constraints():
+    santa = SecretSanta(year=2040)
+    frequencies = santa.pair_frequencies(samples=5000, seed=3)
+    for giver, shares in frequencies.items():
+        assert set(shares) <= santa.get_eligible_names(giver)
+        assert sum(shares.values()) == pytest.approx(1.0)
@@ -0,0 +1,104 @@
+import datetime
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+import generations
+
+
+def bump_in_child(data_dir, name):
+    generations.generations_for(data_dir).bump(name)
+
+
+def test_counters_are_shared_with_forked_workers(tmp_path):
+    data_dir = str(tmp_path)
+    generations.baseline(data_dir)
+    assert generations.changed(data_dir) == {}
+
+    # The parent already mapped the file, like a preloaded gunicorn master
+    ctx = multiprocessing.get_context('fork')
+    children = [ctx.Process(target=bump_in_child, args=(data_dir, 'matches')) for _ in range(4)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+    assert generations.changed(data_dir) == {'matches': 4}
+    generations.mark_loaded(data_dir, 'matches', 4)
+    assert generations.changed(data_dir) == {}
+
+    # Our own save is already loaded here...
+    assert generations.bump(data_dir, 'logins') == 1
+    assert generations.changed(data_dir) == {}
+    # ...unless another worker saved in between
+    generations.generations_for(data_dir).bump('logins')
+    generations.bump(data_dir, 'logins')
+    assert generations.changed(data_dir) == {'logins': 3}
+
+
+class SlowCounter:
+    """Pauses between reading and writing a counter, so racing bumps collide."""
+
+    counter = generations._COUNTER
+    size = counter.size
+
+    def unpack_from(self, buffer, offset):
+        value = self.counter.unpack_from(buffer, offset)
+        time.sleep(0.001)
+        return value
+
+    def pack_into(self, buffer, offset, value):
+        self.counter.pack_into(buffer, offset, value)
+
+
+def test_threads_of_one_worker_never_lose_a_bump(tmp_path, monkeypatch):
+    counters = generations.generations_for(str(tmp_path))
+    monkeypatch.setattr(generations, '_COUNTER', SlowCounter())
+    threads = [threading.Thread(target=lambda: [counters.bump('matches') for _ in range(20)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counters.get('matches') == 80
+
+
+def test_other_workers_draw_is_picked_up_on_the_next_request(tmp_path, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    year = datetime.datetime.now().year
+    match_file = tmp_path / f'secret-santa-{year}.json'
+    match_file.write_text(json.dumps({'alice': 'bob', 'bob': 'alice'}))
+    monkeypatch.setattr(app_module, 'SS', app_module.SS)
+    monkeypatch.setattr(app_module, 'ASSIGNMENTS', {'old': 'state'})
+    client = app_module.app.test_client()
+
+    client.get('/healthz')
+    assert app_module.ASSIGNMENTS == {'old': 'state'}
+
+    # Another worker saves a new draw and bumps the counter
+    match_file.write_text(json.dumps({'alice': 'carol', 'carol': 'alice'}))
+    generations.generations_for(str(tmp_path)).bump('matches')
+    client.get('/healthz')
+    assert app_module.ASSIGNMENTS == {'alice': 'carol', 'carol': 'alice'}
+
+
+def test_other_workers_password_is_picked_up(tmp_path, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    env_file = tmp_path / '.env'
+    env_file.write_text('LOGIN_sharedstatetest=secret-hash\n')
+    monkeypatch.setattr(app_module, 'ENV_FILE', str(env_file))
+    monkeypatch.setattr(app_module, 'logins', app_module.logins)
+    client = app_module.app.test_client()
+    try:
+        client.get('/healthz')
+        assert 'sharedstatetest' not in app_module.logins
+        generations.generations_for(str(tmp_path)).bump('logins')
+        client.get('/healthz')
+        assert app_module.logins['sharedstatetest'] == 'secret-hash'
+    finally:
+        # load_dotenv wrote it into the process environment
+        os.environ.pop('LOGIN_sharedstatetest', None)
@@ -0,0 +1,59 @@
+import json
+import random
+
+import pytest
+
+from secret_santa import NoSolutionError, SecretSanta
+from solver import Eligibility, cycles, solve_cycle
+
+
+def follow_circle(config):
+    start = next(iter(config))
+    seen = [start]
+    giver = config[start]
+    while giver != start:
+        seen.append(giver)
+        giver = config[giver]
+    return seen
+
+
+def test_single_cycle_draw_visits_everyone():
+    for seed in range(5):
+        santa = SecretSanta(year=2040)
+        santa.draw(seed=seed, single_cycle=True)
+        assert sorted(follow_circle(santa.config)) == sorted(santa.names)
+        for giver, recipient in santa.config.items():
+            assert recipient in santa.get_eligible_names(giver)
+
+
+def test_single_cycle_fails_cleanly_for_split_groups():
+    # Two groups of three that may only give within their own group
+    n = 6
+    forbidden = [{r for r in range(n) if (r < 3) != (g < 3)} for g in range(n)]
+    with pytest.raises(NoSolutionError):
+        solve_cycle(Eligibility(range(n), forbidden))
+
+
+def test_single_cycle_handles_hundreds_of_participants():
+    rnd = random.Random(9)
+    n = 400
+    forbidden = [{rnd.randrange(n) for _ in range(15)} for _ in range(n)]
+    eligibility = Eligibility(range(n), forbidden)
+    assignment = solve_cycle(eligibility, rng=rnd)
+    assert len(cycles(assignment)) == 1
+    assert all(eligibility.allows(g, r) for g, r in enumerate(assignment))
+
+
+def test_run_matches_single_cycle(tmp_path, monkeypatch):
+    from app import app
+
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.delenv('DRAW_LOCKED', raising=False)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = 'jimmy'
+    resp = client.post('/api/admin/run_matches', json={'single_cycle': True})
+    assert resp.status_code == 200
+    year = resp.get_json()['year']
+    saved = json.loads((tmp_path / f'secret-santa-{year}.json').read_text())
+    assert len(follow_circle(saved)) == len(saved) == 10
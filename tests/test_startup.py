@@ -0,0 +1,52 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = "import json, app; print(json.dumps({'matches': app.ASSIGNMENTS, 'startup': app.STARTUP_MS}))"
+
+
+def test_workers_starting_together_share_one_draw(tmp_path):
+    # No match file for this year anywhere, so the first worker has to draw
+    for name in ('couples.yaml', 'previous.yaml'):
+        shutil.copy(ROOT_DIR / name, tmp_path / name)
+    env = {**os.environ, 'DATA_DIR': str(tmp_path / 'data'), 'PYTHONPATH': str(ROOT_DIR)}
+    env.pop('SCORES_DB', None)
+    env.pop('ENV_FILE', None)
+    workers = [
+        subprocess.Popen([sys.executable, '-c', PROBE], cwd=tmp_path, env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(3)
+    ]
+    results = [json.loads(worker.communicate(timeout=60)[0]) for worker in workers]
+
+    assert all(worker.returncode == 0 for worker in workers)
+    draws = [result['matches'] for result in results]
+    assert draws[0] and all(draw == draws[0] for draw in draws)
+    for result in results:
+        assert {'logins', 'matches', 'migrations', 'total'} <= set(result['startup'])
+
+
+def test_startup_timings_are_logged_and_served(tmp_path):
+    for name in ('couples.yaml', 'previous.yaml'):
+        shutil.copy(ROOT_DIR / name, tmp_path / name)
+    env = {**os.environ, 'DATA_DIR': str(tmp_path / 'data'), 'PYTHONPATH': str(ROOT_DIR)}
+    env.pop('SCORES_DB', None)
+    env.pop('ENV_FILE', None)
+    probe = (
+        f"import json, runpy; runpy.run_path({str(ROOT_DIR / 'gunicorn.conf.py')!r}); import app; "
+        "client = app.app.test_client()\n"
+        "with client.session_transaction() as sess: sess['user'] = 'jimmy'\n"
+        "print(json.dumps(client.get('/api/admin/startup').get_json()))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', probe], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert 'app: Startup took' in result.stderr
+    served = json.loads(result.stdout)
+    assert {'logins', 'matches', 'migrations', 'total'} <= set(served['startup_ms'])
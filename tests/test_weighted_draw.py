@@ -0,0 +1,95 @@
+import itertools
+import json
+import time
+
+import numpy as np
+
+from secret_santa import SecretSanta
+from solver import Eligibility, history_costs, min_cost_assignment
+
+
+def test_history_costs_weight_recent_pairings_highest():
+    hard = Eligibility.from_constraints(['a', 'b', 'c', 'd'], couples=[['a', 'b']])
+    cost = history_costs(hard, {'a': ['c', 'd']})
+    a, c, d = hard.index['a'], hard.index['c'], hard.index['d']
+    assert np.isinf(cost[a, a]) and np.isinf(cost[a, hard.index['b']])
+    assert cost[a, d] > cost[a, c] > 0
+    limited = history_costs(hard, {'a': ['c', 'd']}, lookback=1)
+    assert limited[a, c] == 0 and limited[a, d] > 0
+
+
+def test_last_years_pairing_outweighs_only_the_same_givers_older_ones():
+    names = ['a', 'b', 'c', 'd', 'e']
+    hard = Eligibility.from_constraints(names, couples=[])
+    history = {'a': ['e', 'd', 'c'], 'b': ['e', 'd', 'c']}
+    cost = history_costs(hard, history)
+    a, b = hard.index['a'], hard.index['b']
+    c, d, e = (hard.index[name] for name in 'cde')
+    assert cost[a, c] > cost[a, d] + cost[a, e]
+    # ...but two givers' older repeats together can match it
+    assert cost[a, d] + cost[b, d] == cost[a, c]
+
+
+def test_min_cost_assignment_is_optimal():
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        n = 6
+        cost = rng.integers(0, 4, size=(n, n)).astype(float)
+        np.fill_diagonal(cost, np.inf)
+        assignment, _, _ = min_cost_assignment(cost)
+        best = min(sum(cost[i, p[i]] for i in range(n)) for p in itertools.permutations(range(n)))
+        assert sum(cost[i, assignment[i]] for i in range(n)) == best
+
+
+def test_min_cost_assignment_handles_thousands():
+    rng = np.random.default_rng(4)
+    n = 2000
+    cost = np.zeros((n, n))
+    np.fill_diagonal(cost, np.inf)
+    np.add.at(cost, (rng.integers(n, size=10 * n), rng.integers(n, size=10 * n)), 1.0)
+    start = time.perf_counter()
+    assignment, _, _ = min_cost_assignment(cost)
+    assert time.perf_counter() - start < 5.0
+    assert sorted(assignment) == list(range(n))
+    assert sum(cost[i, assignment[i]] for i in range(n)) == 0
+
+
+def test_weighted_draw_avoids_last_year_when_history_is_saturated():
+    santa = SecretSanta(year=2040)
+    # Everyone has given to everyone else: a hard blacklist is infeasible,
+    # but the weighted draw still avoids last year's recipient
+    names = sorted(santa.names)
+    history = {}
+    for i, giver in enumerate(names):
+        others = [name for name in names if name != giver]
+        last = names[(i + 1) % len(names)]
+        history[giver] = [name for name in others if name != last] + [last]
+    santa.previous = history
+    for seed in range(3):
+        repeats = santa.draw_weighted(seed=seed)
+        assert sorted(santa.config) == names
+        assert sorted(santa.config.values()) == names
+        for giver, recipient in santa.config.items():
+            assert recipient != history[giver][-1]
+            assert recipient in santa.names - set(next(c for c in santa.couples if giver in c))
+        assert len(repeats) == len(names)
+
+
+def test_run_matches_with_lookback(tmp_path, monkeypatch):
+    from app import app
+
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.delenv('DRAW_LOCKED', raising=False)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = 'jimmy'
+    resp = client.post('/api/admin/run_matches', json={'lookback': 1})
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['repeats'] == 0
+    saved = json.loads((tmp_path / f"secret-santa-{data['year']}.json").read_text())
+    assert len(saved) == 10
+    assert client.post('/api/admin/run_matches', json={'lookback': 'soon'}).status_code == 400
+    both = client.post('/api/admin/run_matches', json={'lookback': 1, 'single_cycle': True})
+    assert both.status_code == 400
+    assert 'single_cycle' in both.get_json()['error']